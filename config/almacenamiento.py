@@ -0,0 +1,112 @@
+# config/almacenamiento.py
+"""
+Almacenamiento de media direccionado por contenido.
+
+`AlmacenamientoDeduplicado` nombra cada archivo con el SHA-256 de su
+contenido, dentro de la carpeta de su `upload_to`
+(productos/3f2a...e1.webp). Subir otra vez la misma imagen no crea una
+copia con sufijo aleatorio (Devurity_PsGhaGY.webp): el blob ya existe y se
+reutiliza. La escritura va a un temporal que se publica con os.replace, así
+dos subidas simultáneas del mismo archivo no se pisan.
+
+Como un blob puede estar referenciado por varias filas, reemplazar o borrar
+una imagen nunca borra el archivo. `barrer_huerfanos` cuenta las
+referencias de todos los FileField/ImageField y borra de sus carpetas los
+archivos sin ninguna, con un margen de gracia para subidas en curso.
+Los archivos sueltos en la raíz (imágenes de CKEditor, referenciadas solo
+desde el HTML) no se tocan.
+"""
+import hashlib
+import os
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+from django.utils import timezone
+
+LARGO_HASH = 32  # 128 bits del SHA-256
+
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        return name  # El nombre definitivo sale del contenido en `_save`
+
+    def _nombre_por_contenido(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        carpeta, archivo = os.path.split(name)
+        extension = os.path.splitext(archivo)[1].lower()
+        return os.path.join(carpeta, digest.hexdigest()[:LARGO_HASH] + extension).replace('\\', '/')
+
+    def _save(self, name, content):
+        nombre = self._nombre_por_contenido(name, content)
+        if self.exists(nombre):
+            return nombre
+        temporal = super()._save(f"{nombre}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temporal), self.path(nombre))
+        return nombre
+
+
+def _campos_de_archivo():
+    for modelo in apps.get_models():
+        for campo in modelo._meta.fields:
+            if isinstance(campo, models.FileField):
+                yield modelo, campo
+
+
+def contar_referencias():
+    """Counter {nombre de archivo: filas que lo usan} sobre todos los FileField."""
+    referencias = Counter()
+    for modelo, campo in _campos_de_archivo():
+        nombres = (
+            modelo._base_manager.exclude(**{f'{campo.name}__isnull': True}).exclude(**{campo.name: ''})
+            .values_list(campo.attname, flat=True)
+        )
+        referencias.update(nombres.iterator())
+    return referencias
+
+
+def carpetas_de_media():
+    """Carpetas de `upload_to` declaradas por los modelos (las que el barrido revisa)."""
+    return sorted({
+        campo.upload_to.strip('/')
+        for _, campo in _campos_de_archivo()
+        if isinstance(campo.upload_to, str) and campo.upload_to.strip('/') and '%' not in campo.upload_to
+    })
+
+
+def barrer_huerfanos(gracia_horas=24, simular=False, storage=None):
+    """
+    Borra los archivos sin referencias más viejos que `gracia_horas`.
+    Retorna {'referenciados', 'compartidos', 'huerfanos': [nombres], 'bytes_liberados'}.
+    """
+    storage = storage or default_storage
+    referencias = contar_referencias()
+    limite = timezone.now() - timedelta(hours=gracia_horas)
+    huerfanos, liberados = [], 0
+
+    for carpeta in carpetas_de_media():
+        try:
+            _, archivos = storage.listdir(carpeta)
+        except FileNotFoundError:
+            continue
+        for archivo in archivos:
+            nombre = f"{carpeta}/{archivo}"
+            if referencias[nombre] or storage.get_modified_time(nombre) > limite:
+                continue
+            liberados += storage.size(nombre)
+            if not simular:
+                storage.delete(nombre)
+            huerfanos.append(nombre)
+
+    return {
+        'referenciados': len(referencias),
+        'compartidos': sum(1 for total in referencias.values() if total > 1),
+        'huerfanos': huerfanos,
+        'bytes_liberados': liberados,
+    }
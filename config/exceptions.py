@@ -30,12 +30,19 @@ def custom_exception_handler(exc, context):
         else:
             # Aquí capturamos errores inesperados (500)
             # REGISTRAR EL ERROR REAL EN LOGS (Crítico para seguridad/debugging)
-            logger.error(f"Error inesperado en {context['view'].__class__.__name__}: {exc}", exc_info=True)
+            vista = context['view'].__class__.__name__
+            request = context.get('request')
+            logger.error(
+                f"Error inesperado en {vista}: {exc}", exc_info=True,
+                extra={'vista': vista, 'metodo': getattr(request, 'method', None), 'ruta': getattr(request, 'path', None)}
+            )
             
             response = Response(
                 {
                     "detail": "Ocurrió un error interno en el servidor.",
-                    "code": "internal_server_error"
+                    "code": "internal_server_error",
+                    # Para que el usuario pueda reportarlo y ubicarlo en los logs
+                    "request_id": getattr(request, 'request_id', None),
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
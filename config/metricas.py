@@ -0,0 +1,222 @@
+# config/metricas.py
+"""
+Métricas internas en formato de exposición de Prometheus.
+
+Registro en proceso de contadores e histogramas con etiquetas. Registrar
+un valor es una suma en memoria bajo un lock (sin E/S). Con varios workers
+(gunicorn) cada proceso vuelca su estado, a lo sumo cada
+`INTERVALO_VOLCADO` segundos, a su propio archivo en `settings.METRICAS_DIR`
+(escritura atómica con os.replace), y `GET /api/metricas/` suma los
+archivos de todos los procesos. Sin METRICAS_DIR solo se exponen las del
+proceso que atiende. Los archivos de procesos terminados se conservan: sus
+contadores siguen sumando (vaciar la carpeta al desplegar).
+
+    CHECKOUTS.inc(resultado='ok')
+    with CORREO_SEGUNDOS.tiempo():
+        ...
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+INTERVALO_VOLCADO = 5  # segundos
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_metricas = {}  # nombre -> Metrica
+_valores = {}   # (nombre, etiquetas) -> float (contador) | [conteos por bucket..., suma] (histograma)
+_proceso = (None, None)  # (pid, archivo de volcado)
+_ultimo_volcado = 0.0
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        _metricas[nombre] = self
+
+    def _clave(self, etiquetas):
+        return (self.nombre, tuple(str(etiquetas.get(e, '')) for e in self.etiquetas))
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            _valores[clave] = _valores.get(clave, 0) + cantidad
+        _volcar_si_toca()
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            # Un conteo por bucket (no acumulado) + el de +Inf, y la suma al final
+            fila = _valores.setdefault(clave, [0] * (len(self.buckets) + 1) + [0.0])
+            fila[bisect_left(self.buckets, valor)] += 1
+            fila[-1] += valor
+        _volcar_si_toca()
+
+    @contextmanager
+    def tiempo(self, **etiquetas):
+        """Observa los segundos que tarda el bloque (también sirve como decorador)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+
+# --- Volcado multiproceso ---
+
+def _directorio():
+    return Path(settings.METRICAS_DIR) if getattr(settings, 'METRICAS_DIR', '') else None
+
+
+def _archivo_proceso():
+    """
+    Nombre del archivo de este proceso, resuelto al volcar: el módulo se
+    importa desde settings, antes del fork de un servidor con preload, y
+    cada worker necesita el suyo.
+    """
+    global _proceso
+    pid = os.getpid()
+    if _proceso[0] != pid:
+        _proceso = (pid, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+    return _proceso[1]
+
+
+def volcar():
+    directorio = _directorio()
+    if directorio is None:
+        return
+    with _lock:
+        datos = [[nombre, list(etiquetas), valor] for (nombre, etiquetas), valor in _valores.items()]
+    archivo = _archivo_proceso()
+    directorio.mkdir(parents=True, exist_ok=True)
+    temporal = directorio / f".{archivo}.tmp"
+    temporal.write_text(json.dumps(datos), encoding='utf-8')
+    os.replace(temporal, directorio / archivo)
+
+
+def _volcar_si_toca():
+    global _ultimo_volcado
+    ahora = time.monotonic()
+    if ahora - _ultimo_volcado >= INTERVALO_VOLCADO and _directorio() is not None:
+        _ultimo_volcado = ahora
+        volcar()
+
+
+atexit.register(volcar)
+
+
+def _sumar(total, valor):
+    if total is None:
+        return list(valor) if isinstance(valor, list) else valor
+    if isinstance(valor, list):
+        return [a + b for a, b in zip(total, valor)]
+    return total + valor
+
+
+def valores_agregados():
+    """{(nombre, etiquetas): valor} sumando todos los procesos."""
+    directorio = _directorio()
+    if directorio is None:
+        with _lock:
+            return {clave: list(v) if isinstance(v, list) else v for clave, v in _valores.items()}
+
+    volcar()
+    agregados = {}
+    for archivo in directorio.glob('*.json'):
+        try:
+            datos = json.loads(archivo.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        for nombre, etiquetas, valor in datos:
+            clave = (nombre, tuple(etiquetas))
+            agregados[clave] = _sumar(agregados.get(clave), valor)
+    return agregados
+
+
+# --- Formato de exposición ---
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus (0.0.4)."""
+    agregados = valores_agregados()
+    lineas = []
+    for nombre, metrica in sorted(_metricas.items()):
+        lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+        for (clave_nombre, etiquetas), valor in sorted(agregados.items()):
+            if clave_nombre != nombre:
+                continue
+            if metrica.tipo == 'counter':
+                lineas.append(f"{nombre}{_etiquetas(metrica.etiquetas, etiquetas)} {valor}")
+                continue
+            acumulado = 0
+            for limite, conteo in zip(metrica.buckets + (float('inf'),), valor[:-1]):
+                acumulado += conteo
+                le = '+Inf' if limite == float('inf') else repr(float(limite))
+                etiquetas_bucket = _etiquetas(metrica.etiquetas, etiquetas, 'le="%s"' % le)
+                lineas.append(f"{nombre}_bucket{etiquetas_bucket} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas(metrica.etiquetas, etiquetas)} {valor[-1]}")
+            lineas.append(f"{nombre}_count{_etiquetas(metrica.etiquetas, etiquetas)} {acumulado}")
+    return '\n'.join(lineas) + '\n'
+
+
+def contar_permiso(permiso, concedido):
+    """Registra el resultado de un `has_permission` y lo retorna (para usar en el return)."""
+    PERMISOS.inc(permiso=type(permiso).__name__, resultado='concedido' if concedido else 'denegado')
+    return concedido
+
+
+# --- Catálogo de métricas del sitio ---
+
+CHECKOUTS = Contador(
+    'reina_checkouts_total', "Intentos de checkout por resultado (ok, rechazado, error)", ['resultado']
+)
+CARRITO_ITEMS = Histograma(
+    'reina_carrito_unidades', "Unidades en el carrito tras cada cambio y al pagar", ['momento'],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 50),
+)
+AGOTADOS = Contador(
+    'reina_agotados_total', "Eventos de falta de stock (agotado por una venta o pedido rechazado)", ['motivo']
+)
+CORREO_SEGUNDOS = Histograma('reina_correo_segundos', "Latencia de envío de correos", ['resultado'])
+WEBP_SEGUNDOS = Histograma('reina_webp_segundos', "Tiempo de conversión de imágenes a WebP")
+CACHE_CONSULTAS = Contador(
+    'reina_cache_consultas_total', "Lecturas de cache por uso y resultado (hit, miss)", ['cache', 'resultado']
+)
+PERMISOS = Contador(
+    'reina_permisos_total', "Chequeos de permisos por clase y resultado", ['permiso', 'resultado']
+)
@@ -0,0 +1,205 @@
+# config/perfilador.py
+"""
+Perfilador por muestreo para peticiones lentas (opcional: PERFILADOR_ACTIVO).
+
+Un solo hilo muestreador recorre cada `PERFILADOR_INTERVALO_MS` las
+peticiones en curso y toma la pila (sys._current_frames) de las que ya
+superaron `PERFILADOR_UMBRAL_MS` o que traen la cabecera `X-Perfilar` con
+una firma emitida por un administrador (`firmar()`, válida
+PERFILADOR_FIRMA_SEGUNDOS). Las peticiones rápidas no se muestrean y,
+con el perfilador apagado, el middleware ni se instala.
+
+Al terminar la petición sus pilas se agregan y se anexan, en una sola
+escritura O_APPEND (segura entre workers), a
+`PERFILES_DIR/<METODO-nombre-de-ruta>.folded` en formato de pilas
+colapsadas ("mod:func;mod:func N"), el de flamegraph.pl y speedscope.
+
+Muestrea por hilo: pensado para workers WSGI síncronos (gunicorn sync/gthread).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.text import slugify
+
+PROFUNDIDAD_MAXIMA = 200
+SAL_FIRMA = 'config.perfilador'
+CABECERA = 'X-Perfilar'
+EXTENSION = '.folded'
+
+logger = logging.getLogger(__name__)
+
+
+def firmar():
+    """Firma para la cabecera X-Perfilar (la emite el endpoint de administradores)."""
+    return signing.TimestampSigner(salt=SAL_FIRMA).sign('perfilar')
+
+
+def firma_valida(valor):
+    if not valor:
+        return False
+    try:
+        signing.TimestampSigner(salt=SAL_FIRMA).unsign(valor, max_age=settings.PERFILADOR_FIRMA_SEGUNDOS)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def colapsar(frame):
+    """'modulo:funcion;...' desde la raíz hasta el frame actual."""
+    marcos = []
+    while frame is not None and len(marcos) < PROFUNDIDAD_MAXIMA:
+        codigo = frame.f_code
+        marcos.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(codigo, 'co_qualname', codigo.co_name)}")
+        frame = frame.f_back
+    return ';'.join(reversed(marcos))
+
+
+class _Peticion:
+    __slots__ = ('inicio', 'forzada', 'pilas')
+
+    def __init__(self, forzada):
+        self.inicio = time.perf_counter()
+        self.forzada = forzada
+        self.pilas = Counter()
+
+
+class Muestreador(threading.Thread):
+    def __init__(self, intervalo, umbral):
+        super().__init__(name='perfilador', daemon=True)
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self._lock = threading.Lock()
+        self._activas = {}  # id del hilo -> _Peticion
+
+    def registrar(self, forzada):
+        peticion = _Peticion(forzada)
+        with self._lock:
+            self._activas[threading.get_ident()] = peticion
+        return peticion
+
+    def quitar(self):
+        """Saca la petición del hilo actual y devuelve una copia de sus pilas."""
+        with self._lock:
+            peticion = self._activas.pop(threading.get_ident(), None)
+            return Counter(peticion.pilas) if peticion else Counter()
+
+    def run(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self._muestrear()
+            except Exception:  # Un fallo no debe matar el hilo: el perfilador quedaría mudo hasta reiniciar
+                logger.exception("Fallo del muestreador del perfilador")
+
+    def _muestrear(self):
+        ahora = time.perf_counter()
+        with self._lock:
+            elegibles = [
+                (hilo, peticion) for hilo, peticion in self._activas.items()
+                if peticion.forzada or ahora - peticion.inicio >= self.umbral
+            ]
+        if not elegibles:
+            return
+        marcos = sys._current_frames()
+        try:
+            pilas = [(peticion, colapsar(marcos[hilo])) for hilo, peticion in elegibles if hilo in marcos]
+        finally:
+            del marcos  # No retener los frames de otros hilos
+        with self._lock:  # `quitar` copia las pilas bajo el mismo lock
+            for peticion, pila in pilas:
+                peticion.pilas[pila] += 1
+
+
+_muestreador = None
+_lock_inicio = threading.Lock()
+
+
+def muestreador():
+    global _muestreador
+    with _lock_inicio:
+        if _muestreador is None:
+            _muestreador = Muestreador(settings.PERFILADOR_INTERVALO_MS / 1000, settings.PERFILADOR_UMBRAL_MS / 1000)
+            _muestreador.start()
+    return _muestreador
+
+
+# --- Almacenamiento por endpoint ---
+
+def _directorio():
+    return Path(settings.PERFILES_DIR)
+
+
+def nombre_endpoint(request):
+    ruta = getattr(request.resolver_match, 'view_name', None) or 'sin-ruta'
+    return slugify(f"{request.method}-{ruta}")
+
+
+def guardar(endpoint, pilas):
+    directorio = _directorio()
+    directorio.mkdir(parents=True, exist_ok=True)
+    contenido = ''.join(f"{pila} {cantidad}\n" for pila, cantidad in pilas.items()).encode('utf-8')
+    descriptor = os.open(directorio / f"{endpoint}{EXTENSION}", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(descriptor, contenido)
+    finally:
+        os.close(descriptor)
+
+
+def endpoints():
+    """[{'endpoint', 'bytes'}] de los perfiles guardados."""
+    directorio = _directorio()
+    if not directorio.is_dir():
+        return []
+    return [
+        {'endpoint': archivo.stem, 'bytes': archivo.stat().st_size}
+        for archivo in sorted(directorio.glob(f'*{EXTENSION}'))
+    ]
+
+
+def _ruta(endpoint):
+    if endpoint != slugify(endpoint):  # Solo nombres generados por `nombre_endpoint` (sin rutas relativas)
+        raise FileNotFoundError(endpoint)
+    return _directorio() / f"{endpoint}{EXTENSION}"
+
+
+def pilas_colapsadas(endpoint):
+    """Pilas del endpoint sumadas entre peticiones, de la más a la menos muestreada."""
+    pilas = Counter()
+    with open(_ruta(endpoint), encoding='utf-8') as archivo:
+        for linea in archivo:
+            pila, _, cantidad = linea.rstrip('\n').rpartition(' ')
+            if pila and cantidad.isdigit():
+                pilas[pila] += int(cantidad)
+    return ''.join(f"{pila} {cantidad}\n" for pila, cantidad in pilas.most_common())
+
+
+def borrar(endpoint):
+    _ruta(endpoint).unlink()
+
+
+class PerfiladorMiddleware:
+    """Después de TrazasMiddleware. Si PERFILADOR_ACTIVO es False, Django lo descarta al iniciar."""
+
+    def __init__(self, get_response):
+        if not settings.PERFILADOR_ACTIVO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        muestras = muestreador()
+        muestras.registrar(firma_valida(request.headers.get(CABECERA)))
+        try:
+            response = self.get_response(request)
+        finally:
+            pilas = muestras.quitar()
+        if pilas:
+            guardar(nombre_endpoint(request), pilas)
+        return response
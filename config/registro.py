@@ -0,0 +1,50 @@
+# config/registro.py
+"""
+Logging estructurado: una línea JSON por registro, con el `request_id` y el
+`correlation_id` de la petición en curso (ver config/trazas.py). Los
+`extra={...}` del llamador se agregan como campos; un mensaje dict se
+mezcla completo (así exporta las trazas `config.trazas`).
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+
+from .trazas import ids_actuales
+
+_CAMPOS_ESTANDAR = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class FiltroContexto(logging.Filter):
+    def filter(self, record):
+        record.request_id, record.correlation_id = ids_actuales()
+        return True
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+        }
+        if isinstance(record.msg, dict):
+            datos.update(record.msg)
+        else:
+            datos['mensaje'] = record.getMessage()
+        datos.update({
+            campo: valor for campo, valor in vars(record).items()
+            if campo not in _CAMPOS_ESTANDAR and valor is not None
+        })
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ArchivoHandler(WatchedFileHandler):
+    """WatchedFileHandler (compatible con logrotate) que crea la carpeta del archivo si falta."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
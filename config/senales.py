@@ -0,0 +1,99 @@
+# config/senales.py
+"""
+Agrupación de efectos secundarios de señales para operaciones masivas.
+
+Los receptores de `post_save`/`post_delete` (correos, contadores, grupos)
+trabajan fila por fila. Dentro de `agrupar_senales()` esos efectos no se
+ejecutan en el momento: se guardan en un lote deduplicado y al salir del
+bloque se aplican como acciones masivas (un correo por tipo de contenido,
+un UPDATE por delta de contador, etc.).
+
+    with agrupar_senales():
+        call_command('loaddata', 'catalogo.json')
+
+    @agrupar_senales(notificar=False)   # backfill silencioso
+    def migrar_datos(): ...
+
+Con `notificar=False` los correos se descartan, pero los efectos que
+mantienen datos consistentes (contadores, grupos) se aplican igual.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_lote_activo = ContextVar('lote_senales', default=None)
+
+
+class LoteSenales:
+    """Efectos pendientes: {accion: {clave: valor}} en orden de llegada."""
+
+    def __init__(self, notificar=True):
+        self.notificar = notificar
+        self.pendientes = {}
+
+    def vaciar(self):
+        pendientes, self.pendientes = self.pendientes, {}
+        for accion, elementos in pendientes.items():
+            try:
+                accion(elementos)
+            except Exception:
+                logger.exception(f"Error aplicando el lote de señales '{accion.__name__}'")
+
+
+@contextmanager
+def agrupar_senales(notificar=True):
+    """
+    Context manager (y decorador) que agrupa los efectos de las señales.
+    Los bloques anidados se unen al lote externo. Si el bloque falla no se
+    aplica nada; si está dentro de una transacción, el lote se aplica al
+    hacer commit.
+    """
+    lote = _lote_activo.get()
+    if lote is not None:
+        yield lote
+        return
+
+    lote = LoteSenales(notificar)
+    token = _lote_activo.set(lote)
+    try:
+        yield lote
+    finally:
+        _lote_activo.reset(token)
+    transaction.on_commit(lote.vaciar)
+
+
+def diferir(accion, clave, valor=None, notificacion=True):
+    """
+    Si hay un lote activo, guarda `valor` bajo `clave` para `accion` (la
+    última escritura gana) y retorna True: el receptor no debe hacer nada más.
+    Sin lote retorna False y el receptor sigue con su comportamiento normal.
+    """
+    lote = _lote_activo.get()
+    if lote is None:
+        return False
+    if notificacion and not lote.notificar:
+        return True
+    lote.pendientes.setdefault(accion, {})[clave] = valor
+    return True
+
+
+def acumular(accion, clave, delta):
+    """Como `diferir`, pero suma los valores por clave (contadores)."""
+    lote = _lote_activo.get()
+    if lote is None:
+        return False
+    elementos = lote.pendientes.setdefault(accion, {})
+    elementos[clave] = elementos.get(clave, 0) + delta
+    return True
+
+
+class AgruparSenalesAdminMixin:
+    """Agrupa las señales de las ediciones masivas del changelist (list_editable y acciones)."""
+
+    def changelist_view(self, request, extra_context=None):
+        with agrupar_senales():
+            return super().changelist_view(request, extra_context)
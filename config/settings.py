@@ -52,7 +52,9 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 DEBUG = os.getenv('DEBUG') == 'True'
 
 
-EMAIL_BACKEND = get_env("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+# El backend real va envuelto para medir los envíos en las trazas (config/trazas.py)
+EMAIL_BACKEND = 'config.trazas.CorreoTrazadoBackend'
+EMAIL_BACKEND_REAL = get_env("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = get_env("EMAIL_HOST", default="smtp.gmail.com")
 EMAIL_PORT = get_env("EMAIL_PORT", default=587, cast="int")
 EMAIL_USE_TLS = get_env("EMAIL_USE_TLS", default=True, cast="bool")
@@ -101,6 +103,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.trazas.TrazasMiddleware',  # Primero: request_id y spans de toda la petición
+    'config.perfilador.PerfiladorMiddleware',  # Solo con PERFILADOR_ACTIVO
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -195,6 +199,22 @@ CORS_ALLOW_ALL_ORIGINS = False
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media direccionada por contenido (un archivo por contenido distinto); los huérfanos los borra `barrer_media`
+STORAGES = {
+    'default': {'BACKEND': 'config.almacenamiento.AlmacenamientoDeduplicado'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+MEDIA_HUERFANOS_GRACIA_HORAS = get_env("MEDIA_HUERFANOS_GRACIA_HORAS", default=24, cast="int")
+
+# Descargas de PDFs (/descargar/): 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile) o 'python' (FileResponse).
+# Con nginx: location DESCARGAS_PREFIJO_INTERNO { internal; alias MEDIA_ROOT/; }
+DESCARGAS_SERVIDOR = get_env("DESCARGAS_SERVIDOR", default="python")
+DESCARGAS_PREFIJO_INTERNO = get_env("DESCARGAS_PREFIJO_INTERNO", default="/media-protegida/")
+
+# Sitemaps y feeds estáticos (comando `generar_sitemaps`): el servidor web sirve SEO_ROOT en SEO_URL
+SEO_ROOT = get_env("SEO_ROOT", default=str(BASE_DIR / 'seo'))
+SEO_URL = get_env("SEO_URL", default=f"{FRONTEND_URL}/")
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -204,17 +224,78 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 
     'EXCEPTION_HANDLER': 'config.exceptions.custom_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.trazas.JSONRendererTrazado',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 
+    # Contadores de ventana fija en el cache compartido (ver config/throttling.py)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'config.throttling.AnonVentanaThrottle',
+        'config.throttling.UserVentanaThrottle',
+        'config.throttling.ScopeVentanaThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '20/minute',  
-        'user': '100/minute'  
+        'user': '100/minute',
+        # Por endpoint (throttle_scope en la vista)
+        'login': '5/minute',
+        'password_reset': '5/hour',
+        'checkout': '10/minute',
+        'catalogo': '120/minute',
+        'autocompletar': '300/minute',  # Una petición por tecla
+        'descargas': '60/minute',  # Los visores de PDF piden varios Range por archivo
     }
 }
 
+# Logging estructurado (config/registro.py): JSON por consola con request_id/correlation_id.
+# Las peticiones de al menos TRAZAS_UMBRAL_MS se exportan con sus spans a TRAZAS_ARCHIVO (JSONL).
+LOG_FORMATO = get_env("LOG_FORMATO", default="json")  # 'json' o 'texto'
+LOG_NIVEL = get_env("LOG_NIVEL", default="INFO")
+TRAZAS_UMBRAL_MS = get_env("TRAZAS_UMBRAL_MS", default=500, cast="int")
+TRAZAS_ARCHIVO = get_env("TRAZAS_ARCHIVO", default=str(BASE_DIR / 'logs' / 'trazas.jsonl'))
+
+# Métricas (config/metricas.py, GET /api/metricas/). Con varios workers: carpeta compartida por
+# todos, vaciada al desplegar (ej: /run/reina-metricas). Vacío = solo las del proceso que atiende.
+METRICAS_DIR = get_env("METRICAS_DIR", default="")
+
+# Perfilador por muestreo (config/perfilador.py, GET /api/perfiles/): pilas de las peticiones que
+# pasan PERFILADOR_UMBRAL_MS o traen X-Perfilar firmado, en pilas colapsadas por endpoint.
+PERFILADOR_ACTIVO = get_env("PERFILADOR_ACTIVO", default=False, cast="bool")
+PERFILADOR_UMBRAL_MS = get_env("PERFILADOR_UMBRAL_MS", default=1000, cast="int")
+PERFILADOR_INTERVALO_MS = get_env("PERFILADOR_INTERVALO_MS", default=10, cast="int")
+PERFILADOR_FIRMA_SEGUNDOS = get_env("PERFILADOR_FIRMA_SEGUNDOS", default=3600, cast="int")
+PERFILES_DIR = get_env("PERFILES_DIR", default=str(BASE_DIR / 'logs' / 'perfiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'contexto': {'()': 'config.registro.FiltroContexto'},
+    },
+    'formatters': {
+        'json': {'()': 'config.registro.FormatoJSON'},
+        'texto': {'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': LOG_FORMATO, 'filters': ['contexto']},
+        'trazas': {'class': 'config.registro.ArchivoHandler', 'filename': TRAZAS_ARCHIVO, 'formatter': 'json', 'delay': True},
+    },
+    'root': {'handlers': ['consola'], 'level': LOG_NIVEL},
+    'loggers': {
+        'django': {'handlers': ['consola'], 'level': LOG_NIVEL, 'propagate': False},
+        # Los 4xx ya quedan en la respuesta; a los logs solo van los 5xx
+        'django.request': {'handlers': ['consola'], 'level': 'ERROR', 'propagate': False},
+        'config.trazas.exportador': {'handlers': ['trazas'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Cache compartido entre workers (throttling). En producción usar Redis: CACHE_URL=redis://localhost:6379/1
+# Con DEBUG=False y el locmem por defecto, `manage.py check` avisa (config.W001): cada worker contaría por su lado
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Ecommerce Reina API',
     'DESCRIPTION': 'API para gestión de Landing Page, Blog y Tienda Virtual',
@@ -302,13 +383,35 @@ CKEDITOR_5_CONFIGS = {
 
 
 BOLD_API_KEY = os.getenv('BOLD_API_KEY', 'TU_API_KEY_PRUEBAS')
-BOLD_SECRET_KEY = os.getenv('BOLD_SECRET_KEY', 'TU_SECRET_KEY_PRUEBAS')
+BOLD_SECRET_KEY = os.getenv('BOLD_SECRET_KEY', '')  # Sin llave el webhook rechaza todo (403)
 BOLD_INTEGRITY_SECRET = os.getenv('BOLD_INTEGRITY_SECRET', 'TU_INTEGRITY_SECRET')
 BOLD_ENVIRONMENT = os.getenv('BOLD_ENVIRONMENT', 'sandbox') # o 'production'
+# Los webhooks del sandbox de Bold vienen firmados con llave vacía: aceptarlos solo en desarrollo (requiere DEBUG)
+BOLD_FIRMA_VACIA_SANDBOX = get_env("BOLD_FIRMA_VACIA_SANDBOX", default=False, cast="bool")
+
+# Horas que un pedido puede quedar PENDIENTE antes de cancelarse y liberar su stock
+PEDIDO_PENDIENTE_TTL_HORAS = get_env("PEDIDO_PENDIENTE_TTL_HORAS", default=48, cast="int")
 
 # Tiempo en segundos (Ejemplo: 24 horas = 86400 segundos)
 PASSWORD_RESET_TIMEOUT = 900
 
+# --- Rendimiento de autenticación ---
+# Costo del hash de contraseñas (iteraciones PBKDF2). Vacío = valor por defecto de Django.
+# Al cambiarlo, cada contraseña se rehashea sola en el siguiente login exitoso.
+PASSWORD_HASH_ITERATIONS = get_env("PASSWORD_HASH_ITERATIONS", default=None, cast="int")
+PASSWORD_HASHERS = [
+    'users.hashers.PBKDF2CostoConfigurableHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# Correos de recuperación en un pool de hilos (False = envío en línea, útil en tests)
+CORREOS_EN_SEGUNDO_PLANO = get_env("CORREOS_EN_SEGUNDO_PLANO", default=True, cast="bool")
+# Miniatura y metadatos de PDFs (marketing.pdfs, requiere poppler-utils) en un pool de hilos
+PDFS_EN_SEGUNDO_PLANO = get_env("PDFS_EN_SEGUNDO_PLANO", default=True, cast="bool")
+
 
 SIMPLE_JWT = {
     # Aquí defines cuánto dura el token de acceso (ej: 1 hora)
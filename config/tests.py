@@ -0,0 +1,422 @@
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from marketing.models import Categoria, Testimonio
+from store.models import Favorito, Producto
+from . import metricas, perfilador
+from .registro import FiltroContexto, FormatoJSON
+from .senales import agrupar_senales, diferir
+from .trazas import CorreoTrazadoBackend, TrazasMiddleware, span
+from .views import PerfilesView
+
+User = get_user_model()
+
+
+class PerfilesTemporalesMixin:
+    """PERFILES_DIR en una carpeta temporal que se borra al terminar cada test."""
+
+    def usar_perfiles_temporales(self, **ajustes):
+        self.perfiles = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.perfiles, ignore_errors=True)
+        override = override_settings(PERFILES_DIR=str(self.perfiles), **ajustes)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class PilasColapsadasTests(PerfilesTemporalesMixin, SimpleTestCase):
+
+    def setUp(self):
+        self.usar_perfiles_temporales()
+
+    def test_colapsar_va_de_la_raiz_al_frame_actual(self):
+        pila = perfilador.colapsar(sys._getframe())
+
+        self.assertTrue(pila.endswith(
+            'config.tests:PilasColapsadasTests.test_colapsar_va_de_la_raiz_al_frame_actual'
+        ))
+        self.assertIn('unittest.case:TestCase.run;', pila)
+
+    def test_guardados_se_suman_de_la_mas_a_la_menos_muestreada(self):
+        perfilador.guardar('get-producto-list', Counter({'views:get;orm:query': 2, 'views:get': 1}))
+        perfilador.guardar('get-producto-list', Counter({'views:get': 5}))
+
+        self.assertEqual(
+            perfilador.pilas_colapsadas('get-producto-list'),
+            "views:get 6\nviews:get;orm:query 2\n",
+        )
+        self.assertEqual(perfilador.endpoints(), [{'endpoint': 'get-producto-list', 'bytes': 46}])
+
+    def test_quitar_devuelve_una_copia_de_las_pilas(self):
+        muestras = perfilador.Muestreador(intervalo=1, umbral=0)  # Sin arrancar el hilo
+        peticion = muestras.registrar(forzada=False)
+        muestras._muestrear()
+
+        pilas = muestras.quitar()
+        peticion.pilas['tarde:muestra'] += 1  # Muestra que llega después de quitar la petición
+
+        self.assertEqual(sum(pilas.values()), 1)
+        self.assertNotIn('tarde:muestra', pilas)
+        self.assertEqual(muestras.quitar(), Counter())
+
+    def test_nombres_que_no_son_slug_no_llegan_al_disco(self):
+        for nombre in ('../secretos', 'GET-Perfiles', 'get perfiles'):
+            with self.subTest(nombre=nombre), self.assertRaises(FileNotFoundError):
+                perfilador.pilas_colapsadas(nombre)
+
+
+@override_settings(PERFILADOR_ACTIVO=True, PERFILADOR_INTERVALO_MS=1, PERFILADOR_UMBRAL_MS=60000)
+class PerfiladorMiddlewareTests(PerfilesTemporalesMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usar_perfiles_temporales()
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'clave-segura'))
+
+    def listar(self, **cabeceras):
+        def lento():
+            time.sleep(0.05)
+            return []
+
+        with mock.patch.object(perfilador, 'endpoints', side_effect=lento):
+            response = self.client.get('/api/perfiles/', headers=cabeceras)
+        self.assertEqual(response.status_code, 200)
+
+    def test_firma_valida_fuerza_el_muestreo(self):
+        firma = self.client.post('/api/perfiles/firma/').json()
+
+        self.listar(**{firma['cabecera']: firma['firma']})
+
+        self.assertEqual(sorted(p.name for p in self.perfiles.iterdir()), ['get-perfiles.folded'])
+        pilas = perfilador.pilas_colapsadas('get-perfiles')
+        for linea in pilas.splitlines():
+            pila, _, cantidad = linea.rpartition(' ')
+            self.assertTrue(cantidad.isdigit())
+            self.assertNotIn(' ', pila)
+        self.assertIn('config.views:PerfilesView.get;', pilas)
+
+    def test_peticion_rapida_o_con_firma_invalida_no_deja_archivo(self):
+        self.listar()
+        self.listar(**{perfilador.CABECERA: 'perfilar:falsa'})
+
+        self.assertEqual(list(self.perfiles.iterdir()), [])
+
+    def test_endpoint_que_no_es_slug_da_404(self):
+        (self.perfiles / f'GET-Perfiles{perfilador.EXTENSION}').write_text("views:get 1\n")
+
+        self.assertEqual(self.client.get('/api/perfiles/GET-Perfiles/').status_code, 404)
+        self.assertEqual(self.client.delete('/api/perfiles/GET-Perfiles/').status_code, 404)
+        self.assertTrue((self.perfiles / f'GET-Perfiles{perfilador.EXTENSION}').exists())
+
+    def test_ver_y_borrar_perfil(self):
+        perfilador.guardar('get-producto-list', Counter({'views:get': 3}))
+
+        response = self.client.get('/api/perfiles/get-producto-list/')
+        self.assertEqual(response.content, b"views:get 3\n")
+        self.assertEqual(self.client.delete('/api/perfiles/get-producto-list/').status_code, 204)
+        self.assertEqual(self.client.get('/api/perfiles/get-producto-list/').status_code, 404)
+
+
+class AgruparSenalesTests(TestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        self.cliente = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.admin = User.objects.create_user('admin@example.com', 'clave-segura', first_name='Luis')
+        self.admin.groups.add(Group.objects.get_or_create(name='Administrador')[0])
+        mail.outbox = []  # Correos de bienvenida
+
+    def crear_productos(self, cantidad):
+        return [
+            Producto.objects.create(
+                nombre=f"Producto {i}", precio=1000, stock=5, categoria=self.categoria, descripcion="Descripción"
+            )
+            for i in range(cantidad)
+        ]
+
+    def test_sin_lote_cada_fila_envia_su_correo(self):
+        self.assertFalse(diferir(print, 'clave'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.crear_productos(3)
+
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_lote_envia_un_solo_resumen(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with agrupar_senales():
+                self.crear_productos(3)
+                Testimonio.objects.create(usuario=self.cliente, contenido="Muy buenas semillas")
+                Testimonio.objects.create(usuario=self.cliente, contenido="Llegó rápido")
+
+        self.assertEqual(
+            sorted(correo.subject for correo in mail.outbox),
+            ["🎁 3 Nuevos Productos", "💬 2 Nuevos Comentarios Pendientes"],
+        )
+        moderacion = next(correo for correo in mail.outbox if correo.subject.startswith("💬"))
+        self.assertEqual(moderacion.to, ['admin@example.com'])
+
+    def test_bloques_anidados_se_unen_al_lote_externo(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with agrupar_senales() as externo:
+                self.crear_productos(1)
+                with agrupar_senales(notificar=False) as interno:
+                    self.assertIs(interno, externo)
+                    self.crear_productos(2)
+                self.assertEqual(callbacks, [])  # El bloque interno no aplica nada al salir
+
+        self.assertEqual([correo.subject for correo in mail.outbox], ["🎁 3 Nuevos Productos"])
+
+    def test_rollback_no_envia_nada(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                with agrupar_senales():
+                    self.crear_productos(2)
+                    raise RuntimeError("falla la importación")
+            with self.assertRaises(RuntimeError), agrupar_senales():
+                self.crear_productos(2)
+                raise RuntimeError("falla sin transacción propia")
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(mail.outbox, [])
+
+    def test_sin_notificar_aplica_igual_los_contadores(self):
+        producto, otro = self.crear_productos(2)
+        mail.outbox = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with agrupar_senales(notificar=False):
+                self.crear_productos(2)
+                Favorito.objects.create(usuario=self.cliente, producto=producto)
+                Favorito.objects.create(usuario=self.admin, producto=producto)
+                Favorito.objects.create(usuario=self.cliente, producto=otro).delete()
+
+        self.assertEqual(mail.outbox, [])
+        producto.refresh_from_db()
+        otro.refresh_from_db()
+        self.assertEqual((producto.total_favoritos, otro.total_favoritos), (2, 0))
+
+    def test_efectos_solo_al_hacer_commit(self):
+        producto, = self.crear_productos(1)
+        mail.outbox = []
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with agrupar_senales():
+                self.crear_productos(2)
+                Favorito.objects.create(usuario=self.cliente, producto=producto)
+
+        producto.refresh_from_db()
+        self.assertEqual((len(mail.outbox), producto.total_favoritos), (0, 0))
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+
+        producto.refresh_from_db()
+        self.assertEqual((len(mail.outbox), producto.total_favoritos), (1, 1))
+
+
+class MetricasTests(SimpleTestCase):
+
+    def setUp(self):
+        for registro in (metricas._metricas, metricas._valores):
+            parche = mock.patch.dict(registro, clear=True)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.ventas = metricas.Contador('prueba_ventas_total', "Ventas de prueba", ['motivo'])
+        self.latencia = metricas.Histograma('prueba_segundos', "Latencia de prueba", ['ruta'], buckets=(0.25, 1))
+
+    def usar_directorio_temporal(self):
+        directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        override = override_settings(METRICAS_DIR=str(directorio))
+        override.enable()
+        self.addCleanup(override.disable)
+        return directorio
+
+    def test_exposicion_con_buckets_acumulados(self):
+        for segundos in (0.25, 0.5, 0.5, 3):
+            self.latencia.observar(segundos, ruta='/api/productos/')
+        self.ventas.inc(motivo='dice "hola"')
+        self.ventas.inc(2, motivo='dice "hola"')
+
+        self.assertEqual(metricas.exposicion(), (
+            '# HELP prueba_segundos Latencia de prueba\n'
+            '# TYPE prueba_segundos histogram\n'
+            'prueba_segundos_bucket{ruta="/api/productos/",le="0.25"} 1\n'
+            'prueba_segundos_bucket{ruta="/api/productos/",le="1.0"} 3\n'
+            'prueba_segundos_bucket{ruta="/api/productos/",le="+Inf"} 4\n'
+            'prueba_segundos_sum{ruta="/api/productos/"} 4.25\n'
+            'prueba_segundos_count{ruta="/api/productos/"} 4\n'
+            '# HELP prueba_ventas_total Ventas de prueba\n'
+            '# TYPE prueba_ventas_total counter\n'
+            'prueba_ventas_total{motivo="dice \\"hola\\""} 3\n'
+        ))
+
+    def test_suma_los_archivos_de_todos_los_procesos(self):
+        directorio = self.usar_directorio_temporal()
+        (directorio / '4242-otro.json').write_text(json.dumps([
+            ['prueba_ventas_total', ['ok'], 5],
+            ['prueba_segundos', ['/'], [1, 0, 1, 2.5]],
+        ]))
+        self.ventas.inc(motivo='ok')
+        self.latencia.observar(0.5, ruta='/')
+
+        exposicion = metricas.exposicion().splitlines()
+
+        self.assertIn('prueba_ventas_total{motivo="ok"} 6', exposicion)
+        self.assertIn('prueba_segundos_bucket{ruta="/",le="0.25"} 1', exposicion)
+        self.assertIn('prueba_segundos_bucket{ruta="/",le="1.0"} 2', exposicion)
+        self.assertIn('prueba_segundos_count{ruta="/"} 3', exposicion)
+        self.assertIn('prueba_segundos_sum{ruta="/"} 3.0', exposicion)
+        self.assertEqual(len(list(directorio.glob('*.json'))), 2)
+
+    def test_cada_proceso_vuelca_en_su_propio_archivo(self):
+        self.ventas.inc(motivo='ok')
+        directorio = self.usar_directorio_temporal()
+
+        with mock.patch.object(metricas.os, 'getpid', return_value=101):
+            metricas.volcar()
+        with mock.patch.object(metricas.os, 'getpid', return_value=202):  # Worker hijo tras el fork
+            metricas.volcar()
+
+        archivos = sorted(archivo.name.split('-')[0] for archivo in directorio.glob('*.json'))
+        self.assertEqual(archivos, ['101', '202'])
+
+
+class TrazasTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_devuelve_los_ids_recibidos(self):
+        response = self.client.get('/api/productos/', headers={
+            'X-Request-ID': 'proxy-7f3a.1', 'X-Correlation-ID': 'app-movil-42',
+        })
+
+        self.assertEqual(response['X-Request-ID'], 'proxy-7f3a.1')
+        self.assertEqual(response['X-Correlation-ID'], 'app-movil-42')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", total;dur=[\d.]+$')
+
+    def test_ids_invalidos_se_reemplazan(self):
+        for invalido in ('con espacios', 'x' * 65, '<script>'):
+            with self.subTest(invalido=invalido):
+                response = self.client.get('/api/productos/', headers={
+                    'X-Request-ID': invalido, 'X-Correlation-ID': invalido,
+                })
+                self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+                self.assertEqual(response['X-Correlation-ID'], response['X-Request-ID'])
+
+    def test_error_500_incluye_el_request_id(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'clave-segura'))
+
+        with mock.patch.object(PerfilesView, 'get', side_effect=RuntimeError("falla")), \
+                self.assertLogs('config.exceptions', 'ERROR'), self.assertLogs('django.request', 'ERROR'):
+            response = self.client.get('/api/perfiles/', headers={'X-Request-ID': 'soporte-123'})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['request_id'], 'soporte-123')
+
+    @override_settings(TRAZAS_UMBRAL_MS=0)
+    def test_exporta_el_arbol_de_spans_con_tiempo_propio(self):
+        def vista(request):
+            with span('serializar', filas=2):
+                User.objects.count()
+                with span('webp'):
+                    time.sleep(0.01)
+            return HttpResponse('ok')
+
+        peticion = RequestFactory().get('/prueba/', headers={'X-Request-ID': 'lenta-1'})
+        with self.assertLogs('config.trazas.exportador', 'INFO') as registros:
+            TrazasMiddleware(vista)(peticion)
+
+        linea = json.loads(FormatoJSON().format(registros.records[0]))
+        self.assertEqual((linea['request_id'], linea['ruta'], linea['estado']), ('lenta-1', '/prueba/', 200))
+        self.assertEqual(linea['consultas'], 1)
+        serializar, consulta, webp = linea['spans']
+        self.assertEqual(
+            [(s['id'], s['padre'], s['nombre']) for s in linea['spans']],
+            [(0, None, 'serializar'), (1, 0, 'db'), (2, 0, 'webp')],
+        )
+        self.assertEqual(serializar['filas'], 2)
+        self.assertEqual(webp['propio_ms'], webp['duracion_ms'])
+        self.assertAlmostEqual(
+            serializar['propio_ms'], serializar['duracion_ms'] - consulta['duracion_ms'] - webp['duracion_ms'], places=1
+        )
+
+    def test_span_fuera_de_una_peticion_no_hace_nada(self):
+        registro = logging.makeLogRecord({})
+        with span('suelto'):
+            FiltroContexto().filter(registro)
+
+        self.assertEqual((registro.request_id, registro.correlation_id), (None, None))
+
+
+class FormatoJSONTests(SimpleTestCase):
+
+    def formatear(self, mensaje, *args, **extra):
+        registro = logging.getLogger('prueba').makeRecord(
+            'prueba', logging.ERROR, __file__, 1, mensaje, args, None, extra=extra
+        )
+        FiltroContexto().filter(registro)
+        return json.loads(FormatoJSON().format(registro))
+
+    def test_agrega_los_campos_extra(self):
+        linea = self.formatear("Error en %s", 'CheckoutView', vista='CheckoutView', metodo='POST', ruta=None)
+
+        self.assertEqual(linea['mensaje'], "Error en CheckoutView")
+        self.assertEqual((linea['nivel'], linea['logger']), ('ERROR', 'prueba'))
+        self.assertEqual((linea['vista'], linea['metodo']), ('CheckoutView', 'POST'))
+        self.assertNotIn('ruta', linea)  # Los None se omiten
+        self.assertNotIn('request_id', linea)  # Fuera de una petición
+
+    def test_mensaje_dict_se_mezcla_completo(self):
+        linea = self.formatear({'request_id': 'abc', 'duracion_ms': 812.5})
+
+        self.assertEqual((linea['request_id'], linea['duracion_ms']), ('abc', 812.5))
+        self.assertNotIn('mensaje', linea)
+
+
+@override_settings(EMAIL_BACKEND_REAL='django.core.mail.backends.locmem.EmailBackend')
+class CorreoTrazadoBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        parche = mock.patch.dict(metricas._valores, clear=True)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def enviar(self, conexion):
+        return EmailMessage("Asunto", "Cuerpo", 'tienda@example.com', ['ana@example.com'], connection=conexion).send()
+
+    def test_delega_en_el_backend_real(self):
+        conexion = CorreoTrazadoBackend()
+
+        self.assertEqual(self.enviar(conexion), 1)
+
+        self.assertEqual(type(conexion.real).__module__, 'django.core.mail.backends.locmem')
+        self.assertEqual([correo.subject for correo in mail.outbox], ["Asunto"])
+        (clave, fila), = metricas._valores.items()
+        self.assertEqual((clave, sum(fila[:-1])), (('reina_correo_segundos', ('ok',)), 1))
+
+    def test_error_del_backend_real_se_propaga_y_se_cuenta(self):
+        conexion = CorreoTrazadoBackend()
+
+        with mock.patch.object(conexion.real, 'send_messages', side_effect=ConnectionError), \
+                self.assertRaises(ConnectionError):
+            self.enviar(conexion)
+
+        self.assertEqual(list(metricas._valores), [('reina_correo_segundos', ('error',))])
@@ -0,0 +1,119 @@
+# config/throttling.py
+"""
+Throttling de ventana fija sobre el cache compartido (CACHES['default']).
+
+Los throttles de DRF guardan por cliente una lista de timestamps que se
+lee, recorta y reescribe completa en cada petición. Aquí cada cliente tiene
+un solo contador entero por ventana (`scope:ident:ventana`) que se
+incrementa con `cache.add` + `cache.incr`: dos operaciones atómicas en
+Redis/Memcached, costo constante y límites reales entre todos los workers.
+
+Las vistas pueden declarar `throttle_scope` (login, password_reset,
+checkout, catalogo). En ese caso aplica solo la tasa del scope y no las
+generales `anon`/`user`.
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class VentanaFijaThrottle(SimpleRateThrottle):
+    """Base: un contador por (scope, cliente, ventana de `duration` segundos)."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        ahora = time.time()
+        ventana = int(ahora // self.duration)
+        self.fin_ventana = (ventana + 1) * self.duration
+        clave = f"{self.key}:{ventana}"
+
+        # add solo crea si no existe; incr es atómico en el backend
+        self.cache.add(clave, 0, self.duration + 1)
+        try:
+            self.conteo = self.cache.incr(clave)
+        except ValueError:  # La clave expiró entre add e incr
+            self.cache.set(clave, 1, self.duration + 1)
+            self.conteo = 1
+
+        return self.conteo <= self.num_requests
+
+    def wait(self):
+        return max(self.fin_ventana - time.time(), 0)
+
+
+def _tiene_scope(view):
+    return bool(getattr(view, 'throttle_scope', None))
+
+
+class AnonVentanaThrottle(VentanaFijaThrottle):
+    """Límite general para anónimos (por IP)."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if _tiene_scope(view) or (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserVentanaThrottle(VentanaFijaThrottle):
+    """Límite general por usuario autenticado (o IP si es anónimo)."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if _tiene_scope(view):
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ScopeVentanaThrottle(VentanaFijaThrottle):
+    """
+    Límite por endpoint según `view.throttle_scope`. El scope puede ser una
+    propiedad para aplicarlo solo a ciertas acciones del viewset.
+    """
+
+    def __init__(self):
+        # La tasa depende de la vista; se resuelve en allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def revisar_cache_compartido(app_configs, **kwargs):
+    """
+    Chequeo de sistema (registrado en `users.apps`): sin DEBUG, el cache por
+    defecto no puede ser de memoria local, porque cada worker llevaría sus
+    propios contadores y los límites se multiplicarían por el número de workers.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('.LocMemCache'):
+        return []
+    return [checks.Warning(
+        "CACHES['default'] es de memoria local: los límites de throttling no se comparten entre workers.",
+        hint="Configura CACHE_URL con un cache compartido, ej: redis://localhost:6379/1.",
+        id='config.W001',
+    )]
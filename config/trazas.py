@@ -0,0 +1,180 @@
+# config/trazas.py
+"""
+Trazas por petición: ids de correlación y spans con tiempos.
+
+`TrazasMiddleware` abre una traza por petición con su `request_id` (el
+`X-Request-ID` del proxy o uno nuevo) y su `correlation_id`
+(`X-Correlation-ID` del cliente, o el mismo request_id) y los devuelve en
+la respuesta junto a `Server-Timing` (db y total). Dentro de la traza:
+- cada consulta SQL es un span 'db' (execute_wrapper de la conexión),
+- `span('nombre', **atributos)` mide cualquier bloque o función
+  (ej: 'webp', 'serializar'); fuera de una petición no hace nada,
+- `JSONRendererTrazado` mide el render y `CorreoTrazadoBackend` los envíos
+  (también en la métrica `reina_correo_segundos`).
+
+Las peticiones que tardan al menos `TRAZAS_UMBRAL_MS` se exportan como una
+línea JSON (con sus spans y el tiempo propio de cada uno, sin el de sus
+hijos) al logger 'config.trazas.exportador', que en settings escribe en
+`TRAZAS_ARCHIVO`. El resto no deja rastro: el costo por petición es un par
+de perf_counter por span.
+"""
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from .metricas import CORREO_SEGUNDOS
+
+MAX_SPANS = 1000
+LARGO_SQL = 300
+_ID_VALIDO = re.compile(r'^[\w.-]{1,64}$')
+
+exportador = logging.getLogger('config.trazas.exportador')
+
+_traza = ContextVar('traza', default=None)
+
+
+class Traza:
+    __slots__ = ('request_id', 'correlation_id', 'inicio', 'spans', 'pila', 'descartados')
+
+    def __init__(self, request_id, correlation_id):
+        self.request_id = request_id
+        self.correlation_id = correlation_id
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self.pila = []
+        self.descartados = 0
+
+    def milisegundos(self, instante=None):
+        return round(((instante or time.perf_counter()) - self.inicio) * 1000, 2)
+
+
+def ids_actuales():
+    """(request_id, correlation_id) de la petición en curso, o (None, None)."""
+    traza = _traza.get()
+    return (traza.request_id, traza.correlation_id) if traza else (None, None)
+
+
+@contextmanager
+def span(nombre, **atributos):
+    """Mide el bloque como hijo del span abierto. También sirve como decorador."""
+    traza = _traza.get()
+    if traza is None or len(traza.spans) >= MAX_SPANS:
+        if traza is not None:
+            traza.descartados += 1
+        yield
+        return
+
+    registro = {'id': len(traza.spans), 'padre': traza.pila[-1] if traza.pila else None, 'nombre': nombre, **atributos}
+    traza.spans.append(registro)
+    traza.pila.append(registro['id'])
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        registro['error'] = type(e).__name__
+        raise
+    finally:
+        traza.pila.pop()
+        registro['inicio_ms'] = traza.milisegundos(inicio)
+        registro['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def _span_consulta(execute, sql, params, many, context):
+    with span('db', sql=sql[:LARGO_SQL]):
+        return execute(sql, params, many, context)
+
+
+def _con_tiempo_propio(spans):
+    """Agrega `propio_ms`: la duración de cada span menos la de sus hijos directos."""
+    hijos = {}
+    for registro in spans:
+        if registro['padre'] is not None:
+            hijos[registro['padre']] = hijos.get(registro['padre'], 0) + registro.get('duracion_ms', 0)
+    for registro in spans:
+        registro['propio_ms'] = round(registro.get('duracion_ms', 0) - hijos.get(registro['id'], 0), 2)
+    return spans
+
+
+class TrazasMiddleware:
+    """Va primero en MIDDLEWARE para que la traza cubra toda la petición."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        request_id = request_id if _ID_VALIDO.match(request_id) else uuid.uuid4().hex
+        correlation_id = request.headers.get('X-Correlation-ID', '')
+        correlation_id = correlation_id if _ID_VALIDO.match(correlation_id) else request_id
+        request.request_id = request_id
+
+        traza = Traza(request_id, correlation_id)
+        token = _traza.set(traza)
+        try:
+            with connection.execute_wrapper(_span_consulta):
+                response = self.get_response(request)
+        finally:
+            _traza.reset(token)
+
+        total_ms = traza.milisegundos()
+        consultas = [s for s in traza.spans if s['nombre'] == 'db']
+        db_ms = round(sum(s.get('duracion_ms', 0) for s in consultas), 2)
+
+        response['X-Request-ID'] = request_id
+        response['X-Correlation-ID'] = correlation_id
+        response['Server-Timing'] = f'db;dur={db_ms};desc="{len(consultas)} consultas", total;dur={total_ms}'
+
+        if total_ms >= settings.TRAZAS_UMBRAL_MS:
+            exportador.info({
+                'request_id': request_id,
+                'correlation_id': correlation_id,
+                'metodo': request.method,
+                'ruta': request.path,
+                'estado': response.status_code,
+                'duracion_ms': total_ms,
+                'db_ms': db_ms,
+                'consultas': len(consultas),
+                'spans_descartados': traza.descartados,
+                'spans': _con_tiempo_propio(traza.spans),
+            })
+        return response
+
+
+class JSONRendererTrazado(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class CorreoTrazadoBackend(BaseEmailBackend):
+    """Envuelve el backend real (`EMAIL_BACKEND_REAL`) con un span 'correo' por envío."""
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.real = get_connection(settings.EMAIL_BACKEND_REAL, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        return self.real.open()
+
+    def close(self):
+        return self.real.close()
+
+    def send_messages(self, email_messages):
+        inicio, resultado = time.perf_counter(), 'ok'
+        try:
+            with span('correo', mensajes=len(email_messages)):
+                return self.real.send_messages(email_messages)
+        except Exception:
+            resultado = 'error'
+            raise
+        finally:
+            CORREO_SEGUNDOS.observar(time.perf_counter() - inicio, resultado=resultado)
@@ -19,6 +19,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from .views import MetricasView, PerfilesView, PerfilView, FirmaPerfiladorView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +27,10 @@ urlpatterns = [
     path('api/', include('store.urls')),
     path('api/usuarios/', include('users.urls')),
     path("ckeditor5/", include('django_ckeditor_5.urls')),
+    path('api/metricas/', MetricasView.as_view(), name='metricas'),
+    path('api/perfiles/', PerfilesView.as_view(), name='perfiles'),
+    path('api/perfiles/firma/', FirmaPerfiladorView.as_view(), name='perfiles-firma'),
+    path('api/perfiles/<slug:endpoint>/', PerfilView.as_view(), name='perfil'),
     # --- ZONA SWAGGER / DOCUMENTACIÓN ---
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
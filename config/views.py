@@ -0,0 +1,98 @@
+# config/views.py
+"""Endpoints transversales del sitio (monitoreo)."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.permissions import IsAdministrador
+from . import perfilador
+from .metricas import exposicion
+
+
+class MetricasView(APIView):
+    """Solo Administrador: el scraper de Prometheus se autentica con un token JWT de servicio."""
+    permission_classes = [IsAdministrador]
+
+    @extend_schema(
+        tags=['Monitoreo'],
+        summary="Métricas (Prometheus)",
+        description="Contadores e histogramas internos en formato de exposición de texto, sumados entre workers.",
+        responses={(200, 'text/plain'): OpenApiTypes.STR},
+    )
+    def get(self, request):
+        return HttpResponse(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class PerfilesView(APIView):
+    permission_classes = [IsAdministrador]
+
+    @extend_schema(
+        tags=['Monitoreo'],
+        operation_id='perfiles_list',
+        summary="Perfiles por endpoint",
+        description="Endpoints con pilas muestreadas por el perfilador (`METODO-nombre-de-ruta`) y el tamaño de cada archivo.",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        return Response({'activo': settings.PERFILADOR_ACTIVO, 'endpoints': perfilador.endpoints()})
+
+
+class PerfilView(APIView):
+    permission_classes = [IsAdministrador]
+
+    def _no_encontrado(self, endpoint):
+        return NotFound({"detail": f"No hay muestras para '{endpoint}'."})
+
+    @extend_schema(
+        tags=['Monitoreo'],
+        summary="Pilas colapsadas de un endpoint",
+        description="Formato de flamegraph.pl / speedscope: una pila `mod:func;mod:func` y su cantidad de muestras por línea.",
+        responses={(200, 'text/plain'): OpenApiTypes.STR, 404: OpenApiResponse(description="Sin muestras")},
+    )
+    def get(self, request, endpoint):
+        try:
+            contenido = perfilador.pilas_colapsadas(endpoint)
+        except FileNotFoundError:
+            raise self._no_encontrado(endpoint)
+        return HttpResponse(contenido, content_type='text/plain; charset=utf-8')
+
+    @extend_schema(
+        tags=['Monitoreo'],
+        summary="Borrar las muestras de un endpoint",
+        responses={204: None, 404: OpenApiResponse(description="Sin muestras")},
+    )
+    def delete(self, request, endpoint):
+        try:
+            perfilador.borrar(endpoint)
+        except FileNotFoundError:
+            raise self._no_encontrado(endpoint)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FirmaPerfiladorView(APIView):
+    permission_classes = [IsAdministrador]
+
+    @extend_schema(
+        tags=['Monitoreo'],
+        summary="Firma para perfilar peticiones",
+        description=(
+            "Valor para la cabecera `X-Perfilar`: las peticiones que la traen se muestrean completas "
+            "aunque no pasen el umbral. Vale `PERFILADOR_FIRMA_SEGUNDOS`."
+        ),
+        request=None,
+        responses={201: OpenApiTypes.OBJECT},
+    )
+    def post(self, request):
+        return Response({
+            'cabecera': perfilador.CABECERA,
+            'firma': perfilador.firmar(),
+            'expira': timezone.now() + timedelta(seconds=settings.PERFILADOR_FIRMA_SEGUNDOS),
+        }, status=status.HTTP_201_CREATED)
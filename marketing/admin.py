@@ -1,4 +1,7 @@
 from django.contrib import admin
+
+from config.senales import AgruparSenalesAdminMixin
+from .slugs import SlugUnicoAdminForm
 from .models import (
     Servicio, 
     Noticia, 
@@ -10,25 +13,28 @@ from .models import (
 )
 
 @admin.register(Servicio)
-class ServicioAdmin(admin.ModelAdmin):
+class ServicioAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
     list_display = ('titulo', 'orden', 'slug', 'created_at')
     list_editable = ('orden',) # Permite cambiar el orden rápido sin entrar a editar
     prepopulated_fields = {'slug': ('titulo',)}
+    form = SlugUnicoAdminForm  # Título repetido: usa el siguiente slug libre en vez de fallar
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'tipo', 'slug')
     list_filter = ('tipo',) # Filtro lateral para ver solo noticias, blogs, etc.
     prepopulated_fields = {'slug': ('nombre',)}
+    form = SlugUnicoAdminForm
 
 @admin.register(Noticia)
-class NoticiaAdmin(admin.ModelAdmin):
+class NoticiaAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
     # Ahora sí funcionará porque los campos ya existen en el modelo
     list_display = ('titulo', 'categoria', 'fecha_publicacion', 'publicado', 'es_destacada')
     list_editable = ('publicado', 'es_destacada', 'categoria') # Para activar/desactivar rápido sin entrar
     list_filter = ('publicado', 'es_destacada', 'categoria', 'fecha_publicacion')
     search_fields = ('titulo', 'contenido')
     prepopulated_fields = {'slug': ('titulo',)}
+    form = SlugUnicoAdminForm
 
 @admin.register(Investigacion)
 class InvestigacionAdmin(admin.ModelAdmin):
@@ -36,25 +42,28 @@ class InvestigacionAdmin(admin.ModelAdmin):
     list_filter = ('categoria', 'fecha_publicacion', 'publicado')
     search_fields = ('titulo', 'resumen')
     prepopulated_fields = {'slug': ('titulo',)}
+    form = SlugUnicoAdminForm
 
 @admin.register(Testimonio)
-class TestimonioAdmin(admin.ModelAdmin):
+class TestimonioAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
     list_display = ('__str__', 'es_visible', 'created_at')
     list_editable = ('es_visible',)
     list_filter = ('es_visible', 'created_at')
 
 @admin.register(Blog)
-class BlogAdmin(admin.ModelAdmin):
+class BlogAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
     list_display = ('titulo', 'categoria', 'fecha_publicacion', 'autor', 'publicado', 'es_destacado')
     list_editable = ('publicado', 'es_destacado') 
     list_filter = ('categoria', 'publicado', 'es_destacado', 'fecha_publicacion')
     search_fields = ('titulo', 'resumen', 'contenido')
     prepopulated_fields = {'slug': ('titulo',)}
+    form = SlugUnicoAdminForm
 
 @admin.register(Protocolo)
-class ProtocoloAdmin(admin.ModelAdmin):
+class ProtocoloAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
     list_display = ('titulo', 'orden', 'es_visible', 'archivo_pdf')
     list_editable = ('orden', 'es_visible')
     search_fields = ('titulo',)
     prepopulated_fields = {'slug': ('titulo',)}
+    form = SlugUnicoAdminForm
 
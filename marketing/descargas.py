@@ -0,0 +1,137 @@
+# marketing/descargas.py
+"""
+Descarga de PDFs con autorización y conteo en Django y transferencia en el
+servidor web.
+
+Según `settings.DESCARGAS_SERVIDOR`:
+- 'nginx': respuesta vacía con `X-Accel-Redirect` a DESCARGAS_PREFIJO_INTERNO
+  (location `internal` con alias a MEDIA_ROOT). nginx envía los bytes y
+  resuelve los Range.
+- 'apache': `X-Sendfile` con la ruta absoluta (mod_xsendfile).
+- 'python': FileResponse (wsgi.file_wrapper / sendfile del servidor WSGI) y,
+  para `Range: bytes=...`, 206 leyendo solo el tramo pedido.
+
+Con el almacenamiento por contenido el nombre del archivo es su hash, así
+que sirve directo como ETag (e If-Range).
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+TAMANO_BLOQUE = 64 * 1024
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class DescargaRenderer(BaseRenderer):
+    """Acepta cualquier Accept (application/pdf, */*) en la descarga; los errores salen como JSON."""
+    media_type = '*/*'
+    format = 'pdf'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Solo se renderizan errores (el archivo va en un HttpResponse aparte). DRF ya puso como
+        # Content-Type el tipo aceptado por el cliente (ej: application/pdf): el cuerpo es JSON
+        respuesta = (renderer_context or {}).get('response')
+        if respuesta is not None:
+            respuesta['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+def _rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivo de un Range de un solo tramo, None si no aplica
+    (sin Range, varios tramos o sintaxis inválida: se entrega completo) o
+    False si no se puede satisfacer (416).
+    """
+    coincidencia = _RANGO.match((cabecera or '').replace(' ', ''))
+    if not coincidencia or not any(coincidencia.groups()):
+        return None
+    desde, hasta = coincidencia.groups()
+    if not desde:  # bytes=-N: los últimos N bytes
+        inicio, fin = max(tamano - int(hasta), 0), tamano - 1
+    else:
+        inicio, fin = int(desde), min(int(hasta), tamano - 1) if hasta else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer_tramo(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def _respuesta_python(request, archivo, etag):
+    try:
+        ruta = archivo.path
+        tamano = os.path.getsize(ruta)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404("El archivo no está disponible.")
+
+    rango = None
+    if request.headers.get('If-Range', etag) == etag:
+        rango = _rango(request.headers.get('Range'), tamano)
+
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f"bytes */{tamano}"
+        return respuesta
+    if rango is None:
+        return FileResponse(open(ruta, 'rb'), content_type='application/pdf')
+
+    inicio, fin = rango
+    respuesta = StreamingHttpResponse(
+        _leer_tramo(ruta, inicio, fin - inicio + 1), status=206, content_type='application/pdf'
+    )
+    respuesta['Content-Range'] = f"bytes {inicio}-{fin}/{tamano}"
+    respuesta['Content-Length'] = str(fin - inicio + 1)
+    return respuesta
+
+
+def _es_descarga_nueva(request):
+    """Los Range que continúan una descarga (visores de PDF, reanudaciones) no se cuentan."""
+    if request.method != 'GET':
+        return False
+    rango = _RANGO.match((request.headers.get('Range') or '').replace(' ', ''))
+    return rango is None or rango.group(1) == '0'
+
+
+def respuesta_descarga(request, instancia, campo='archivo_pdf'):
+    """Cuenta la descarga de `instancia` (si es nueva) y retorna la respuesta con el archivo."""
+    archivo = getattr(instancia, campo)
+    if not archivo:
+        raise Http404("Este contenido no tiene archivo descargable.")
+
+    etag = f'"{os.path.splitext(os.path.basename(archivo.name))[0]}"'
+    servidor = settings.DESCARGAS_SERVIDOR
+    if servidor != 'python' and not archivo.storage.exists(archivo.name):
+        raise Http404("El archivo no está disponible.")
+    if servidor == 'nginx':
+        respuesta = HttpResponse(content_type='application/pdf')
+        respuesta['X-Accel-Redirect'] = settings.DESCARGAS_PREFIJO_INTERNO.rstrip('/') + '/' + quote(archivo.name)
+    elif servidor == 'apache':
+        respuesta = HttpResponse(content_type='application/pdf')
+        respuesta['X-Sendfile'] = archivo.path
+    else:
+        respuesta = _respuesta_python(request, archivo, etag)
+
+    # Se cuenta solo cuando el archivo existe: un 404 no es una descarga
+    if _es_descarga_nueva(request):
+        type(instancia).objects.filter(pk=instancia.pk).update(descargas=F('descargas') + 1)
+
+    respuesta['Accept-Ranges'] = 'bytes'
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, max-age=0'
+    respuesta['Content-Disposition'] = f'attachment; filename="{instancia.slug or "documento"}.pdf"'
+    return respuesta
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.almacenamiento import barrer_huerfanos
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra de las carpetas de media los archivos que ningún FileField/ImageField referencia "
+        "(imágenes reemplazadas o de registros borrados). Pensado para cron (ej: diario)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gracia-horas', type=int, default=settings.MEDIA_HUERFANOS_GRACIA_HORAS,
+                            help="No borrar archivos más nuevos que esto (subidas en curso)")
+        parser.add_argument('--simular', action='store_true', help="Solo listar, sin borrar")
+
+    def handle(self, *args, **options):
+        resultado = barrer_huerfanos(options['gracia_horas'], simular=options['simular'])
+        for nombre in resultado['huerfanos']:
+            self.stdout.write(f"  {'(simulado) ' if options['simular'] else ''}🗑️ {nombre}")
+
+        megas = resultado['bytes_liberados'] / (1024 * 1024)
+        self.stdout.write(
+            f"Archivos referenciados: {resultado['referenciados']} "
+            f"({resultado['compartidos']} compartidos por varias filas)"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(resultado['huerfanos'])} huérfanos, {megas:.2f} MB "
+            f"{'por liberar' if options['simular'] else 'liberados'}"
+        ))
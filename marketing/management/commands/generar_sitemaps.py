@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from marketing.seo import generar
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera sitemap.xml (índice + fragmentos de 50.000 URLs) y los feeds RSS en SEO_ROOT. "
+        "Incremental: solo reescribe los fragmentos con contenido nuevo, editado o retirado. "
+        "Pensado para cron (ej: cada 15 minutos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help="Reescribir todos los archivos")
+
+    def handle(self, *args, **options):
+        resumen = generar(completo=options['completo'])
+        for tipo, reescritos in resumen.items():
+            if reescritos:
+                self.stdout.write(f"  {tipo}: {reescritos} archivo(s) reescrito(s)")
+        self.stdout.write(self.style.SUCCESS(f"✅ Sitemaps y feeds al día en {settings.SEO_ROOT}"))
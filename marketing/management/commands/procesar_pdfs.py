@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from marketing.models import Investigacion, Protocolo
+from marketing.pdfs import procesar_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera miniatura, páginas, tamaño y extracto de los PDFs pendientes "
+        "(subidos antes de existir el proceso o cuyo procesamiento falló)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help="Reprocesar también los PDFs ya procesados")
+
+    def handle(self, *args, **options):
+        for modelo in (Investigacion, Protocolo):
+            queryset = modelo.objects.all()
+            if options['todos']:
+                queryset.update(pdf_procesado='')
+            else:
+                queryset = queryset.exclude(Q(pdf_procesado=F('archivo_pdf')) | Q(archivo_pdf__isnull=True, pdf_procesado=''))
+
+            ids = list(queryset.values_list('pk', flat=True))
+            for pk in ids:
+                procesar_pdf(modelo, pk)
+            self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {len(ids)} PDF(s) procesado(s)")
+        self.stdout.write(self.style.SUCCESS("✅ PDFs al día"))
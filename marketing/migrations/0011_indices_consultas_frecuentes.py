@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0010_alter_blog_slug_alter_categoria_slug_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_blog_pub_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='investigacion',
+            index=models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_invest_pub_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noticia',
+            index=models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_noticia_pub_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='protocolo',
+            index=models.Index(condition=models.Q(('es_visible', True)), fields=['orden'], name='mkt_protocolo_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonio',
+            index=models.Index(condition=models.Q(('es_visible', True)), fields=['-created_at'], name='mkt_testim_visible_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0011_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicio',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
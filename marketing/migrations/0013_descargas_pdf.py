@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0012_servicio_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investigacion',
+            name='descargas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Descargas del PDF'),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='descargas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Descargas del PDF'),
+        ),
+    ]
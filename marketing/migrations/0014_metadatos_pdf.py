@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0013_descargas_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investigacion',
+            name='pdf_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamaño del PDF (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='investigacion',
+            name='pdf_extracto',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Extracto del PDF'),
+        ),
+        migrations.AddField(
+            model_name='investigacion',
+            name='pdf_miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='investigaciones/miniaturas/', verbose_name='Miniatura del PDF'),
+        ),
+        migrations.AddField(
+            model_name='investigacion',
+            name='pdf_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Páginas del PDF'),
+        ),
+        migrations.AddField(
+            model_name='investigacion',
+            name='pdf_procesado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='pdf_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamaño del PDF (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='pdf_extracto',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Extracto del PDF'),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='pdf_miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='protocolos/miniaturas/', verbose_name='Miniatura del PDF'),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='pdf_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Páginas del PDF'),
+        ),
+        migrations.AddField(
+            model_name='protocolo',
+            name='pdf_procesado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -1,7 +1,28 @@
 import sys
 from io import BytesIO
 from PIL import Image
+from django.core.exceptions import FieldDoesNotExist
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from rest_framework import serializers
+from config.metricas import WEBP_SEGUNDOS
+from config.trazas import span
+
+@WEBP_SEGUNDOS.tiempo()
+@span('webp')
+def codificar_webp(img):
+    """Imagen PIL -> BytesIO en WebP (calidad 85), con el mismo tratamiento en todo el sitio."""
+    output_io = BytesIO()
+
+    # Convertir modos no compatibles (como transparencia indexada) a RGBA
+    if img.mode in ("RGBA", "P"):
+        img = img.convert("RGBA")
+    else:
+        img = img.convert("RGB")
+
+    img.save(output_io, format='WEBP', quality=85)
+    output_io.seek(0)
+    return output_io
+
 
 class WebPConverterMixin:
     """
@@ -16,6 +37,10 @@ class WebPConverterMixin:
         if not imagen_field:
             return
 
+        # Ya convertida (y guardada con nombre por contenido): no se reabre en cada save
+        if imagen_field.name.lower().endswith('.webp'):
+            return
+
         try:
             # Abrimos la imagen
             img = Image.open(imagen_field)
@@ -26,18 +51,8 @@ class WebPConverterMixin:
         if img.format == 'WEBP':
             return
 
-        # 2. Procesamiento de imagen
-        output_io = BytesIO()
-        
-        # Convertir modos no compatibles (como transparencia indexada) a RGBA
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGBA")
-        else:
-            img = img.convert("RGB")
-
-        # 3. Guardar comprimida en memoria
-        img.save(output_io, format='WEBP', quality=85)
-        output_io.seek(0)
+        # 2 y 3. Procesar y guardar comprimida en memoria
+        output_io = codificar_webp(img)
 
         # 4. Generar nuevo nombre reemplazando la extensión
         nombre_actual = imagen_field.name
@@ -56,4 +71,165 @@ class WebPConverterMixin:
         )
         
         # Seteamos el atributo en el modelo con el nuevo archivo
-        setattr(self, field_name, archivo_nuevo)
\ No newline at end of file
+        setattr(self, field_name, archivo_nuevo)
+
+def relaciones_de_serializer(serializer_class, prefijo='', en_prefetch=False):
+    """
+    Recorre el serializer (y sus serializers anidados) y retorna las relaciones
+    que necesita como (select_related, prefetch_related).
+
+    Cada serializer declara lo suyo en su Meta:
+        class Meta:
+            select_related = ['categoria']
+            prefetch_related = ['etiquetas']
+
+    Los serializers anidados se resuelven solos usando el `source` del campo:
+    uno-a-uno van a select_related y many=True (o cualquier cosa debajo de un
+    prefetch) van a prefetch_related.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    propias_select = [prefijo + r for r in getattr(meta, 'select_related', [])]
+    propias_prefetch = [prefijo + r for r in getattr(meta, 'prefetch_related', [])]
+
+    if en_prefetch:
+        select, prefetch = [], propias_select + propias_prefetch
+    else:
+        select, prefetch = propias_select, propias_prefetch
+
+    for campo in serializer_class().fields.values():
+        if campo.write_only or campo.source == '*':
+            continue
+        if isinstance(campo, serializers.ListSerializer):
+            hijo, many = campo.child, True
+        elif isinstance(campo, serializers.BaseSerializer):
+            hijo, many = campo, False
+        else:
+            continue
+
+        ruta = prefijo + campo.source.replace('.', '__')
+        anidado_en_prefetch = en_prefetch or many
+        (prefetch if anidado_en_prefetch else select).append(ruta)
+
+        sub_select, sub_prefetch = relaciones_de_serializer(type(hijo), ruta + '__', anidado_en_prefetch)
+        select += sub_select
+        prefetch += sub_prefetch
+
+    return select, prefetch
+
+
+def columnas_de_serializer(serializer_class):
+    """
+    Columnas del modelo que el serializer realmente lee, listas para `.only()`.
+
+    Se derivan del `source` de cada campo. Si un campo no se puede resolver a
+    una columna (SerializerMethodField, propiedades del modelo, source='*'),
+    el serializer debe declarar lo que necesita en `Meta.columnas_extra`;
+    si no lo hace se retorna None y no se poda nada.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    modelo = getattr(meta, 'model', None)
+    if modelo is None:
+        return None
+
+    columnas = {modelo._meta.pk.name}
+    # Subcampos leídos por cada FK. None o vacío = cargar el modelo relacionado completo
+    relaciones = {
+        ruta.split('__')[0]: (None if '__' in ruta else set())
+        for ruta in getattr(meta, 'select_related', [])
+    }
+    columnas_extra = getattr(meta, 'columnas_extra', None)
+
+    for campo in serializer_class().fields.values():
+        if campo.write_only:
+            continue
+        if isinstance(campo, serializers.SerializerMethodField) or campo.source == '*':
+            if columnas_extra is None:
+                return None
+            continue
+
+        partes = campo.source.split('.')
+        try:
+            campo_modelo = modelo._meta.get_field(partes[0])
+        except FieldDoesNotExist:
+            if columnas_extra is None:
+                return None
+            continue
+
+        if campo_modelo.many_to_many or campo_modelo.one_to_many:
+            continue  # Se resuelve con prefetch_related, no ocupa columna
+        if not campo_modelo.is_relation:
+            columnas.add(partes[0])
+            continue
+
+        # FK / uno-a-uno: la columna local siempre; del relacionado solo lo que se lee
+        # (y solo si viene por select_related, si no Django lo carga aparte)
+        columnas.add(partes[0])
+        subcampos = relaciones.get(partes[0])
+        if subcampos is None or (len(partes) == 1 and not isinstance(campo, serializers.BaseSerializer)):
+            continue
+        try:
+            if isinstance(campo, serializers.BaseSerializer) or len(partes) != 2:
+                raise FieldDoesNotExist
+            campo_modelo.related_model._meta.get_field(partes[1])
+            subcampos.add(f"{partes[0]}__{partes[1]}")
+        except FieldDoesNotExist:
+            relaciones[partes[0]] = None
+
+    columnas.update(columnas_extra or [])
+    for relacion, subcampos in relaciones.items():
+        columnas.add(relacion)
+        columnas.update(subcampos or [])
+    return sorted(columnas)
+
+
+_relaciones_cache = {}
+_columnas_cache = {}
+
+
+def optimizar_queryset(queryset, serializer_class, podar_columnas=False):
+    """
+    Aplica select_related/prefetch_related según lo que declara el serializer.
+    Con `podar_columnas=True` además difiere (`.only()`) las columnas que el
+    serializer no usa, ej: el HTML de `contenido` en las cards.
+    """
+    if serializer_class not in _relaciones_cache:
+        _relaciones_cache[serializer_class] = relaciones_de_serializer(serializer_class)
+    select, prefetch = _relaciones_cache[serializer_class]
+
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    if podar_columnas:
+        if serializer_class not in _columnas_cache:
+            _columnas_cache[serializer_class] = columnas_de_serializer(serializer_class)
+        columnas = _columnas_cache[serializer_class]
+        if columnas:
+            queryset = queryset.only(*columnas)
+    return queryset
+
+
+class QuerysetOptimizadoMixin:
+    """
+    Mixin para ViewSets: aplica automáticamente las relaciones declaradas por
+    el serializer activo. Se engancha en `filter_queryset` para que funcione
+    también con viewsets que sobreescriben `get_queryset`.
+    En `list` también poda las columnas que la card no usa.
+    `list` y `retrieve` van en un span 'serializar' (config/trazas.py): su
+    tiempo propio, sin las consultas hijas, es el costo de serializar.
+    """
+
+    def list(self, request, *args, **kwargs):
+        with span('serializar', accion='list'):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with span('serializar', accion='retrieve'):
+            return super().retrieve(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return optimizar_queryset(
+            queryset, self.get_serializer_class(), podar_columnas=self.action == 'list'
+        )
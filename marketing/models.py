@@ -1,11 +1,11 @@
 from django.db import models
 from django.conf import settings
-from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
 from .mixins import WebPConverterMixin
+from .slugs import SlugUnicoMixin
 
 
-class Categoria(models.Model):
+class Categoria(SlugUnicoMixin, models.Model):
     TIPO_CHOICES = [
         ('NOTICIA', 'Noticia'),
         ('INVESTIGACION', 'Investigación'),
@@ -16,23 +16,20 @@ class Categoria(models.Model):
     slug = models.SlugField(unique=True, blank=True, max_length=255)
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Contenido")
 
+    slug_origen = 'nombre'
+
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         
         unique_together = ('slug', 'tipo') 
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.nombre)[:255]
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()})"
 
 
 # Seccion nuestros servicios
-class Servicio(WebPConverterMixin, models.Model):
+class Servicio(SlugUnicoMixin, WebPConverterMixin, models.Model):
     # -- campos de cards --
     titulo = models.CharField(max_length=200, verbose_name="Título del Servicio", blank=True, null=True)
     slug = models.SlugField(unique=True, blank=True, help_text="Identificador para la URL", max_length=255)
@@ -60,6 +57,7 @@ class Servicio(WebPConverterMixin, models.Model):
     adicionales = CKEditor5Field(verbose_name="Optional Add-ons", blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Servicio"
@@ -70,9 +68,6 @@ class Servicio(WebPConverterMixin, models.Model):
         return self.titulo
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.titulo)[:255]
-        
         if self.imagen_card:
             self.convertir_imagen_a_webp('imagen_card')
         
@@ -84,7 +79,7 @@ class Servicio(WebPConverterMixin, models.Model):
 
 
 
-class Noticia(WebPConverterMixin, models.Model):
+class Noticia(SlugUnicoMixin, WebPConverterMixin, models.Model):
     # Relación: Una noticia pertenece a una categoría
     categoria = models.ForeignKey(
         Categoria, 
@@ -122,14 +117,14 @@ class Noticia(WebPConverterMixin, models.Model):
         ordering = ['-fecha_publicacion'] # Las más nuevas primero
         verbose_name = "Noticia"
         verbose_name_plural = "Noticias"
+        indexes = [
+            models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_noticia_pub_fecha_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.titulo)[:255]
-
         if self.imagen_card:
             self.convertir_imagen_a_webp('imagen_card')
         
@@ -140,7 +135,7 @@ class Noticia(WebPConverterMixin, models.Model):
         super().save(*args, **kwargs)
 
 
-class Investigacion(WebPConverterMixin, models.Model):
+class Investigacion(SlugUnicoMixin, WebPConverterMixin, models.Model):
     categoria = models.ForeignKey(
         Categoria, 
         on_delete=models.SET_NULL, 
@@ -160,6 +155,13 @@ class Investigacion(WebPConverterMixin, models.Model):
     imagen_banner = models.ImageField(upload_to='investigaciones/banners/', blank=True, null=True, verbose_name="Banner Grande")
     
     archivo_pdf = models.FileField(upload_to='investigaciones/documentos/', blank=True, null=True, verbose_name="PDF Completo (Opcional)")
+    descargas = models.PositiveIntegerField(default=0, editable=False, verbose_name="Descargas del PDF")
+    # Metadatos del PDF (los llena marketing.pdfs en segundo plano)
+    pdf_miniatura = models.ImageField(upload_to='investigaciones/miniaturas/', blank=True, null=True, editable=False, verbose_name="Miniatura del PDF")
+    pdf_paginas = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name="Páginas del PDF")
+    pdf_bytes = models.PositiveBigIntegerField(blank=True, null=True, editable=False, verbose_name="Tamaño del PDF (bytes)")
+    pdf_extracto = models.TextField(blank=True, default='', editable=False, verbose_name="Extracto del PDF")
+    pdf_procesado = models.CharField(max_length=255, blank=True, default='', editable=False)  # Nombre del PDF ya procesado
 
     # Contenido
     resumen = models.TextField(max_length=500, verbose_name="Resumen Ejecutivo", blank=True, null=True)
@@ -176,14 +178,14 @@ class Investigacion(WebPConverterMixin, models.Model):
         ordering = ['-fecha_publicacion']
         verbose_name = "Investigación"
         verbose_name_plural = "Investigaciones"
+        indexes = [
+            models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_invest_pub_fecha_idx'),
+        ]
     
     def __str__(self):
         return self.titulo
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.titulo)[:255]
-
         if self.imagen_card:
             self.convertir_imagen_a_webp('imagen_card')
         
@@ -240,13 +242,17 @@ class Testimonio(models.Model):
         ordering = ['-created_at'] 
         verbose_name = "Testimonio / Reseña"
         verbose_name_plural = "Testimonios y Reseñas"
+        indexes = [
+            # Listado público: solo aprobados, más recientes primero
+            models.Index(fields=['-created_at'], name='mkt_testim_visible_idx', condition=models.Q(es_visible=True)),
+        ]
 
     def __str__(self):
         return f"Opinión de {self.usuario.get_full_name() or self.usuario.username}"
     
     
 
-class Blog(WebPConverterMixin, models.Model):
+class Blog(SlugUnicoMixin, WebPConverterMixin, models.Model):
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, related_name='posts', limit_choices_to={'tipo': 'BLOG'})
     titulo = models.CharField(max_length=200, blank=True, null=True)
     slug = models.SlugField(unique=True, blank=True, max_length=255)
@@ -270,14 +276,14 @@ class Blog(WebPConverterMixin, models.Model):
         ordering = ['-fecha_publicacion']
         verbose_name = "Artículo de Blog"
         verbose_name_plural = "Blog"
+        indexes = [
+            models.Index(fields=['publicado', '-fecha_publicacion'], name='mkt_blog_pub_fecha_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.titulo)[:255]
-        
         if self.imagen_card:
             self.convertir_imagen_a_webp('imagen_card')
         
@@ -287,7 +293,7 @@ class Blog(WebPConverterMixin, models.Model):
         super().save(*args, **kwargs)
 
     
-class Protocolo(WebPConverterMixin, models.Model):
+class Protocolo(SlugUnicoMixin, WebPConverterMixin, models.Model):
     titulo = models.CharField(max_length=200, verbose_name="Nombre del Cultivo (ej: Batata)", blank=True, null=True)
     slug = models.SlugField(unique=True, blank=True, max_length=255)
     
@@ -305,6 +311,13 @@ class Protocolo(WebPConverterMixin, models.Model):
         blank=True, 
         null=True
     )
+    descargas = models.PositiveIntegerField(default=0, editable=False, verbose_name="Descargas del PDF")
+    # Metadatos del PDF (los llena marketing.pdfs en segundo plano)
+    pdf_miniatura = models.ImageField(upload_to='protocolos/miniaturas/', blank=True, null=True, editable=False, verbose_name="Miniatura del PDF")
+    pdf_paginas = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name="Páginas del PDF")
+    pdf_bytes = models.PositiveBigIntegerField(blank=True, null=True, editable=False, verbose_name="Tamaño del PDF (bytes)")
+    pdf_extracto = models.TextField(blank=True, default='', editable=False, verbose_name="Extracto del PDF")
+    pdf_procesado = models.CharField(max_length=255, blank=True, default='', editable=False)  # Nombre del PDF ya procesado
     orden = models.PositiveIntegerField(default=0, help_text="Orden de aparición en la rejilla")
     es_visible = models.BooleanField(default=True)
 
@@ -315,11 +328,11 @@ class Protocolo(WebPConverterMixin, models.Model):
         ordering = ['orden']
         verbose_name = "Protocolo de Cultivo"
         verbose_name_plural = "Protocolos"
+        indexes = [
+            models.Index(fields=['orden'], name='mkt_protocolo_visible_idx', condition=models.Q(es_visible=True)),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.titulo)[:255]
-        
         if self.imagen_card:    
             self.convertir_imagen_a_webp('imagen_card')
             
@@ -0,0 +1,113 @@
+# marketing/pdfs.py
+"""
+Miniatura y metadatos de los PDFs de Investigacion y Protocolo.
+
+Al subir un PDF, `post_save` encola (al confirmar la transacción) su
+procesamiento en un pool de hilos: se renderiza la primera página como
+WebP (mismo tratamiento que `WebPConverterMixin`) y se guardan el número de
+páginas, el tamaño y un extracto del texto. Así las cards muestran la
+vista previa sin que el frontend descargue el PDF completo.
+
+Se usan las herramientas de poppler-utils (`pdfinfo`, `pdftoppm`,
+`pdftotext`). Si no están instaladas solo se registra el tamaño.
+
+`pdf_procesado` guarda el nombre del PDF ya procesado; con el
+almacenamiento por contenido ese nombre es su hash, así que un PDF
+idéntico no se vuelve a procesar. El resultado se escribe con un UPDATE
+condicionado a que el PDF siga siendo el mismo (un reemplazo simultáneo
+no queda con los metadatos del anterior).
+"""
+import logging
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models import Q
+from PIL import Image
+
+from .mixins import codificar_webp
+
+ANCHO_MINIATURA = 480
+LARGO_EXTRACTO = 500
+PAGINAS_EXTRACTO = 2
+TIEMPO_MAXIMO = 30  # segundos por herramienta
+
+logger = logging.getLogger(__name__)
+
+_pool_pdfs = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf')
+
+
+def _ejecutar(*comando):
+    return subprocess.run(comando, capture_output=True, timeout=TIEMPO_MAXIMO, check=True).stdout
+
+
+def extraer(ruta):
+    """
+    {'paginas', 'extracto', 'miniatura'} del PDF en `ruta` (la miniatura en
+    bytes WebP). Lo que no se pueda extraer queda en None / ''.
+    """
+    datos = {'paginas': None, 'extracto': '', 'miniatura': None}
+    try:
+        info = _ejecutar('pdfinfo', ruta).decode('utf-8', 'replace')
+        if paginas := re.search(r'^Pages:\s+(\d+)', info, re.MULTILINE):
+            datos['paginas'] = int(paginas.group(1))
+
+        texto = _ejecutar('pdftotext', '-l', str(PAGINAS_EXTRACTO), '-enc', 'UTF-8', ruta, '-')
+        datos['extracto'] = ' '.join(texto.decode('utf-8', 'replace').split())[:LARGO_EXTRACTO]
+
+        png = _ejecutar('pdftoppm', '-png', '-singlefile', '-scale-to', str(ANCHO_MINIATURA), ruta)
+        datos['miniatura'] = codificar_webp(Image.open(BytesIO(png))).getvalue()
+    except FileNotFoundError:
+        logger.warning("poppler-utils no está instalado: los PDFs quedan sin miniatura ni páginas")
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"No se pudo extraer el PDF {ruta}: {e}")
+    return datos
+
+
+def procesar_pdf(modelo, pk):
+    """Extrae y guarda los metadatos del PDF actual de la fila (si cambió desde la última vez)."""
+    instancia = modelo.objects.filter(pk=pk).first()
+    if instancia is None:
+        return
+    archivo = instancia.archivo_pdf
+    if (archivo.name or '') == instancia.pdf_procesado:
+        return
+
+    if not archivo:
+        cambios = {'pdf_miniatura': None, 'pdf_paginas': None, 'pdf_bytes': None, 'pdf_extracto': ''}
+    else:
+        datos = extraer(archivo.path)
+        miniatura = None
+        if datos['miniatura']:
+            miniatura = instancia.pdf_miniatura.field.generate_filename(instancia, f"{instancia.slug}.webp")
+            miniatura = instancia.pdf_miniatura.storage.save(miniatura, ContentFile(datos['miniatura']))
+        cambios = {
+            'pdf_miniatura': miniatura,
+            'pdf_paginas': datos['paginas'],
+            'pdf_bytes': archivo.size,
+            'pdf_extracto': datos['extracto'],
+        }
+
+    # Sin save(): no dispara post_save ni toca updated_at (los sitemaps no cambian)
+    mismo_pdf = Q(archivo_pdf=archivo.name) if archivo else Q(archivo_pdf__isnull=True) | Q(archivo_pdf='')
+    modelo.objects.filter(mismo_pdf, pk=pk).update(pdf_procesado=archivo.name or '', **cambios)
+
+
+def _procesar_en_hilo(modelo, pk):
+    try:
+        procesar_pdf(modelo, pk)
+    except Exception as e:
+        logger.error(f"Fallo procesando el PDF de {modelo.__name__} {pk}: {e}")
+    finally:
+        connection.close()  # Cada hilo del pool abre su propia conexión
+
+
+def encolar_pdf(modelo, pk):
+    """Procesa en el pool (o en línea si PDFS_EN_SEGUNDO_PLANO=False). Retorna el future."""
+    if settings.PDFS_EN_SEGUNDO_PLANO:
+        return _pool_pdfs.submit(_procesar_en_hilo, modelo, pk)
+    procesar_pdf(modelo, pk)
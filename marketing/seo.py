@@ -0,0 +1,186 @@
+# marketing/seo.py
+"""
+Sitemaps y feeds como archivos estáticos.
+
+`generar()` escribe en `settings.SEO_ROOT` (servido tal cual por el
+servidor web en `settings.SEO_URL`):
+- sitemap.xml: índice de los fragmentos.
+- sitemap-<tipo>-<n>.xml: URLs de los ids (n*50000, (n+1)*50000] del tipo,
+  así ningún archivo pasa del límite de 50.000 URLs.
+- feed-blog.xml, feed-noticias.xml: RSS 2.0 de las últimas publicaciones.
+
+Es incremental: una consulta agrupada por fragmento calcula su firma
+(filas visibles, max(updated_at)) y solo se reescriben los fragmentos cuya
+firma cambió desde la corrida anterior (guardada en `.estado.json`). Altas,
+ediciones, bajas y despublicaciones cambian la firma. Cada archivo se
+escribe a un temporal y se reemplaza con os.replace: un crawler nunca lee
+un archivo a medias.
+"""
+import json
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max
+from django.utils.feedgenerator import Rss201rev2Feed
+
+from store.models import Producto
+from .models import Blog, Investigacion, Noticia, Protocolo, Servicio
+
+URLS_POR_ARCHIVO = 50000
+ITEMS_POR_FEED = 50
+ARCHIVO_ESTADO = '.estado.json'
+
+# tipo -> (modelo, filtro de visibilidad, ruta en el frontend)
+FUENTES = {
+    'productos': (Producto, {}, 'tienda'),
+    'noticias': (Noticia, {'publicado': True}, 'noticias'),
+    'blog': (Blog, {'publicado': True}, 'blogs'),
+    'investigaciones': (Investigacion, {'publicado': True}, 'investigaciones'),
+    'protocolos': (Protocolo, {'es_visible': True}, 'protocolos'),
+    'servicios': (Servicio, {}, 'servicios'),
+}
+
+# tipo -> (título, campo de resumen)
+FEEDS = {
+    'blog': ("Blog Grupo Reina", 'resumen'),
+    'noticias': ("Noticias Grupo Reina", 'resumen'),
+}
+
+
+def _url(ruta, slug):
+    return f"{settings.FRONTEND_URL}/{ruta}/{slug}"
+
+
+def _visibles(tipo):
+    modelo, visibles, _ = FUENTES[tipo]
+    return modelo.objects.filter(**visibles)
+
+
+def _firmas(tipo):
+    """{fragmento: [filas, max(updated_at) ISO]} en una sola consulta agrupada."""
+    fragmento = ExpressionWrapper((F('id') - 1) / URLS_POR_ARCHIVO, output_field=IntegerField())
+    filas = (
+        _visibles(tipo).order_by()
+        .annotate(fragmento=fragmento)
+        .values('fragmento')
+        .annotate(total=Count('id'), ultima=Max('updated_at'))
+    )
+    return {str(f['fragmento']): [f['total'], f['ultima'].isoformat()] for f in filas}
+
+
+def _escribir(ruta, escribir):
+    """Escribe con `escribir(archivo)` a un temporal y lo publica de forma atómica."""
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        escribir(archivo)
+    os.replace(temporal, ruta)
+
+
+def _nombre_fragmento(tipo, fragmento):
+    return f"sitemap-{tipo}-{fragmento}.xml"
+
+
+def _escribir_fragmento(directorio, tipo, fragmento):
+    ruta_frontend = FUENTES[tipo][2]
+    desde = int(fragmento) * URLS_POR_ARCHIVO
+    filas = (
+        _visibles(tipo).filter(id__gt=desde, id__lte=desde + URLS_POR_ARCHIVO)
+        .order_by('id').values_list('slug', 'updated_at')
+    )
+
+    def escribir(archivo):
+        archivo.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        archivo.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for slug, updated_at in filas.iterator(chunk_size=2000):
+            archivo.write(
+                f"<url><loc>{escape(_url(ruta_frontend, slug))}</loc>"
+                f"<lastmod>{updated_at.isoformat()}</lastmod></url>\n"
+            )
+        archivo.write('</urlset>\n')
+
+    _escribir(directorio / _nombre_fragmento(tipo, fragmento), escribir)
+
+
+def _escribir_indice(directorio, firmas):
+    base = settings.SEO_URL.rstrip('/')
+
+    def escribir(archivo):
+        archivo.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        archivo.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for tipo, fragmentos in firmas.items():
+            for fragmento, (_, ultima) in sorted(fragmentos.items(), key=lambda f: int(f[0])):
+                archivo.write(
+                    f"<sitemap><loc>{escape(base)}/{_nombre_fragmento(tipo, fragmento)}</loc>"
+                    f"<lastmod>{ultima}</lastmod></sitemap>\n"
+                )
+        archivo.write('</sitemapindex>\n')
+
+    _escribir(directorio / 'sitemap.xml', escribir)
+
+
+def _escribir_feed(directorio, tipo):
+    titulo, campo_resumen = FEEDS[tipo]
+    ruta_frontend = FUENTES[tipo][2]
+    feed = Rss201rev2Feed(
+        title=titulo,
+        link=f"{settings.FRONTEND_URL}/{ruta_frontend}",
+        description=titulo,
+        language='es',
+        feed_url=f"{settings.SEO_URL.rstrip('/')}/feed-{tipo}.xml",
+    )
+    recientes = _visibles(tipo).order_by('-created_at').values(
+        'titulo', 'slug', campo_resumen, 'created_at', 'updated_at'
+    )[:ITEMS_POR_FEED]
+    for item in recientes:
+        link = _url(ruta_frontend, item['slug'])
+        feed.add_item(
+            title=item['titulo'] or item['slug'],
+            link=link,
+            unique_id=link,
+            description=item[campo_resumen] or '',
+            pubdate=item['created_at'],
+            updateddate=item['updated_at'],
+        )
+    _escribir(directorio / f"feed-{tipo}.xml", lambda archivo: feed.write(archivo, 'utf-8'))
+
+
+def _leer_estado(directorio):
+    try:
+        return json.loads((directorio / ARCHIVO_ESTADO).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def generar(completo=False):
+    """
+    Regenera lo que cambió desde la última corrida (todo si `completo`).
+    Retorna {tipo: fragmentos reescritos} (los feeds cuentan como 'feed-<tipo>').
+    """
+    directorio = Path(settings.SEO_ROOT)
+    directorio.mkdir(parents=True, exist_ok=True)
+    anterior = {} if completo else _leer_estado(directorio)
+
+    firmas, resumen = {}, {}
+    for tipo in FUENTES:
+        firmas[tipo] = _firmas(tipo)
+        previas = anterior.get(tipo, {})
+
+        cambiados = [f for f, firma in firmas[tipo].items() if previas.get(f) != firma]
+        for fragmento in cambiados:
+            _escribir_fragmento(directorio, tipo, fragmento)
+        for fragmento in previas.keys() - firmas[tipo].keys():  # Fragmento que quedó vacío
+            (directorio / _nombre_fragmento(tipo, fragmento)).unlink(missing_ok=True)
+        resumen[tipo] = len(cambiados)
+
+        if tipo in FEEDS and (firmas[tipo] != previas or not (directorio / f"feed-{tipo}.xml").exists()):
+            _escribir_feed(directorio, tipo)
+            resumen[f"feed-{tipo}"] = 1
+
+    if firmas != anterior or not (directorio / 'sitemap.xml').exists():
+        _escribir_indice(directorio, firmas)
+        _escribir(directorio / ARCHIVO_ESTADO, lambda archivo: json.dump(firmas, archivo))
+
+    return resumen
+
@@ -57,6 +57,7 @@ class NoticiaCardSerializer(serializers.ModelSerializer):
             'id', 'titulo', 'slug', 'fecha_publicacion', 
             'imagen_card', 'resumen', 'categoria', 'categoria_nombre', 'autor'
         ]
+        select_related = ['categoria']
 
 class NoticiaDetailSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
@@ -65,6 +66,7 @@ class NoticiaDetailSerializer(serializers.ModelSerializer):
         model = Noticia
         fields = '__all__' 
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at', 'fecha_publicacion']
+        select_related = ['categoria']
 
 
 class InvestigacionCardSerializer(serializers.ModelSerializer):
@@ -75,8 +77,10 @@ class InvestigacionCardSerializer(serializers.ModelSerializer):
         model = Investigacion
         fields = [
             'id', 'titulo', 'slug', 'fecha_publicacion', 
-            'imagen_card', 'resumen', 'categoria_nombre', 'autor', 'es_destacada'
+            'imagen_card', 'resumen', 'categoria_nombre', 'autor', 'es_destacada',
+            'pdf_miniatura', 'pdf_paginas', 'pdf_bytes'
         ]
+        select_related = ['categoria']
 
 class InvestigacionDetailSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
@@ -85,6 +89,7 @@ class InvestigacionDetailSerializer(serializers.ModelSerializer):
         model = Investigacion
         fields = '__all__'
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+        select_related = ['categoria']
 
 
 class CertificacionSerializer(serializers.ModelSerializer):
@@ -108,6 +113,8 @@ class TestimonioSerializer(serializers.ModelSerializer):
             'es_visible'
         ]
         read_only_fields = ['id', 'created_at', 'es_visible']
+        select_related = ['usuario']
+        columnas_extra = ['usuario']  # usuario_foto lee usuario.foto_perfil
 
     @extend_schema_field(str)
     def get_usuario_foto(self, obj):
@@ -138,6 +145,7 @@ class BlogCardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ['id', 'titulo', 'slug', 'fecha_publicacion', 'imagen_card', 'resumen', 'categoria_nombre', 'autor']
+        select_related = ['categoria']
 
 class BlogDetailSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
@@ -145,6 +153,7 @@ class BlogDetailSerializer(serializers.ModelSerializer):
         model = Blog
         fields = '__all__'
         read_only_fields = ['id', 'slug', 'created_at']
+        select_related = ['categoria']
 
 class ProtocoloCardSerializer(serializers.ModelSerializer):
 
@@ -153,7 +162,10 @@ class ProtocoloCardSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Protocolo
-        fields = ['id', 'titulo', 'slug', 'imagen_card', 'orden', 'archivo_pdf', 'es_visible']
+        fields = [
+            'id', 'titulo', 'slug', 'imagen_card', 'orden', 'archivo_pdf', 'es_visible',
+            'pdf_miniatura', 'pdf_paginas', 'pdf_bytes'
+        ]
 
 class ProtocoloDetailSerializer(serializers.ModelSerializer):
     class Meta:
@@ -6,6 +6,10 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from config.senales import diferir
+from .pdfs import encolar_pdf
 
 # Importamos todos los modelos que generan notificación
 from .models import Noticia, Blog, Investigacion, Protocolo, Testimonio
@@ -62,6 +66,63 @@ def enviar_notificacion_masiva(instance, tipo_contenido, titulo, resumen, imagen
     msg.attach_alternative(html_content, "text/html")
     msg.send()
 
+def enviar_resumen_masivo(instancias_por_tipo):
+    """
+    Versión agrupada de `enviar_notificacion_masiva`: un correo por tipo de
+    contenido con todas las publicaciones nuevas del lote.
+    """
+    destinatarios = list(
+        User.objects.filter(is_active=True, recibir_newsletter=True).values_list('email', flat=True)
+    )
+    if not destinatarios:
+        return
+
+    connection = get_connection()
+    messages = []
+    for tipo_contenido, instancias in instancias_por_tipo.items():
+        titulos = [instancia.titulo for instancia in instancias]
+        resumen = ", ".join(titulos[:10])
+        if len(titulos) > 10:
+            resumen += f" y {len(titulos) - 10} más..."
+
+        html_content = render_to_string('emails/nuevo_contenido.html', {
+            'titulo': f"{len(titulos)} nuevas publicaciones",
+            'tipo_contenido': tipo_contenido,
+            'titulo_contenido': f"{len(titulos)} publicaciones de {tipo_contenido}",
+            'resumen': resumen,
+            'link': f"http://urlficticafrontend:3000/{tipo_contenido.lower()}s",
+            'imagen_url': ""
+        })
+        msg = EmailMultiAlternatives(
+            f"📢 Nuevo en Ecommerce Reina: {len(titulos)} publicaciones de {tipo_contenido}",
+            strip_tags(html_content), settings.DEFAULT_FROM_EMAIL,
+            bcc=destinatarios, connection=connection
+        )
+        msg.attach_alternative(html_content, "text/html")
+        messages.append(msg)
+
+    connection.send_messages(messages)
+
+
+def _contenido_nuevo_en_lote(instancias_por_clave):
+    instancias_por_tipo = {}
+    for (tipo, _), instancia in instancias_por_clave.items():
+        instancias_por_tipo.setdefault(tipo, []).append(instancia)
+
+    # Un solo elemento de un tipo conserva el correo detallado de siempre
+    individuales = {t: i for t, i in instancias_por_tipo.items() if len(i) == 1}
+    for tipo, (instancia,) in individuales.items():
+        enviar_notificacion_masiva(
+            instance=instancia,
+            tipo_contenido=tipo,
+            titulo=instancia.titulo,
+            resumen=getattr(instancia, 'resumen', getattr(instancia, 'descripcion_tecnica', '')),
+            imagen=getattr(instancia, 'imagen_card', None)
+        )
+
+    enviar_resumen_masivo({t: i for t, i in instancias_por_tipo.items() if t not in individuales})
+
+
 @receiver(post_save, sender=Noticia)
 @receiver(post_save, sender=Blog)
 @receiver(post_save, sender=Investigacion)
@@ -76,6 +137,10 @@ def notificar_nuevo_contenido(sender, instance, created, **kwargs):
         
         # Determinar tipo para el correo
         tipo = sender.__name__ # "Noticia", "Blog", etc.
+
+        # En un lote de señales: un correo por tipo de contenido al final
+        if diferir(_contenido_nuevo_en_lote, (tipo, instance.id), instance):
+            return
         
         # Unificar campos (algunos modelos tienen imagen_card, otros descripcion_tecnica, etc)
         resumen = getattr(instance, 'resumen', getattr(instance, 'descripcion_tecnica', ''))
@@ -89,18 +154,33 @@ def notificar_nuevo_contenido(sender, instance, created, **kwargs):
             imagen=imagen
         )
 
+def _testimonios_en_lote(testimonios_por_id):
+    """Un solo aviso con todos los testimonios pendientes de moderar."""
+    admins = User.objects.correos_administradores()
+    if not admins:
+        return
+
+    lineas = [
+        f"- {t.usuario.get_full_name() or t.usuario.email}: {t.contenido[:100]}"
+        for t in testimonios_por_id.values()
+    ]
+    msg = EmailMultiAlternatives(
+        f"💬 {len(lineas)} Nuevos Comentarios Pendientes",
+        "\n".join(lineas) + "\n\nModéralos en http://127.0.0.1:8000/admin/marketing/testimonio/?es_visible__exact=0",
+        settings.DEFAULT_FROM_EMAIL,
+        to=admins
+    )
+    msg.send()
+
+
 @receiver(post_save, sender=Testimonio)
 def notificar_nuevo_testimonio(sender, instance, created, **kwargs):
     if created:
-        # 1. Obtener admins
-        admins = User.objects.filter(
-            groups__name='Administrador', 
-            is_active=True
-        ).values_list('email', flat=True)
+        if diferir(_testimonios_en_lote, instance.id, instance):
+            return
 
-        if not admins:
-            admins = User.objects.filter(is_superuser=True).values_list('email', flat=True)
-            
+        # 1. Obtener admins
+        admins = User.objects.correos_administradores()
         if not admins:
             return
 
@@ -122,7 +202,15 @@ def notificar_nuevo_testimonio(sender, instance, created, **kwargs):
             f"💬 Nuevo Comentario Pendiente de {instance.usuario.first_name}",
             text_content,
             settings.DEFAULT_FROM_EMAIL,
-            to=list(admins) # Enviamos a todos los admins
+            to=admins # Enviamos a todos los admins
         )
         msg.attach_alternative(html_content, "text/html")
-        msg.send()
\ No newline at end of file
+        msg.send()
+
+
+@receiver(post_save, sender=Investigacion)
+@receiver(post_save, sender=Protocolo)
+def procesar_pdf_subido(sender, instance, **kwargs):
+    # PDF nuevo, reemplazado o quitado desde el último procesamiento: miniatura y metadatos en segundo plano
+    if (instance.archivo_pdf.name or '') != instance.pdf_procesado:
+        transaction.on_commit(lambda: encolar_pdf(sender, instance.pk))
@@ -0,0 +1,117 @@
+# marketing/slugs.py
+"""
+Asignación de slugs únicos.
+
+`slugify(titulo)` choca con cualquier otro objeto del mismo título. Aquí la
+colisión se resuelve en una sola consulta: se leen los slugs existentes
+`base` y `base-N` y se usa el siguiente N ('aceite', 'aceite-2', ...).
+
+En PostgreSQL la asignación toma un advisory lock por (tabla, base) que
+dura hasta el fin de la transacción: dos altas simultáneas con el mismo
+título se turnan en vez de calcular el mismo slug y fallar con
+IntegrityError. Por eso hay que llamar a `asignar_slugs` dentro de la
+misma transacción del INSERT (`SlugUnicoMixin` ya lo hace).
+"""
+import zlib
+
+from django import forms
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+ESPACIO_SUFIJO = 11  # '-' + hasta 10 dígitos
+
+
+def _base(modelo, texto):
+    """(slug deseado, raíz para los sufijos) respetando el max_length del campo."""
+    max_length = modelo._meta.get_field('slug').max_length
+    base = slugify(texto or '')[:max_length].strip('-') or modelo._meta.model_name
+    return base, base[:max_length - ESPACIO_SUFIJO].rstrip('-')
+
+
+def _bloquear(modelo, raices):
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for raiz in sorted(set(raices)):  # Orden fijo: dos lotes no se bloquean en cruz
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(f"{modelo._meta.db_table}:{raiz}".encode())]
+            )
+
+
+def _ocupados(modelo, pares, excluir_pk=None):
+    """Slugs existentes que son alguna base o alguna raíz-N, en una consulta."""
+    bases = {base for base, _ in pares}
+    raices = {raiz for _, raiz in pares}
+    filtro = Q(slug__in=bases)
+    for raiz in raices:
+        # LIKE 'raiz-%' lo resuelve el índice varchar_pattern_ops del slug (una regex recorre la tabla)
+        filtro |= Q(slug__startswith=f"{raiz}-")
+    queryset = modelo._default_manager.filter(filtro)
+    if excluir_pk is not None:
+        queryset = queryset.exclude(pk=excluir_pk)
+
+    ocupados = set()
+    for slug in queryset.values_list('slug', flat=True):
+        raiz, _, sufijo = slug.rpartition('-')
+        if slug in bases or (sufijo.isdigit() and raiz in raices):
+            ocupados.add(slug)
+    return ocupados
+
+
+def _siguiente(base, raiz, ocupados):
+    if base not in ocupados:
+        return base
+    prefijo = f"{raiz}-"
+    sufijos = [
+        int(slug[len(prefijo):]) for slug in ocupados
+        if slug.startswith(prefijo) and slug[len(prefijo):].isdigit()
+    ]
+    return f"{prefijo}{max(sufijos, default=1) + 1}"
+
+
+def asignar_slugs(modelo, textos, excluir_pk=None):
+    """
+    Slugs libres para cada texto (en el mismo orden), sin repetir dentro del
+    lote. Una consulta para todo el lote; sirve antes de un bulk_create.
+    """
+    pares = [_base(modelo, texto) for texto in textos]
+    if not pares:
+        return []
+    _bloquear(modelo, [raiz for _, raiz in pares])
+    ocupados = _ocupados(modelo, pares, excluir_pk)
+
+    slugs = []
+    for base, raiz in pares:
+        slug = _siguiente(base, raiz, ocupados)
+        ocupados.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+class SlugUnicoMixin:
+    """Modelos con `slug` único: si llega vacío se asigna uno libre a partir de `slug_origen`."""
+    slug_origen = 'titulo'
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.slug = asignar_slugs(type(self), [getattr(self, self.slug_origen)], excluir_pk=self.pk)[0]
+            return super().save(*args, **kwargs)
+
+
+class SlugUnicoAdminForm(forms.ModelForm):
+    """
+    Formulario base del admin con `prepopulated_fields`: si el slug es el que
+    generó el JS a partir del título y ya está ocupado, se usa el siguiente
+    libre en vez de mostrar el error de duplicado.
+    """
+
+    def clean(self):
+        datos = super().clean()
+        modelo = self._meta.model
+        slug = datos.get('slug')
+        if slug and slug == _base(modelo, datos.get(modelo.slug_origen))[0]:
+            datos['slug'] = asignar_slugs(modelo, [slug], excluir_pk=self.instance.pk)[0]
+        return datos
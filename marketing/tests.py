@@ -1,3 +1,404 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from config.almacenamiento import barrer_huerfanos
+from store.models import Producto
+from store.tests import ConsultasConstantesMixin
+from .models import Categoria, Noticia, Investigacion, Blog, Testimonio
+from .pdfs import procesar_pdf
+from .seo import generar
+from .slugs import asignar_slugs
+
+User = get_user_model()
+
+
+class ConsultasMarketingTests(ConsultasConstantesMixin, APITestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            'lector@example.com', 'clave-segura', first_name='Luis', last_name='Gómez', recibir_newsletter=False
+        )
+
+    def test_lista_noticias(self):
+        categoria = Categoria.objects.create(nombre="Eventos", tipo='NOTICIA')
+        self.assertConsultasConstantes(
+            '/api/noticias/', lambda i: Noticia.objects.create(titulo=f"Noticia {i}", categoria=categoria)
+        )
+
+    def test_lista_investigaciones(self):
+        categoria = Categoria.objects.create(nombre="Suelos", tipo='INVESTIGACION')
+        self.assertConsultasConstantes(
+            '/api/investigaciones/', lambda i: Investigacion.objects.create(titulo=f"Investigación {i}", categoria=categoria)
+        )
+
+    def test_lista_blog(self):
+        categoria = Categoria.objects.create(nombre="Tips", tipo='BLOG')
+        self.assertConsultasConstantes(
+            '/api/blog/', lambda i: Blog.objects.create(titulo=f"Post {i}", resumen="Resumen", categoria=categoria)
+        )
+
+    def test_lista_testimonios(self):
+        def crear_testimonio(i):
+            autor = User.objects.create_user(
+                f'autor{i}@example.com', 'clave-segura', first_name='Autor', last_name=str(i), recibir_newsletter=False
+            )
+            Testimonio.objects.create(usuario=autor, contenido="Muy bueno", es_visible=True)
+
+        self.assertConsultasConstantes('/api/testimonios/', crear_testimonio)
+
+
+class ColumnasPodadasTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lista_noticias_no_carga_contenido(self):
+        Noticia.objects.create(titulo="Noticia", contenido="<p>HTML largo</p>", publicado=False)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/noticias/')
+        self.assertEqual(response.status_code, 200)
+        sql_lista = consultas.captured_queries[-1]['sql']
+        self.assertIn('"titulo"', sql_lista)
+        self.assertNotIn('"contenido"', sql_lista)
+
+
+class SlugsUnicosTests(TestCase):
+
+    def test_colisiones_usan_el_siguiente_sufijo(self):
+        slugs = [Noticia.objects.create(titulo="Día de campo").slug for _ in range(3)]
+        self.assertEqual(slugs, ['dia-de-campo', 'dia-de-campo-2', 'dia-de-campo-3'])
+
+        # Solo cuentan los sufijos numéricos de la misma raíz
+        Noticia.objects.create(titulo="Día de campo", slug='dia-de-campo-10')
+        Noticia.objects.create(titulo="Día de campo regional")
+        Noticia.objects.create(titulo="Día de campo", slug='dia-de-campo-regional-99')
+        self.assertEqual(Noticia.objects.create(titulo="Día de campo").slug, 'dia-de-campo-11')
+
+    def test_lote_sin_repetidos_en_una_consulta(self):
+        Blog.objects.create(titulo="Riego", resumen="r")
+        Blog.objects.create(titulo="Riego por goteo", resumen="r")
+        with self.assertNumQueries(1):
+            slugs = asignar_slugs(Blog, ["Riego", "Riego", "Riego por goteo", "Poda"])
+        self.assertEqual(slugs, ['riego-2', 'riego-3', 'riego-por-goteo-2', 'poda'])
+
+    def test_renombrar_conserva_el_slug_y_vaciarlo_no_choca_consigo_mismo(self):
+        noticia = Noticia.objects.create(titulo="Cosecha")
+        noticia.titulo = "Cosecha de café"
+        noticia.save()
+        self.assertEqual(noticia.slug, 'cosecha')
+
+        noticia.slug = ''
+        noticia.save()
+        self.assertEqual(noticia.slug, 'cosecha-de-cafe')
+
+        noticia.titulo, noticia.slug = "Cosecha", ''
+        noticia.save()
+        self.assertEqual(noticia.slug, 'cosecha')  # Se excluye a sí mismo
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en una carpeta temporal que se borra al terminar cada test."""
+
+    def usar_media_temporal(self, **ajustes):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, **ajustes)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class DescargasPdfTests(MediaTemporalMixin, APITestCase):
+    CONTENIDO = b'%PDF-1.4 contenido de prueba'
+
+    def setUp(self):
+        cache.clear()
+        self.usar_media_temporal(DESCARGAS_SERVIDOR='python')
+
+        self.investigacion = Investigacion.objects.create(titulo="Suelos vivos")
+        self.investigacion.archivo_pdf.save('suelos.pdf', ContentFile(self.CONTENIDO))
+        self.url = f'/api/investigaciones/{self.investigacion.slug}/descargar/'
+
+    def descargas(self):
+        return Investigacion.objects.values_list('descargas', flat=True).get(pk=self.investigacion.pk)
+
+    def test_completo_y_por_rangos_cuentan_solo_descargas_nuevas(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENIDO)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-3/{len(self.CONTENIDO)}')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+
+        # Continuación del visor: no es una descarga nueva
+        response = self.client.get(self.url, HTTP_RANGE='bytes=4-', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENIDO[4:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9999-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, f'bytes */{len(self.CONTENIDO)}'))
+        self.assertEqual(self.descargas(), 2)
+
+    @override_settings(DESCARGAS_SERVIDOR='nginx', DESCARGAS_PREFIJO_INTERNO='/media-protegida/')
+    def test_nginx_recibe_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/media-protegida/{self.investigacion.archivo_pdf.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.descargas(), 1)
+
+    def test_errores_salen_como_json_aunque_pidan_pdf(self):
+        Investigacion.objects.filter(pk=self.investigacion.pk).update(publicado=False)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+        self.assertEqual(self.descargas(), 0)
+
+    def test_archivo_faltante_no_cuenta_descarga(self):
+        self.investigacion.archivo_pdf.storage.delete(self.investigacion.archivo_pdf.name)
+        for servidor in ('python', 'nginx'):
+            with self.subTest(servidor=servidor), self.settings(DESCARGAS_SERVIDOR=servidor):
+                response = self.client.get(self.url, HTTP_ACCEPT='application/pdf')
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(self.descargas(), 0)
+
+
+class AlmacenamientoDeduplicadoTests(MediaTemporalMixin, TestCase):
+
+    def setUp(self):
+        self.usar_media_temporal()
+
+    def con_pdf(self, titulo, nombre, contenido):
+        investigacion = Investigacion.objects.create(titulo=titulo)
+        investigacion.archivo_pdf.save(nombre, ContentFile(contenido))
+        return investigacion
+
+    def archivos(self):
+        return sorted(os.listdir(os.path.join(self.media, 'investigaciones', 'documentos')))
+
+    def envejecer(self, nombre, horas):
+        instante = time.time() - horas * 3600
+        os.utime(os.path.join(self.media, nombre), (instante, instante))
+
+    def test_mismo_contenido_comparte_un_solo_archivo(self):
+        primera = self.con_pdf("Suelos", 'suelos.pdf', b'%PDF mismo contenido')
+        segunda = self.con_pdf("Suelos 2", 'copia de suelos.PDF', b'%PDF mismo contenido')
+        tercera = self.con_pdf("Agua", 'agua.pdf', b'%PDF otro contenido')
+
+        self.assertEqual(primera.archivo_pdf.name, segunda.archivo_pdf.name)
+        self.assertNotEqual(primera.archivo_pdf.name, tercera.archivo_pdf.name)
+        self.assertTrue(primera.archivo_pdf.name.endswith('.pdf'))
+        self.assertEqual(len(self.archivos()), 2)  # Sin temporales ni copias con sufijo
+
+    def test_barrido_conserva_referenciados_y_recientes(self):
+        compartido = self.con_pdf("Suelos", 'suelos.pdf', b'%PDF compartido')
+        otra = self.con_pdf("Suelos 2", 'suelos.pdf', b'%PDF compartido')
+        reemplazado = self.con_pdf("Agua", 'agua.pdf', b'%PDF version 1').archivo_pdf.name
+        Investigacion.objects.filter(titulo="Agua").update(archivo_pdf='')
+        reciente = self.con_pdf("Clima", 'clima.pdf', b'%PDF reciente').archivo_pdf.name
+        Investigacion.objects.filter(titulo="Clima").delete()
+        for nombre in (compartido.archivo_pdf.name, reemplazado):
+            self.envejecer(nombre, horas=48)
+
+        simulado = barrer_huerfanos(gracia_horas=24, simular=True)
+        self.assertEqual(simulado['huerfanos'], [reemplazado])
+        self.assertEqual(len(self.archivos()), 3)
+
+        resultado = barrer_huerfanos(gracia_horas=24)
+        self.assertEqual(resultado['huerfanos'], [reemplazado])
+        self.assertEqual(resultado['compartidos'], 1)
+        self.assertEqual(
+            self.archivos(),
+            sorted(os.path.basename(n) for n in (compartido.archivo_pdf.name, reciente)),
+        )
+        self.assertEqual(otra.archivo_pdf.name, compartido.archivo_pdf.name)
+
+
+def poppler_falso(*comando):
+    """Salidas de pdfinfo / pdftotext / pdftoppm para un PDF de 12 páginas."""
+    if comando[0] == 'pdfinfo':
+        return b"Title:          Suelos\nPages:          12\n"
+    if comando[0] == 'pdftotext':
+        return "Resumen   del\n\nestudio de suelos".encode('utf-8')
+    png = BytesIO()
+    Image.new('RGB', (48, 64), 'white').save(png, format='PNG')
+    return png.getvalue()
+
+
+@override_settings(PDFS_EN_SEGUNDO_PLANO=False)
+class ProcesarPdfTests(MediaTemporalMixin, TestCase):
+    CONTENIDO = b'%PDF-1.4 estudio de suelos'
+
+    def setUp(self):
+        self.usar_media_temporal()
+        self.poppler = mock.patch('marketing.pdfs._ejecutar', side_effect=poppler_falso)
+        self.ejecutar = self.poppler.start()
+        self.addCleanup(self.poppler.stop)
+
+    def subir(self, titulo="Suelos", contenido=CONTENIDO, procesar=True):
+        with self.captureOnCommitCallbacks(execute=procesar):
+            investigacion = Investigacion.objects.create(titulo=titulo)
+            investigacion.archivo_pdf.save('estudio.pdf', ContentFile(contenido))
+        investigacion.refresh_from_db()
+        return investigacion
+
+    def test_subir_pdf_guarda_los_metadatos(self):
+        investigacion = self.subir()
+
+        self.assertEqual(investigacion.pdf_paginas, 12)
+        self.assertEqual(investigacion.pdf_bytes, len(self.CONTENIDO))
+        self.assertEqual(investigacion.pdf_extracto, "Resumen del estudio de suelos")
+        self.assertEqual(investigacion.pdf_procesado, investigacion.archivo_pdf.name)
+        self.assertTrue(investigacion.pdf_miniatura.name.startswith('investigaciones/miniaturas/'))
+        with Image.open(investigacion.pdf_miniatura.path) as miniatura:
+            self.assertEqual(miniatura.format, 'WEBP')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            investigacion.save()  # Mismo PDF: no se vuelve a procesar
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.ejecutar.call_count, 3)
+
+    def test_trabajo_viejo_no_pisa_un_pdf_reemplazado(self):
+        investigacion = self.subir(procesar=False)
+
+        def reemplazado_durante_la_extraccion(*comando):
+            if comando[0] == 'pdfinfo':
+                Investigacion.objects.filter(pk=investigacion.pk).update(archivo_pdf='investigaciones/documentos/nuevo.pdf')
+            return poppler_falso(*comando)
+
+        self.ejecutar.side_effect = reemplazado_durante_la_extraccion
+        procesar_pdf(Investigacion, investigacion.pk)
+
+        investigacion.refresh_from_db()
+        self.assertEqual(investigacion.archivo_pdf.name, 'investigaciones/documentos/nuevo.pdf')
+        self.assertEqual((investigacion.pdf_procesado, investigacion.pdf_paginas), ('', None))
+
+    def test_quitar_el_pdf_limpia_los_metadatos(self):
+        investigacion = self.subir()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            investigacion.archivo_pdf = None
+            investigacion.save()
+
+        investigacion.refresh_from_db()
+        self.assertEqual(
+            (investigacion.pdf_miniatura.name, investigacion.pdf_paginas, investigacion.pdf_bytes),
+            (None, None, None),
+        )
+        self.assertEqual((investigacion.pdf_extracto, investigacion.pdf_procesado), ('', ''))
+
+    def test_sin_poppler_solo_registra_el_tamano(self):
+        self.ejecutar.side_effect = FileNotFoundError('pdfinfo')
+
+        with self.assertLogs('marketing.pdfs', 'WARNING'):
+            investigacion = self.subir()
+
+        self.assertEqual(investigacion.pdf_bytes, len(self.CONTENIDO))
+        self.assertEqual(investigacion.pdf_procesado, investigacion.archivo_pdf.name)
+        self.assertEqual((investigacion.pdf_paginas, investigacion.pdf_extracto), (None, ''))
+        self.assertFalse(investigacion.pdf_miniatura)
+
+    def test_comando_procesa_solo_los_pendientes(self):
+        al_dia = self.subir("Al día", b'%PDF al dia')
+        pendiente = self.subir("Pendiente", b'%PDF pendiente', procesar=False)
+        sin_pdf = Investigacion.objects.create(titulo="Sin PDF")
+        quitado = self.subir("Quitado", b'%PDF quitado')
+        Investigacion.objects.filter(pk=quitado.pk).update(archivo_pdf=None)
+
+        with mock.patch('marketing.management.commands.procesar_pdfs.procesar_pdf') as procesar:
+            call_command('procesar_pdfs', stdout=StringIO())
+
+        procesados = {pk for modelo, pk in (llamada.args for llamada in procesar.call_args_list)}
+        self.assertEqual(procesados, {pendiente.pk, quitado.pk})
+        self.assertNotIn(al_dia.pk, procesados)
+        self.assertNotIn(sin_pdf.pk, procesados)
+
+
+class SitemapsIncrementalesTests(TestCase):
+    ANTES = 1_600_000_000  # mtime de referencia para ver qué archivos se reescriben
+
+    def setUp(self):
+        self.seo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.seo, ignore_errors=True)
+        ajustes = override_settings(SEO_ROOT=self.seo, SEO_URL='https://reina.test/seo/', FRONTEND_URL='https://reina.test')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        categoria = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        Producto.objects.create(nombre="Maíz", precio=1000, categoria=categoria, descripcion="Descripción")
+        self.blog = Blog.objects.create(titulo="Abonos caseros", resumen="Resumen")
+        self.noticia = Noticia.objects.create(titulo="Feria agrícola", resumen="Resumen")
+
+    def archivo(self, nombre):
+        return os.path.join(self.seo, nombre)
+
+    def leer(self, nombre):
+        with open(self.archivo(nombre), encoding='utf-8') as archivo:
+            return archivo.read()
+
+    def envejecer_todo(self):
+        for nombre in os.listdir(self.seo):
+            os.utime(self.archivo(nombre), (self.ANTES, self.ANTES))
+
+    def reescritos(self):
+        return sorted(n for n in os.listdir(self.seo) if os.path.getmtime(self.archivo(n)) != self.ANTES)
+
+    def test_solo_se_reescribe_el_fragmento_que_cambio(self):
+        primera = generar()
+        self.assertEqual(primera['productos'], 1)
+        self.envejecer_todo()
+
+        self.blog.titulo = "Abonos caseros para huerta"
+        self.blog.save()
+        self.blog.refresh_from_db()
+        resumen = generar()
+
+        self.assertEqual(resumen, {
+            'productos': 0, 'noticias': 0, 'blog': 1, 'investigaciones': 0, 'protocolos': 0, 'servicios': 0,
+            'feed-blog': 1,
+        })
+        self.assertEqual(
+            self.reescritos(), ['.estado.json', 'feed-blog.xml', 'sitemap-blog-0.xml', 'sitemap.xml']
+        )
+        self.assertIn(f"<lastmod>{self.blog.updated_at.isoformat()}</lastmod>", self.leer('sitemap-blog-0.xml'))
+        self.assertIn("Abonos caseros para huerta", self.leer('feed-blog.xml'))
+
+        self.envejecer_todo()
+        self.assertEqual(sum(generar().values()), 0)
+        self.assertEqual(self.reescritos(), [])
+
+    def test_despublicar_borra_el_fragmento_vacio(self):
+        generar()
+
+        self.noticia.publicado = False
+        self.noticia.save()
+        generar()
+
+        self.assertFalse(os.path.exists(self.archivo('sitemap-noticias-0.xml')))
+        self.assertNotIn('sitemap-noticias-0.xml', self.leer('sitemap.xml'))
+        self.assertIn('https://reina.test/seo/sitemap-blog-0.xml', self.leer('sitemap.xml'))
+
+    def test_completo_reescribe_todo(self):
+        generar()
+        self.envejecer_todo()
+
+        resumen = generar(completo=True)
+
+        self.assertEqual((resumen['productos'], resumen['blog'], resumen['noticias']), (1, 1, 1))
+        self.assertEqual(self.reescritos(), sorted(os.listdir(self.seo)))
@@ -1,12 +1,18 @@
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import Http404
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse
+from drf_spectacular.types import OpenApiTypes
 from store.serializers import ErrorResponseSerializer
 from rest_framework import filters
+from config.metricas import contar_permiso
+from .mixins import QuerysetOptimizadoMixin
+from .descargas import DescargaRenderer, respuesta_descarga
 from .models import (
     Servicio, 
     Noticia, 
@@ -42,8 +48,10 @@ class IsGrupoAdministrador(permissions.BasePermission):
     """
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
-            return False
-        return request.user.groups.filter(name='Administrador').exists() or request.user.is_superuser
+            return contar_permiso(self, False)
+        return contar_permiso(
+            self, request.user.groups.filter(name='Administrador').exists() or request.user.is_superuser
+        )
 
 
 # --- MIXIN PARA DOCUMENTACIÓN DE ERRORES COMUNES ---
@@ -55,6 +63,19 @@ common_errors = {
     500: OpenApiResponse(response=ErrorResponseSerializer, description="Error interno del servidor")
 }
 
+# Esquema compartido por las acciones `descargar` (investigaciones y protocolos)
+descarga_schema = extend_schema(
+    summary="Descargar PDF",
+    description="Cuenta la descarga y entrega el PDF. Soporta `Range` (206) e `If-Range`; "
+                "en producción los bytes los envía el servidor web (X-Accel-Redirect / X-Sendfile).",
+    responses={
+        (200, 'application/pdf'): OpenApiTypes.BINARY,
+        (206, 'application/pdf'): OpenApiTypes.BINARY,
+        404: OpenApiResponse(response=ErrorResponseSerializer, description="Sin PDF o contenido no publicado"),
+        416: OpenApiResponse(description="Range fuera del tamaño del archivo"),
+    }
+)
+
 @extend_schema_view(
     list=extend_schema(
         summary="Listar Categorías",
@@ -136,7 +157,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class ServicioViewSet(viewsets.ModelViewSet):
+class ServicioViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Servicio.objects.all().order_by('orden')
     lookup_field = 'slug'
     parser_classes = [MultiPartParser, FormParser, JSONParser] 
@@ -216,7 +237,7 @@ class CategoriaNoticiaViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class NoticiaViewSet(viewsets.ModelViewSet):
+class NoticiaViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Noticia.objects.all().order_by('-fecha_publicacion')
     lookup_field = 'slug'
     parser_classes = [MultiPartParser, FormParser, JSONParser]
@@ -293,7 +314,7 @@ class CategoriaInvestigacionViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class InvestigacionViewSet(viewsets.ModelViewSet):
+class InvestigacionViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Investigacion.objects.all().order_by('-fecha_publicacion')
     lookup_field = 'slug'
     parser_classes = [MultiPartParser, FormParser, JSONParser]
@@ -306,10 +327,22 @@ class InvestigacionViewSet(viewsets.ModelViewSet):
             return InvestigacionCardSerializer
         return InvestigacionDetailSerializer
 
+    @property
+    def throttle_scope(self):
+        return 'descargas' if self.action == 'descargar' else None
+
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'descargar']:
             return [AllowAny()]
         return [IsGrupoAdministrador()]
+
+    @descarga_schema
+    @action(detail=True, methods=['get'], renderer_classes=[DescargaRenderer])
+    def descargar(self, request, slug=None):
+        investigacion = self.get_object()
+        if not investigacion.publicado and not IsGrupoAdministrador().has_permission(request, self):
+            raise Http404
+        return respuesta_descarga(request, investigacion)
     
 @extend_schema_view(
     list=extend_schema(
@@ -370,7 +403,7 @@ class CertificacionViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class TestimonioViewSet(viewsets.ModelViewSet):
+class TestimonioViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     serializer_class = TestimonioSerializer
     
     # 1. PERMISOS:
@@ -443,7 +476,7 @@ class TestimonioViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class BlogViewSet(viewsets.ModelViewSet):
+class BlogViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     queryset = Blog.objects.all().order_by('-fecha_publicacion')
     lookup_field = 'slug'
     parser_classes = [MultiPartParser, FormParser, JSONParser]
@@ -523,7 +556,7 @@ class CategoriaBlogViewSet(viewsets.ModelViewSet):
         responses={**common_errors}
     ),
 )
-class ProtocoloViewSet(viewsets.ModelViewSet):
+class ProtocoloViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     # Por defecto mostramos solo los visibles, pero el get_queryset tiene la última palabra
     queryset = Protocolo.objects.filter(es_visible=True).order_by('orden')
     lookup_field = 'slug'
@@ -552,10 +585,20 @@ class ProtocoloViewSet(viewsets.ModelViewSet):
             return ProtocoloCardSerializer
         return ProtocoloDetailSerializer
 
+    @property
+    def throttle_scope(self):
+        return 'descargas' if self.action == 'descargar' else None
+
     def get_permissions(self):
         # Lectura pública
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'descargar']:
             return [AllowAny()]
             
         # Escritura (Crear, Editar, Borrar): Solo Grupo Administrador
-        return [IsGrupoAdministrador()]
\ No newline at end of file
+        return [IsGrupoAdministrador()]
+
+    @descarga_schema
+    @action(detail=True, methods=['get'], renderer_classes=[DescargaRenderer])
+    def descargar(self, request, slug=None):
+        # get_queryset ya oculta los protocolos no visibles al público
+        return respuesta_descarga(request, self.get_object())
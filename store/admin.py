@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Producto, Pedido, DetallePedido, Favorito, TarifaEnvio, Direccion
+from django import forms
+from django.contrib import admin, messages
+
+from config.senales import AgruparSenalesAdminMixin
+from marketing.slugs import SlugUnicoAdminForm
+from .models import Producto, Pedido, PedidoHistorial, EventoPago, MovimientoInventario, DetallePedido, Favorito, TarifaEnvio, Direccion
+from .ciclo_pedido import transicion_valida, transicionar_pedidos, cambiar_estado
+from .inventario import ajustar_stock
 
 # --- 1. Configuración de Tarifas de Envío ---
 @admin.register(TarifaEnvio)
@@ -20,21 +26,76 @@ class DireccionAdmin(admin.ModelAdmin):
 
 # --- 3. Productos (Sin cambios mayores) ---
 @admin.register(Producto)
-class ProductoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'precio', 'stock', 'categoria', 'es_destacado')
+class ProductoAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
+    list_display = ('nombre', 'precio', 'stock', 'categoria', 'es_destacado', 'unidades_vendidas', 'total_favoritos')
     list_filter = ('categoria', 'es_destacado')
     search_fields = ('nombre', 'slug')
+    readonly_fields = ('unidades_vendidas', 'total_favoritos', 'pedidos_30_dias', 'ultima_venta')
     prepopulated_fields = {'slug': ('nombre',)}
+    form = SlugUnicoAdminForm  # Nombre repetido: usa el siguiente slug libre en vez de fallar
     autocomplete_fields = ['relacionados']
 
+    # El stock editado se registra como ajuste en el libro de inventario
+    # (al editar, Producto.save() ya no escribe la columna `stock`)
+    def save_model(self, request, obj, form, change):
+        deseado = obj.stock
+        if not change:
+            obj.stock = 0  # El saldo inicial también entra por el libro
+        super().save_model(request, obj, form, change)
+        if 'stock' in form.changed_data:
+            ajustar_stock(obj, deseado, usuario=request.user, nota="Edición en el admin" if change else "Saldo inicial")
+
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'producto', 'tipo', 'cantidad', 'pedido', 'usuario', 'nota')
+    list_filter = ('tipo', 'created_at')
+    search_fields = ('producto__nombre', 'producto__slug', 'nota')
+    list_select_related = ('producto', 'usuario')
+    readonly_fields = [f.name for f in MovimientoInventario._meta.fields]
+
+    # Libro de solo agregar: no se crea, edita ni borra desde el admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # --- 4. Pedidos (Actualizado con Envío) ---
 class DetallePedidoInline(admin.TabularInline):
     model = DetallePedido
     readonly_fields = ('precio_unitario',) 
     extra = 0
 
+class PedidoHistorialInline(admin.TabularInline):
+    model = PedidoHistorial
+    fields = ('created_at', 'estado_anterior', 'estado_nuevo', 'usuario', 'motivo')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class PedidoAdminForm(forms.ModelForm):
+    class Meta:
+        model = Pedido
+        fields = '__all__'
+
+    def clean_estado(self):
+        nuevo = self.cleaned_data['estado']
+        actual = self.initial.get('estado')
+        if self.instance.pk and nuevo != actual and not transicion_valida(actual, nuevo):
+            raise forms.ValidationError(f"No se puede pasar de {actual} a {nuevo}.")
+        return nuevo
+
 @admin.register(Pedido)
-class PedidoAdmin(admin.ModelAdmin):
+class PedidoAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
+    form = PedidoAdminForm
+    actions = ['marcar_pagado', 'marcar_enviado', 'cancelar']
+
     # Agregamos 'ciudad_destino' y 'total' para ver rápido la info clave
     list_display = ('id', 'usuario', 'ciudad_destino', 'estado', 'total', 'created_at')
     
@@ -44,7 +105,7 @@ class PedidoAdmin(admin.ModelAdmin):
     # Buscador por usuario o ID de pedido
     search_fields = ('id', 'usuario__email', 'usuario__first_name')
     
-    inlines = [DetallePedidoInline]
+    inlines = [DetallePedidoInline, PedidoHistorialInline]
     
     # Campos que no se deben editar manualmente para evitar descuadres contables
     readonly_fields = ('usuario', 'subtotal', 'costo_envio', 'total', 'created_at', 'transaccion_id', 'metodo_pago')
@@ -69,4 +130,49 @@ class PedidoAdmin(admin.ModelAdmin):
         return "Sin dirección"
     ciudad_destino.short_description = "Destino"
 
-admin.site.register(Favorito)
\ No newline at end of file
+    # El cambio de estado pasa por el ciclo de vida (validación, stock e historial)
+    def save_model(self, request, obj, form, change):
+        if change and 'estado' in form.changed_data:
+            nuevo = obj.estado
+            obj.estado = form.initial['estado']
+            super().save_model(request, obj, form, change)
+            cambiar_estado(obj, nuevo, usuario=request.user, motivo="Edición en el admin")
+        else:
+            super().save_model(request, obj, form, change)
+
+    def _transicionar(self, request, queryset, estado):
+        resultado = transicionar_pedidos(
+            queryset.values_list('id', flat=True), estado, usuario=request.user, motivo="Acción masiva del admin"
+        )
+        if resultado['actualizados']:
+            self.message_user(request, f"{len(resultado['actualizados'])} pedidos pasaron a {estado}.", messages.SUCCESS)
+        if resultado['omitidos']:
+            ids = ", ".join(f"#{o['id']}" for o in resultado['omitidos'])
+            self.message_user(request, f"Omitidos (transición no permitida): {ids}", messages.WARNING)
+
+    @admin.action(description="Marcar como Pagado")
+    def marcar_pagado(self, request, queryset):
+        self._transicionar(request, queryset, 'PAGADO')
+
+    @admin.action(description="Marcar como Enviado")
+    def marcar_enviado(self, request, queryset):
+        self._transicionar(request, queryset, 'ENVIADO')
+
+    @admin.action(description="Cancelar (repone stock)")
+    def cancelar(self, request, queryset):
+        self._transicionar(request, queryset, 'CANCELADO')
+
+# --- 5. Cola de eventos de pago (solo lectura) ---
+@admin.register(EventoPago)
+class EventoPagoAdmin(admin.ModelAdmin):
+    list_display = ('evento_id', 'tipo', 'referencia', 'transaccion_id', 'estado', 'intentos', 'created_at')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('evento_id', 'referencia', 'transaccion_id')
+    readonly_fields = [f.name for f in EventoPago._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(Favorito)
+class FavoritoAdmin(AgruparSenalesAdminMixin, admin.ModelAdmin):
+    pass
\ No newline at end of file
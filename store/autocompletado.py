@@ -0,0 +1,128 @@
+# store/autocompletado.py
+"""
+Autocompletado del buscador sobre productos, blog, noticias y protocolos.
+
+En lugar de un `SearchFilter` (LIKE '%texto%' sobre cuatro tablas, más
+paginación) por cada tecla, se consulta `TerminoAutocompletado`: una fila
+por palabra de cada título visible con el resto del título desde ahí,
+normalizado (minúsculas, sin tildes). Buscar es un `LIKE 'prefijo%'` sobre
+esa columna indexada, y la respuesta de cada prefijo queda un minuto en el
+cache compartido.
+
+El índice se mantiene con señales (ver `store/signals.py`), agrupadas por
+lote dentro de `agrupar_senales()`.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from config.metricas import CACHE_CONSULTAS
+from marketing.models import Blog, Noticia, Protocolo
+from .models import Producto, TerminoAutocompletado
+
+# tipo -> (modelo, campo del título, filtro de visibilidad)
+FUENTES = {
+    'producto': (Producto, 'nombre', {}),
+    'blog': (Blog, 'titulo', {'publicado': True}),
+    'noticia': (Noticia, 'titulo', {'publicado': True}),
+    'protocolo': (Protocolo, 'titulo', {'es_visible': True}),
+}
+TIPO_POR_MODELO = {modelo: tipo for tipo, (modelo, _, _) in FUENTES.items()}
+
+MIN_CARACTERES = 2
+LIMITE = 8
+CACHE_SEGUNDOS = 60
+LOTE = 1000
+
+_separadores = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    """'Bálsamo  Ñame-2' -> 'balsamo name 2'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _separadores.sub(' ', texto).strip()
+
+
+def terminos(titulo):
+    """[(posicion, término)]: el título normalizado desde cada una de sus palabras."""
+    palabras = normalizar(titulo).split()
+    return [(i, ' '.join(palabras[i:])[:200]) for i in range(len(palabras))]
+
+
+def _filas(tipo, objetos):
+    return [
+        TerminoAutocompletado(
+            termino=termino, posicion=posicion, tipo=tipo,
+            objeto_id=objeto_id, titulo=titulo[:200], slug=slug,
+        )
+        for objeto_id, titulo, slug in objetos
+        for posicion, termino in terminos(titulo)
+    ]
+
+
+def reindexar(tipo, ids):
+    """Reemplaza los términos de los objetos `ids` (los no visibles o borrados quedan fuera)."""
+    modelo, campo, visibles = FUENTES[tipo]
+    ids = list(ids)
+    with transaction.atomic():
+        TerminoAutocompletado.objects.filter(tipo=tipo, objeto_id__in=ids).delete()
+        objetos = modelo.objects.filter(id__in=ids, **visibles).values_list('id', campo, 'slug')
+        TerminoAutocompletado.objects.bulk_create(_filas(tipo, objetos), batch_size=LOTE)
+
+
+def reindexar_lote(elementos):
+    """Acción de `agrupar_senales`: {(tipo, id): None} -> un reindexado por tipo."""
+    por_tipo = defaultdict(list)
+    for tipo, objeto_id in elementos:
+        por_tipo[tipo].append(objeto_id)
+    for tipo, ids in por_tipo.items():
+        reindexar(tipo, ids)
+
+
+def reindexar_todo():
+    """Reconstruye el índice completo. Retorna {tipo: términos creados}."""
+    resumen = {}
+    for tipo, (modelo, campo, visibles) in FUENTES.items():
+        with transaction.atomic():
+            TerminoAutocompletado.objects.filter(tipo=tipo).delete()
+            objetos = modelo.objects.filter(**visibles).values_list('id', campo, 'slug').iterator(chunk_size=LOTE)
+            creados = TerminoAutocompletado.objects.bulk_create(_filas(tipo, objetos), batch_size=LOTE)
+        resumen[tipo] = len(creados)
+    return resumen
+
+
+def autocompletar(texto, tipo=None, limite=LIMITE):
+    """Hasta `limite` resultados {id, titulo, slug, tipo}; primero los que empiezan por el texto."""
+    prefijo = normalizar(texto)[:200]
+    if len(prefijo) < MIN_CARACTERES:
+        return []
+
+    # Hash: las claves de Memcached no admiten espacios
+    clave = f"autocompletar:{tipo or 'todos'}:{limite}:{hashlib.md5(prefijo.encode()).hexdigest()}"
+    resultados = cache.get(clave)
+    CACHE_CONSULTAS.inc(cache='autocompletado', resultado='miss' if resultados is None else 'hit')
+    if resultados is not None:
+        return resultados
+
+    queryset = TerminoAutocompletado.objects.filter(termino__startswith=prefijo)
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+    filas = queryset.order_by('posicion', 'titulo').values_list('tipo', 'objeto_id', 'titulo', 'slug')
+
+    # Un objeto puede coincidir por varias palabras: se pide de más y se deduplica
+    resultados, vistos = [], set()
+    for fila_tipo, objeto_id, titulo, slug in filas[:limite * 3]:
+        if (fila_tipo, objeto_id) in vistos:
+            continue
+        vistos.add((fila_tipo, objeto_id))
+        resultados.append({'id': objeto_id, 'titulo': titulo, 'slug': slug, 'tipo': fila_tipo})
+        if len(resultados) == limite:
+            break
+
+    cache.set(clave, resultados, CACHE_SEGUNDOS)
+    return resultados
@@ -0,0 +1,152 @@
+# store/ciclo_pedido.py
+"""
+Ciclo de vida de los pedidos.
+
+Todas las transiciones de `Pedido.estado` pasan por aquí: se validan contra
+`TRANSICIONES`, se aplican con un único UPDATE por lote, y al cancelar se
+devuelve el stock por el libro de inventario (y se revierten los contadores
+de venta) con un UPDATE por tabla. Cada cambio queda registrado en `PedidoHistorial` con un solo
+bulk_create.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .contadores import VENTANA_DIAS, revertir_ventas
+from .inventario import registrar_movimientos
+from .models import Pedido, PedidoHistorial, DetallePedido, EventoPago, MovimientoInventario
+
+TRANSICIONES = {
+    'PENDIENTE': {'PAGADO', 'CANCELADO'},
+    'PAGADO': {'ENVIADO', 'CANCELADO'},
+    'ENVIADO': set(),
+    'CANCELADO': set(),
+}
+
+MAX_PEDIDOS_POR_LOTE = 1000
+LOTE_VENCIDOS = 200
+
+
+def transicion_valida(actual, nuevo):
+    return nuevo in TRANSICIONES.get(actual, set())
+
+
+def _reponer_stock(pedido_ids, usuario=None, motivo=''):
+    """Devuelve al inventario las unidades de los pedidos cancelados."""
+    filas = (
+        DetallePedido.objects.filter(pedido_id__in=pedido_ids)
+        .values_list('pedido_id', 'producto_id', 'pedido__created_at')
+        .annotate(total=Sum('cantidad'))
+    )
+    desde = timezone.now() - timedelta(days=VENTANA_DIAS)
+    movimientos = []
+    cantidades = defaultdict(int)
+    recientes = defaultdict(int)  # Pedidos que aún cuentan en `pedidos_30_dias`
+    for pedido_id, producto_id, creado, total in filas:
+        movimientos.append(MovimientoInventario(
+            producto_id=producto_id, tipo='CANCELACION', cantidad=total,
+            pedido_id=pedido_id, usuario=usuario, nota=motivo,
+        ))
+        cantidades[producto_id] += total
+        if creado >= desde:
+            recientes[producto_id] += 1
+
+    registrar_movimientos(movimientos)
+    revertir_ventas(cantidades, recientes)
+
+
+def transicionar_pedidos(pedido_ids, nuevo_estado, usuario=None, motivo=''):
+    """
+    Mueve un lote de pedidos a `nuevo_estado`.
+    Los pedidos inexistentes o con una transición no permitida se omiten y se
+    reportan; el resto se actualiza en bloque.
+    Retorna {'actualizados': [ids], 'omitidos': [{'id', 'estado', 'detalle'}]}.
+    """
+    pedido_ids = set(pedido_ids)
+    omitidos = []
+
+    with transaction.atomic():
+        # Bloquear las filas evita que dos despachadores cancelen (y repongan) dos veces
+        estados = dict(
+            Pedido.objects.select_for_update().filter(id__in=pedido_ids).values_list('id', 'estado')
+        )
+
+        validos = defaultdict(list)  # estado_anterior -> ids
+        for pedido_id in sorted(pedido_ids):
+            actual = estados.get(pedido_id)
+            if actual is None:
+                omitidos.append({'id': pedido_id, 'estado': None, 'detalle': "El pedido no existe."})
+            elif not transicion_valida(actual, nuevo_estado):
+                omitidos.append({
+                    'id': pedido_id, 'estado': actual,
+                    'detalle': f"No se puede pasar de {actual} a {nuevo_estado}.",
+                })
+            else:
+                validos[actual].append(pedido_id)
+
+        actualizados = [pedido_id for ids in validos.values() for pedido_id in ids]
+        if actualizados:
+            Pedido.objects.filter(id__in=actualizados).update(estado=nuevo_estado)
+            if nuevo_estado == 'CANCELADO':
+                _reponer_stock(actualizados, usuario=usuario, motivo=motivo)
+
+            PedidoHistorial.objects.bulk_create([
+                PedidoHistorial(
+                    pedido_id=pedido_id, estado_anterior=anterior, estado_nuevo=nuevo_estado,
+                    usuario=usuario, motivo=motivo,
+                )
+                for anterior, ids in validos.items() for pedido_id in ids
+            ])
+
+    return {'actualizados': sorted(actualizados), 'omitidos': omitidos}
+
+
+def cambiar_estado(pedido, nuevo_estado, usuario=None, motivo=''):
+    """Transición de un solo pedido. Lanza ValidationError si no está permitida."""
+    resultado = transicionar_pedidos([pedido.id], nuevo_estado, usuario=usuario, motivo=motivo)
+    if resultado['omitidos']:
+        raise ValidationError({"detail": resultado['omitidos'][0]['detalle']})
+    pedido.estado = nuevo_estado
+    return pedido
+
+
+def _pedidos_con_pago_en_cola():
+    """Pedidos con un evento de Bold aún sin procesar: no se deben cancelar."""
+    # Formato de `pagos.referencia_pedido` ('PED-<id>')
+    referencias = EventoPago.objects.filter(estado='PENDIENTE').values_list('referencia', flat=True)
+    return {int(r[4:]) for r in referencias if r.startswith('PED-') and r[4:].isdigit()}
+
+
+def cancelar_pedidos_vencidos(horas=None, lote=LOTE_VENCIDOS, simular=False):
+    """
+    Cancela los pedidos PENDIENTE más viejos que `horas` y devuelve su stock.
+    Recorre los candidatos por lotes (índice parcial sobre created_at de los
+    pendientes) y cada lote va en su propia transacción corta.
+    Retorna el número de pedidos cancelados (o candidatos si `simular`).
+    """
+    horas = horas if horas is not None else settings.PEDIDO_PENDIENTE_TTL_HORAS
+    limite = timezone.now() - timedelta(hours=horas)
+    candidatos = (
+        Pedido.objects.filter(estado='PENDIENTE', created_at__lt=limite)
+        .exclude(id__in=_pedidos_con_pago_en_cola())
+        .values_list('id', flat=True)
+    )
+    if simular:
+        return candidatos.count()
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        # Keyset por id: los omitidos (pagados mientras tanto) no se vuelven a leer
+        ids = list(candidatos.filter(id__gt=ultimo_id).order_by('id')[:lote])
+        if not ids:
+            return total
+        resultado = transicionar_pedidos(ids, 'CANCELADO', motivo=f"Pendiente por más de {horas} horas")
+        total += len(resultado['actualizados'])
+        ultimo_id = ids[-1]
+
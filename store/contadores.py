@@ -0,0 +1,113 @@
+# store/contadores.py
+"""
+Contadores de popularidad desnormalizados en `Producto`.
+
+Las escrituras en caliente (checkout, favoritos) usan incrementos atómicos
+con F() para no hacer read-modify-write sobre la fila del producto.
+`reconciliar_contadores` recalcula todo desde las tablas fuente para
+corregir cualquier desviación (y para que `pedidos_30_dias` "olvide"
+las ventas que salieron de la ventana).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Producto, DetallePedido, Favorito
+
+VENTANA_DIAS = 30
+
+
+def registrar_venta(producto_id, cantidad):
+    """Suma una venta a los contadores del producto en una sola sentencia."""
+    Producto.objects.filter(id=producto_id).update(
+        unidades_vendidas=F('unidades_vendidas') + cantidad,
+        pedidos_30_dias=F('pedidos_30_dias') + 1,
+        ultima_venta=timezone.now(),
+    )
+
+
+def revertir_venta(producto_id, cantidad, reciente=True):
+    """Descuenta una venta cancelada sin bajar de cero (`reciente`: el pedido aún está en la ventana)."""
+    revertir_ventas({producto_id: cantidad}, {producto_id: 1} if reciente else None)
+
+
+def revertir_ventas(cantidades, pedidos_recientes=None):
+    """
+    Versión masiva de `revertir_venta` para {producto_id: cantidad}: un solo
+    UPDATE con CASE por producto, sin bajar de cero. `pedidos_recientes`
+    ({producto_id: pedidos}) son los pedidos cancelados que seguían dentro
+    de la ventana de `pedidos_30_dias`.
+    """
+    if not cantidades:
+        return
+    cambios = {'unidades_vendidas': Greatest(F('unidades_vendidas') - valor_por_producto(cantidades), Value(0))}
+    if pedidos_recientes:
+        cambios['pedidos_30_dias'] = Greatest(F('pedidos_30_dias') - valor_por_producto(pedidos_recientes), Value(0))
+    Producto.objects.filter(id__in=cantidades).update(**cambios)
+
+
+def valor_por_producto(valores):
+    """CASE id WHEN ... THEN valor: un valor distinto por fila en un mismo UPDATE."""
+    return Case(
+        *(When(id=producto_id, then=Value(valor)) for producto_id, valor in valores.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def sumar_favorito(producto_id):
+    Producto.objects.filter(id=producto_id).update(total_favoritos=F('total_favoritos') + 1)
+
+
+def restar_favorito(producto_id):
+    Producto.objects.filter(id=producto_id, total_favoritos__gt=0).update(
+        total_favoritos=F('total_favoritos') - 1
+    )
+
+
+def aplicar_deltas_favoritos(deltas):
+    """
+    Aplica {producto_id: delta} acumulados en un lote de señales:
+    un UPDATE por cada valor distinto de delta, sin bajar de cero.
+    """
+    por_delta = defaultdict(list)
+    for producto_id, delta in deltas.items():
+        if delta:
+            por_delta[delta].append(producto_id)
+    for delta, ids in por_delta.items():
+        Producto.objects.filter(id__in=ids).update(
+            total_favoritos=Greatest(F('total_favoritos') + delta, Value(0))
+        )
+
+
+def _subconsulta(queryset, agregado):
+    """Agregado correlacionado por producto, con 0/None si no hay filas."""
+    return Subquery(
+        queryset.filter(producto=OuterRef('pk'))
+        .values('producto')
+        .annotate(valor=agregado)
+        .values('valor')[:1]
+    )
+
+
+def reconciliar_contadores():
+    """
+    Recalcula todos los contadores en un único UPDATE con subconsultas.
+    Los pedidos cancelados no cuentan como venta.
+    Retorna el número de productos actualizados.
+    """
+    ventas = DetallePedido.objects.exclude(pedido__estado='CANCELADO')
+    desde = timezone.now() - timedelta(days=VENTANA_DIAS)
+
+    return Producto.objects.update(
+        unidades_vendidas=Coalesce(_subconsulta(ventas, Sum('cantidad')), Value(0)),
+        pedidos_30_dias=Coalesce(
+            _subconsulta(ventas.filter(pedido__created_at__gte=desde), Count('pedido', distinct=True)),
+            Value(0),
+        ),
+        ultima_venta=_subconsulta(ventas, Max('pedido__created_at')),
+        total_favoritos=Coalesce(_subconsulta(Favorito.objects.all(), Count('id')), Value(0)),
+    )
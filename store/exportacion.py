@@ -0,0 +1,113 @@
+# store/exportacion.py
+"""
+Exportación masiva de pedidos para despacho y contabilidad.
+
+Los generadores recorren los pedidos con un cursor del servidor
+(`.iterator(chunk_size=...)`) y producen el archivo línea por línea,
+así la memoria se mantiene plana sin importar cuántos pedidos haya.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Pedido
+
+CHUNK_SIZE = 2000
+
+COLUMNAS_CSV = [
+    'pedido_id', 'fecha', 'estado', 'cliente', 'email', 'telefono',
+    'recibe', 'direccion', 'ciudad', 'departamento', 'referencia',
+    'producto', 'cantidad', 'precio_unitario',
+    'subtotal', 'costo_envio', 'total', 'metodo_pago', 'transaccion_id',
+]
+
+# Texto escrito por el cliente: en el CSV no puede empezar como una fórmula
+COLUMNAS_LIBRES = ('cliente', 'recibe', 'direccion', 'referencia')
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Eco:
+    """Pseudo-buffer: csv.writer "escribe" aquí y recibimos la línea ya formateada."""
+
+    def write(self, valor):
+        return valor
+
+
+def pedidos_para_exportar(estado=None, desde=None, hasta=None):
+    queryset = (
+        Pedido.objects
+        .select_related('usuario', 'direccion_envio')
+        .prefetch_related('detalles__producto')
+        .order_by('id')
+    )
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    if desde:
+        queryset = queryset.filter(created_at__gte=desde)
+    if hasta:
+        queryset = queryset.filter(created_at__lt=hasta)
+    # Con chunk_size, Django aplica el prefetch por lote sobre el cursor del servidor
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _datos_pedido(pedido):
+    direccion = pedido.direccion_envio
+    return {
+        'pedido_id': pedido.id,
+        'fecha': timezone.localtime(pedido.created_at).isoformat(),
+        'estado': pedido.estado,
+        'cliente': pedido.usuario.get_full_name(),
+        'email': pedido.usuario.email,
+        'telefono': direccion.telefono if direccion else '',
+        'recibe': direccion.nombre_completo if direccion else '',
+        'direccion': direccion.direccion if direccion else '',
+        'ciudad': direccion.ciudad if direccion else '',
+        'departamento': direccion.departamento if direccion else '',
+        'referencia': direccion.referencia if direccion else '',
+        'subtotal': pedido.subtotal,
+        'costo_envio': pedido.costo_envio,
+        'total': pedido.total,
+        'metodo_pago': pedido.metodo_pago,
+        'transaccion_id': pedido.transaccion_id or '',
+    }
+
+
+def _sin_formula(valor):
+    """Antepone ' a lo que una hoja de cálculo interpretaría como fórmula (=, +, -, @)."""
+    return f"'{valor}" if valor and valor.startswith(INICIO_FORMULA) else valor
+
+
+def filas_csv(pedidos):
+    """
+    Una fila por producto de cada pedido (formato plano para hojas de cálculo).
+    Un pedido sin productos sale en una fila con las columnas de producto vacías.
+    """
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS_CSV)
+    for pedido in pedidos:
+        datos = _datos_pedido(pedido)
+        datos.update({columna: _sin_formula(datos[columna]) for columna in COLUMNAS_LIBRES})
+        productos = [
+            (detalle.producto.nombre, detalle.cantidad, detalle.precio_unitario)
+            for detalle in pedido.detalles.all()
+        ]
+        for producto, cantidad, precio_unitario in productos or [('', '', '')]:
+            datos.update(producto=producto, cantidad=cantidad, precio_unitario=precio_unitario)
+            yield escritor.writerow([datos[columna] for columna in COLUMNAS_CSV])
+
+
+def lineas_jsonl(pedidos):
+    """Un objeto JSON por pedido con sus productos anidados."""
+    for pedido in pedidos:
+        datos = _datos_pedido(pedido)
+        datos['detalles'] = [
+            {
+                'producto': detalle.producto.nombre,
+                'cantidad': detalle.cantidad,
+                'precio_unitario': detalle.precio_unitario,
+            }
+            for detalle in pedido.detalles.all()
+        ]
+        yield json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
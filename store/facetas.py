@@ -0,0 +1,103 @@
+# store/facetas.py
+"""
+Facetas del catálogo: conteos por categoría, rango de precio y disponibilidad.
+
+Todo sale de una sola consulta agrupada por categoría con conteos
+condicionales (COUNT ... FILTER). Las facetas son disyuntivas: cada una se
+cuenta con los demás filtros aplicados pero no con el suyo, así al elegir
+una categoría las otras siguen mostrando cuántos productos tendrían.
+El resultado se guarda un momento en el cache compartido por combinación
+de filtros, porque la misma combinación se pide en cada página.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from config.metricas import CACHE_CONSULTAS
+
+# (desde, hasta) en pesos; None = sin límite. `hasta` no se incluye.
+RANGOS_PRECIO = [
+    (None, 50000),
+    (50000, 100000),
+    (100000, 200000),
+    (200000, 500000),
+    (500000, None),
+]
+CACHE_SEGUNDOS = 60
+
+
+def _rango_q(desde, hasta):
+    q = Q(precio__isnull=False)
+    if desde is not None:
+        q &= Q(precio__gte=desde)
+    if hasta is not None:
+        q &= Q(precio__lt=hasta)
+    return q
+
+
+def _contar(q):
+    return Count('id', filter=q) if q else Count('id')
+
+
+def calcular_facetas(queryset, seleccion):
+    """
+    `queryset`: productos con los filtros que no son facetas (búsqueda, destacados).
+    `seleccion`: valores de los filtros facetados (`ProductoFilter.seleccion`).
+    """
+    q_precio = Q()
+    if seleccion.get('precio_min') is not None:
+        q_precio &= Q(precio__gte=seleccion['precio_min'])
+    if seleccion.get('precio_max') is not None:
+        q_precio &= Q(precio__lte=seleccion['precio_max'])
+
+    q_stock = Q()
+    if seleccion.get('en_stock') is not None:
+        q_stock = Q(stock__gt=0) if seleccion['en_stock'] else Q(stock=0)
+
+    conteos = {
+        'total': _contar(q_precio & q_stock),
+        'con_stock': _contar(q_precio & Q(stock__gt=0)),
+        'sin_stock': _contar(q_precio & Q(stock=0)),
+    }
+    for i, (desde, hasta) in enumerate(RANGOS_PRECIO):
+        conteos[f'precio_{i}'] = _contar(q_stock & _rango_q(desde, hasta))
+
+    filas = list(
+        queryset.order_by()
+        .values('categoria_id', 'categoria__nombre', 'categoria__slug')
+        .annotate(**conteos)
+    )
+
+    categorias_elegidas = set(seleccion.get('categoria') or [])
+    elegidas = [f for f in filas if not categorias_elegidas or f['categoria_id'] in categorias_elegidas]
+
+    return {
+        'categorias': sorted(
+            (
+                {'id': f['categoria_id'], 'nombre': f['categoria__nombre'], 'slug': f['categoria__slug'], 'total': f['total']}
+                for f in filas if f['total']
+            ),
+            key=lambda c: (c['nombre'] is None, c['nombre'] or ''),
+        ),
+        'precios': [
+            {'desde': desde, 'hasta': hasta, 'total': sum(f[f'precio_{i}'] for f in elegidas)}
+            for i, (desde, hasta) in enumerate(RANGOS_PRECIO)
+        ],
+        'stock': {
+            'en_stock': sum(f['con_stock'] for f in elegidas),
+            'agotados': sum(f['sin_stock'] for f in elegidas),
+        },
+    }
+
+
+def facetas_en_cache(parametros, calcular):
+    """Cachea el resultado de `calcular()` por combinación de filtros (`parametros`: pares clave-valor)."""
+    huella = hashlib.md5(repr(sorted(parametros)).encode()).hexdigest()
+    clave = f"facetas:productos:{huella}"
+    facetas = cache.get(clave)
+    CACHE_CONSULTAS.inc(cache='facetas', resultado='miss' if facetas is None else 'hit')
+    if facetas is None:
+        facetas = calcular()
+        cache.set(clave, facetas, CACHE_SEGUNDOS)
+    return facetas
@@ -0,0 +1,70 @@
+# store/favoritos.py
+"""
+Favoritos en lote.
+
+El índice único (usuario, producto) de `Favorito` es el que resuelve todo:
+los duplicados los descarta la base de datos (`ignore_conflicts`) en vez de
+un exists() previo, y las consultas de existencia (`ids_favoritos`,
+`anotar_favoritos`) se responden solo con el índice.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+
+from config.senales import agrupar_senales
+from .contadores import aplicar_deltas_favoritos
+from .models import Favorito, Producto
+
+MAX_PRODUCTOS_POR_LOTE = 100
+
+
+def _ya_favorito(usuario):
+    return Exists(Favorito.objects.filter(usuario=usuario, producto=OuterRef('pk')))
+
+
+def anotar_favoritos(queryset, usuario):
+    """Agrega `is_favorito` a un queryset de productos con un EXISTS por fila de la misma consulta."""
+    if usuario is None or not usuario.is_authenticated:
+        return queryset.annotate(is_favorito=Value(False))
+    return queryset.annotate(is_favorito=_ya_favorito(usuario))
+
+
+def ids_favoritos(usuario, producto_ids=None):
+    """IDs de los productos favoritos del usuario (opcionalmente solo entre `producto_ids`)."""
+    queryset = Favorito.objects.filter(usuario=usuario)
+    if producto_ids is not None:
+        queryset = queryset.filter(producto_id__in=producto_ids)
+    return sorted(queryset.values_list('producto_id', flat=True))
+
+
+def agregar_favoritos(usuario, producto_ids):
+    """
+    Marca varios productos como favoritos con un solo INSERT.
+    Retorna {'agregados': [ids nuevos], 'no_encontrados': [ids]}.
+    """
+    producto_ids = set(producto_ids)
+    with transaction.atomic():
+        # Productos existentes y si ya eran favoritos, en una sola consulta
+        estado = dict(
+            Producto.objects.filter(id__in=producto_ids)
+            .annotate(ya=_ya_favorito(usuario))
+            .values_list('id', 'ya')
+        )
+        nuevos = sorted(producto_id for producto_id, ya in estado.items() if not ya)
+
+        # bulk_create no dispara post_save: el contador se suma aquí, en un UPDATE.
+        # Una petición simultánea del mismo usuario puede contar de más;
+        # `reconciliar_contadores` lo corrige.
+        Favorito.objects.bulk_create(
+            [Favorito(usuario=usuario, producto_id=producto_id) for producto_id in nuevos],
+            ignore_conflicts=True,
+        )
+        aplicar_deltas_favoritos({producto_id: 1 for producto_id in nuevos})
+
+    return {'agregados': nuevos, 'no_encontrados': sorted(producto_ids - estado.keys())}
+
+
+def quitar_favoritos(usuario, producto_ids):
+    """Quita varios favoritos. Los contadores bajan en un UPDATE por lote de señales."""
+    with agrupar_senales():
+        quitados, _ = Favorito.objects.filter(usuario=usuario, producto_id__in=producto_ids).delete()
+    return quitados
@@ -0,0 +1,40 @@
+# store/filters.py
+import django_filters
+
+from .models import Producto
+
+# Filtros que además son facetas: al contar una faceta se ignora su propio filtro
+FILTROS_FACETADOS = ('categoria', 'precio_min', 'precio_max', 'en_stock')
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class ProductoFilter(django_filters.FilterSet):
+    """
+    Filtros del catálogo. Rango de precio y stock se resuelven con los índices
+    `store_prod_precio_idx` y `store_prod_stock_precio_idx`.
+    """
+    categoria = NumberInFilter(field_name='categoria', lookup_expr='in', help_text="IDs separados por coma")
+    precio_min = django_filters.NumberFilter(field_name='precio', lookup_expr='gte')
+    precio_max = django_filters.NumberFilter(field_name='precio', lookup_expr='lte')
+    en_stock = django_filters.BooleanFilter(method='filtrar_en_stock')
+
+    class Meta:
+        model = Producto
+        fields = ['categoria', 'es_destacado', 'precio_min', 'precio_max', 'en_stock']
+
+    def filtrar_en_stock(self, queryset, name, value):
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
+
+    def seleccion(self):
+        """Valores de los filtros facetados (para `facetas.calcular_facetas`)."""
+        return {nombre: self.form.cleaned_data.get(nombre) for nombre in FILTROS_FACETADOS}
+
+    def filtrar_sin_facetas(self, queryset):
+        """Aplica solo los filtros que no son facetas (base sobre la que se cuentan)."""
+        for nombre, valor in self.form.cleaned_data.items():
+            if nombre not in FILTROS_FACETADOS:
+                queryset = self.filters[nombre].filter(queryset, valor)
+        return queryset
@@ -0,0 +1,218 @@
+# store/importacion.py
+"""
+Importación masiva de productos (CSV o JSONL).
+
+El archivo se lee como stream y se procesa por lotes: cada lote se valida
+con `ProductoImportSerializer` y se hace upsert por `slug` con un solo
+`bulk_create(update_conflicts=True)`; el stock del archivo entra como
+movimientos de importación en el libro de inventario. Como bulk_create no
+dispara `post_save`, no sale un correo por producto: al final se envía un
+único resumen (y el índice de autocompletado se actualiza por lote). La conversión a WebP de las imágenes se delega a un pool en
+segundo plano para no frenar la importación.
+"""
+import csv
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.db import connection, transaction
+
+from marketing.models import Categoria
+from .autocompletado import reindexar
+from .inventario import registrar_movimientos
+from .models import Producto, MovimientoInventario
+from .serializers import ProductoImportSerializer
+from .signals import notificar_productos_importados
+
+CHUNK_SIZE = 500
+MAX_ERRORES_REPORTADOS = 100
+
+# Columna del archivo -> campo del modelo
+CAMPOS = {
+    'nombre': 'nombre',
+    'descripcion': 'descripcion',
+    'precio': 'precio',
+    'stock': 'stock',
+    'es_destacado': 'es_destacado',
+    'categoria': 'categoria',
+    'imagen': 'imagen_principal',
+}
+
+logger = logging.getLogger(__name__)
+
+_pool_imagenes = ThreadPoolExecutor(max_workers=2, thread_name_prefix='webp')
+
+
+class FilaIlegible:
+    """Línea que no se pudo leer: se reporta en `errores` como cualquier fila inválida."""
+
+    def __init__(self, detalle):
+        self.detalle = detalle
+
+
+def _filas_jsonl(archivo_texto):
+    for linea in archivo_texto:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield FilaIlegible(f"JSON inválido: {e}")
+            continue
+        yield fila if isinstance(fila, dict) else FilaIlegible("Cada línea debe ser un objeto JSON.")
+
+
+def _filas_csv(archivo_texto):
+    lector = csv.DictReader(archivo_texto)
+    while True:
+        try:
+            fila = next(lector)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield FilaIlegible(f"CSV inválido: {e}")
+            continue
+        yield fila
+
+
+def leer_filas(archivo_texto, formato):
+    """
+    Itera las filas de un archivo de texto abierto sin cargarlo completo.
+    Las líneas ilegibles salen como `FilaIlegible` y la lectura sigue; si el
+    archivo deja de ser UTF-8 válido se corta ahí (lo ya importado se conserva).
+    """
+    filas = _filas_jsonl(archivo_texto) if formato == 'jsonl' else _filas_csv(archivo_texto)
+    try:
+        yield from filas
+    except UnicodeDecodeError as e:
+        yield FilaIlegible(f"El archivo no es UTF-8 válido ({e.reason}): se dejó de leer aquí.")
+
+
+def _en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _convertir_imagen(producto_id):
+    """Reusa Producto.save() -> WebPConverterMixin solo sobre el campo de imagen."""
+    try:
+        producto = Producto.objects.get(pk=producto_id)
+        if producto.imagen_principal:
+            producto.save(update_fields=['imagen_principal'])
+    except Exception as e:
+        logger.error(f"Fallo conversión WebP del producto {producto_id}: {e}")
+    finally:
+        connection.close()  # Cada hilo del pool abre su propia conexión
+
+
+def convertir_imagenes_en_segundo_plano(producto_ids):
+    """Encola la conversión a WebP. Retorna los futures por si se quiere esperar."""
+    return [_pool_imagenes.submit(_convertir_imagen, producto_id) for producto_id in producto_ids]
+
+
+def _upsert_lote(validos):
+    """
+    Inserta o actualiza un lote por slug en una sola sentencia.
+    Solo se actualizan las columnas que vinieron en todas las filas del lote,
+    así una columna ausente en el archivo no borra datos existentes.
+    """
+    columnas = set.intersection(*(set(fila['_columnas']) for fila in validos))
+    # El stock no se sobreescribe: entra por el libro de inventario (`_mover_stock`)
+    update_fields = [CAMPOS[c] for c in CAMPOS if c in columnas and c != 'stock']
+
+    productos = []
+    for fila in validos:
+        productos.append(Producto(
+            slug=fila['slug'],
+            nombre=fila['nombre'],
+            descripcion=fila.get('descripcion', ''),
+            precio=fila['precio'],
+            stock=0,
+            es_destacado=fila['es_destacado'],
+            categoria_id=fila.get('categoria'),
+            imagen_principal=fila.get('imagen') or None,
+        ))
+
+    Producto.objects.bulk_create(
+        productos,
+        update_conflicts=True,
+        unique_fields=['slug'],
+        update_fields=(update_fields or ['nombre']) + ['updated_at'],
+    )
+
+
+def _mover_stock(validos):
+    """Lleva el stock de cada fila con columna `stock` al valor del archivo, como movimientos de importación."""
+    con_stock = {slug: d['stock'] for slug, d in validos.items() if 'stock' in d['_columnas']}
+    if not con_stock:
+        return
+    registrar_movimientos([
+        MovimientoInventario(
+            producto_id=producto_id, tipo='IMPORTACION', cantidad=con_stock[slug] - stock_actual,
+            nota="Importación masiva",
+        )
+        for slug, producto_id, stock_actual in Producto.objects.filter(slug__in=con_stock).values_list('slug', 'id', 'stock')
+    ])
+
+
+def _reportar_error(resumen, posicion, errores):
+    resumen['con_error'] += 1
+    if len(resumen['errores']) < MAX_ERRORES_REPORTADOS:
+        resumen['errores'].append({'fila': posicion, 'errores': errores})
+
+
+def importar_productos(filas, chunk_size=CHUNK_SIZE, notificar=True, esperar_imagenes=False):
+    """
+    Importa un iterable de diccionarios (filas ya parseadas).
+    Retorna un resumen: creados, actualizados, errores (fila + detalle).
+    """
+    categorias = dict(Categoria.objects.filter(tipo='PRODUCTO').values_list('slug', 'id'))
+    resumen = {'creados': 0, 'actualizados': 0, 'con_error': 0, 'errores': []}
+    nombres_nuevos = []
+    futuros = []
+
+    for numero_lote, lote in enumerate(_en_lotes(filas, chunk_size)):
+        validos = {}
+        for posicion, fila in enumerate(lote, start=numero_lote * chunk_size + 1):
+            if isinstance(fila, FilaIlegible):
+                _reportar_error(resumen, posicion, {'fila': [fila.detalle]})
+                continue
+            serializer = ProductoImportSerializer(data=fila, context={'categorias': categorias})
+            if not serializer.is_valid():
+                _reportar_error(resumen, posicion, serializer.errors)
+                continue
+            datos = serializer.validated_data
+            datos['_columnas'] = [c for c in CAMPOS if c in fila]
+            validos[datos['slug']] = datos  # Slug repetido en el lote: gana la última fila
+
+        if not validos:
+            continue
+
+        with transaction.atomic():
+            existentes = set(Producto.objects.filter(slug__in=validos).values_list('slug', flat=True))
+            _upsert_lote(list(validos.values()))
+            _mover_stock(validos)
+            reindexar('producto', Producto.objects.filter(slug__in=validos).values_list('id', flat=True))
+
+        resumen['actualizados'] += len(existentes)
+        resumen['creados'] += len(validos) - len(existentes)
+        nombres_nuevos += [d['nombre'] for slug, d in validos.items() if slug not in existentes]
+
+        con_imagen = [
+            slug for slug, d in validos.items()
+            if d.get('imagen') and not d['imagen'].lower().endswith('.webp')
+        ]
+        if con_imagen:
+            ids = Producto.objects.filter(slug__in=con_imagen).values_list('id', flat=True)
+            futuros += convertir_imagenes_en_segundo_plano(list(ids))
+
+    if notificar:
+        notificar_productos_importados(nombres_nuevos)
+
+    if esperar_imagenes:
+        for futuro in futuros:
+            futuro.result()
+
+    return resumen
@@ -0,0 +1,77 @@
+# store/inventario.py
+"""
+Libro de inventario.
+
+Cada cambio de stock se registra como un `MovimientoInventario` y el saldo
+(`Producto.stock`) se actualiza con un incremento en la misma sentencia
+(F('stock') + delta), nunca con read-modify-write sobre la fila.
+`descuadres` compara saldo contra la suma del libro en una sola consulta.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .contadores import valor_por_producto
+from .models import MovimientoInventario, Producto
+
+
+def registrar_movimientos(movimientos):
+    """
+    Guarda una lista de `MovimientoInventario` (sin guardar) y aplica el
+    saldo: un bulk_create y un UPDATE con CASE por producto.
+    """
+    movimientos = [m for m in movimientos if m.cantidad]
+    if not movimientos:
+        return
+
+    deltas = defaultdict(int)
+    for movimiento in movimientos:
+        deltas[movimiento.producto_id] += movimiento.cantidad
+
+    with transaction.atomic():
+        MovimientoInventario.objects.bulk_create(movimientos)
+        Producto.objects.filter(id__in=deltas).update(stock=F('stock') + valor_por_producto(deltas))
+
+
+def mover_stock(producto_id, cantidad, tipo, pedido=None, usuario=None, nota=''):
+    registrar_movimientos([MovimientoInventario(
+        producto_id=producto_id, cantidad=cantidad, tipo=tipo, pedido=pedido, usuario=usuario, nota=nota,
+    )])
+
+
+def ajustar_stock(producto, stock_deseado, tipo='AJUSTE', usuario=None, nota=''):
+    """Lleva el saldo a `stock_deseado` registrando la diferencia como movimiento."""
+    with transaction.atomic():
+        actual = Producto.objects.select_for_update().values_list('stock', flat=True).get(id=producto.id)
+        mover_stock(producto.id, stock_deseado - actual, tipo, usuario=usuario, nota=nota)
+    producto.stock = stock_deseado
+    return producto
+
+
+def _saldo_del_libro():
+    return Coalesce(
+        Subquery(
+            MovimientoInventario.objects.filter(producto=OuterRef('pk'))
+            .values('producto')
+            .annotate(total=Sum('cantidad'))
+            .values('total')[:1]
+        ),
+        Value(0),
+    )
+
+
+def descuadres():
+    """Productos cuyo stock no coincide con la suma de sus movimientos."""
+    return (
+        Producto.objects.annotate(saldo_libro=_saldo_del_libro())
+        .exclude(stock=F('saldo_libro'))
+        .values('id', 'nombre', 'stock', 'saldo_libro')
+        .order_by('id')
+    )
+
+
+def corregir_descuadres(producto_ids):
+    """El libro manda: recalcula el saldo de esos productos en un solo UPDATE."""
+    return Producto.objects.filter(id__in=producto_ids).update(stock=_saldo_del_libro())
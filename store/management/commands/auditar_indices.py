@@ -0,0 +1,233 @@
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from marketing.models import Noticia, Blog, Investigacion, Testimonio, Protocolo
+from marketing.views import NoticiaViewSet, BlogViewSet, InvestigacionViewSet, TestimonioViewSet, ProtocoloViewSet
+from store.models import Producto, Carrito, Pedido
+from store.views import ProductoViewSet, PedidoViewSet
+
+User = get_user_model()
+
+# Índices del paquete de migraciones "indices_consultas_frecuentes"
+INDICES_AUDITADOS = [
+    ('store.Carrito', 'store_carrito_session_idx'),
+    ('store.Pedido', 'store_pedido_usr_fecha_idx'),
+    ('store.Pedido', 'store_pedido_pendiente_idx'),
+    ('store.Producto', 'store_prod_destacado_idx'),
+    ('store.Producto', 'store_prod_precio_idx'),
+    ('store.Producto', 'store_prod_stock_precio_idx'),
+    ('marketing.Noticia', 'mkt_noticia_pub_fecha_idx'),
+    ('marketing.Blog', 'mkt_blog_pub_fecha_idx'),
+    ('marketing.Investigacion', 'mkt_invest_pub_fecha_idx'),
+    ('marketing.Testimonio', 'mkt_testim_visible_idx'),
+    ('marketing.Protocolo', 'mkt_protocolo_visible_idx'),
+    ('users.User', 'users_newsletter_idx'),
+    ('users.User', 'users_ofertas_idx'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Captura las consultas reales de los viewsets, ejecuta EXPLAIN sobre ellas y compara "
+        "tiempos con y sin los índices del paquete de migraciones. Todo corre dentro de una "
+        "transacción que se revierte al final (no deja datos ni cambios de esquema)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Filas sintéticas a sembrar por modelo antes de medir")
+        parser.add_argument('--reporte', help="Ruta del reporte Markdown (por defecto se imprime en consola)")
+
+    def handle(self, *args, **options):
+        comparar = connection.vendor == 'postgresql'
+        if not comparar:
+            self.stdout.write(self.style.WARNING(
+                "⚠️ La comparación antes/después requiere PostgreSQL (DDL transaccional). Solo se medirá el estado actual."
+            ))
+
+        self.factory = APIRequestFactory()
+        # Primer host válido de ALLOWED_HOSTS ('.dominio.com' -> 'dominio.com', '*' -> 'localhost')
+        self.host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+
+        with transaction.atomic():
+            if options['seed']:
+                self._sembrar(options['seed'])
+            self._actualizar_estadisticas()
+
+            despues = self._medir()
+            antes = None
+            if comparar:
+                self._quitar_indices()
+                antes = self._medir()
+
+            transaction.set_rollback(True)
+
+        reporte = self._reporte(antes, despues)
+        if options['reporte']:
+            with open(options['reporte'], 'w', encoding='utf-8') as archivo:
+                archivo.write(reporte)
+            self.stdout.write(self.style.SUCCESS(f"✅ Reporte guardado en {options['reporte']}"))
+        else:
+            self.stdout.write(reporte)
+
+    # --- Formas de consulta ---
+
+    def _listar(self, viewset, ruta, usuario=None, **params):
+        """Ejecuta el `list` real del viewset, igual que lo haría el frontend."""
+        request = self.factory.get(ruta, params, HTTP_HOST=self.host)
+        if usuario is not None:
+            force_authenticate(request, user=usuario)
+        response = viewset.as_view({'get': 'list'}, throttle_classes=[])(request)
+        response.render()
+
+    def _formas_de_consulta(self):
+        cliente = User.objects.filter(pedido__isnull=False).first() or User.objects.first()
+        formas = [
+            ("Catálogo de productos", lambda: self._listar(ProductoViewSet, '/api/productos/')),
+            ("Productos destacados", lambda: self._listar(ProductoViewSet, '/api/productos/', es_destacado='true')),
+            ("Productos por rango de precio", lambda: self._listar(
+                ProductoViewSet, '/api/productos/', precio_min=500, precio_max=1500
+            )),
+            ("Productos en stock por precio", lambda: self._listar(
+                ProductoViewSet, '/api/productos/', precio_max=1500, en_stock='true'
+            )),
+            ("Noticias publicadas", lambda: self._listar(NoticiaViewSet, '/api/noticias/', publicado='true')),
+            ("Blog publicado", lambda: self._listar(BlogViewSet, '/api/blog/', publicado='true')),
+            ("Investigaciones publicadas", lambda: self._listar(InvestigacionViewSet, '/api/investigaciones/', publicado='true')),
+            ("Testimonios visibles", lambda: self._listar(TestimonioViewSet, '/api/testimonios/')),
+            ("Protocolos visibles", lambda: self._listar(ProtocoloViewSet, '/api/protocolos/')),
+            ("Carrito por sesión", lambda: list(Carrito.objects.filter(session_id='sesion-1'))),
+            ("Pedidos pendientes vencidos", lambda: list(
+                Pedido.objects.filter(estado='PENDIENTE', created_at__lt=timezone.now() - timedelta(hours=48))
+                .order_by('id').values_list('id', flat=True)[:200]
+            )),
+            ("Destinatarios newsletter", lambda: list(
+                User.objects.filter(is_active=True, recibir_newsletter=True).values_list('email', flat=True)
+            )),
+            ("Destinatarios ofertas", lambda: list(
+                User.objects.filter(is_active=True, recibir_ofertas=True).values_list('email', flat=True)
+            )),
+        ]
+        if cliente:
+            formas.append(("Mis pedidos", lambda: self._listar(PedidoViewSet, '/api/pedidos/', usuario=cliente)))
+        return formas
+
+    # --- Medición ---
+
+    def _medir(self):
+        resultados = {}
+        for nombre, ejecutar in self._formas_de_consulta():
+            with CaptureQueriesContext(connection) as capturadas:
+                ejecutar()
+            resultados[nombre] = [
+                self._explicar(q['sql']) for q in capturadas.captured_queries
+                if q['sql'].lstrip().upper().startswith('SELECT')
+            ]
+        return resultados
+
+    def _explicar(self, sql):
+        """Retorna (plan resumido, milisegundos) de una consulta."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(connection.ops.explain_query_prefix(format='json', analyze=True) + ' ' + sql)
+                plan = cursor.fetchone()[0][0]
+                return self._resumir_plan(plan['Plan']), plan['Execution Time']
+
+            cursor.execute(connection.ops.explain_query_prefix() + ' ' + sql)
+            plan = ' | '.join(str(fila[-1]) for fila in cursor.fetchall())
+            inicio = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            return plan, (time.perf_counter() - inicio) * 1000
+
+    def _resumir_plan(self, nodo):
+        """Aplana el árbol de EXPLAIN a 'Seq Scan on x > Index Scan using y'."""
+        texto = nodo['Node Type']
+        if 'Index Name' in nodo:
+            texto += f" using {nodo['Index Name']}"
+        elif 'Relation Name' in nodo:
+            texto += f" on {nodo['Relation Name']}"
+        hijos = [self._resumir_plan(hijo) for hijo in nodo.get('Plans', [])]
+        return ' > '.join([texto] + hijos)
+
+    # --- Preparación ---
+
+    def _quitar_indices(self):
+        with connection.schema_editor(atomic=False) as editor:
+            for etiqueta, nombre in INDICES_AUDITADOS:
+                modelo = apps.get_model(etiqueta)
+                indice = next(i for i in modelo._meta.indexes if i.name == nombre)
+                editor.remove_index(modelo, indice)
+        self._actualizar_estadisticas()
+
+    def _actualizar_estadisticas(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _sembrar(self, n):
+        """Datos sintéticos con bulk_create (no dispara señales ni correos)."""
+        password = make_password(None)
+        usuarios = User.objects.bulk_create([
+            User(
+                email=f"auditoria{i}@example.com", first_name="Auditoría", last_name=str(i), password=password,
+                recibir_newsletter=i % 3 == 0, recibir_ofertas=i % 2 == 0,
+            )
+            for i in range(n)
+        ], batch_size=1000)
+
+        Producto.objects.bulk_create([
+            Producto(nombre=f"Producto {i}", slug=f"auditoria-{i}", precio=1000, stock=10, es_destacado=i % 10 == 0)
+            for i in range(n)
+        ], batch_size=1000)
+
+        hoy = date.today()
+        for modelo in (Noticia, Blog, Investigacion):
+            modelo.objects.bulk_create([
+                modelo(titulo=f"{modelo.__name__} {i}", slug=f"auditoria-{i}", resumen="Resumen",
+                       publicado=i % 5 != 0, fecha_publicacion=hoy - timedelta(days=i % 365))
+                for i in range(n)
+            ], batch_size=1000)
+
+        Protocolo.objects.bulk_create([
+            Protocolo(titulo=f"Protocolo {i}", slug=f"auditoria-{i}", orden=i, es_visible=i % 3 != 0)
+            for i in range(n)
+        ], batch_size=1000)
+        Testimonio.objects.bulk_create([
+            Testimonio(usuario=usuarios[i % len(usuarios)], contenido="Excelente", es_visible=i % 4 == 0)
+            for i in range(n)
+        ], batch_size=1000)
+        Pedido.objects.bulk_create([
+            Pedido(usuario=usuarios[i % len(usuarios)], total=1000) for i in range(n)
+        ], batch_size=1000)
+        Carrito.objects.bulk_create([Carrito(session_id=f"sesion-{i}") for i in range(n)], batch_size=1000)
+
+    # --- Reporte ---
+
+    def _reporte(self, antes, despues):
+        lineas = [
+            "# Auditoría de índices",
+            "",
+            f"Motor: `{connection.vendor}`",
+            "",
+            "| Consulta | # | Plan antes | ms antes | Plan después | ms después |",
+            "|---|---|---|---|---|---|",
+        ]
+        for nombre, consultas in despues.items():
+            previas = (antes or {}).get(nombre, [])
+            for posicion, (plan, ms) in enumerate(consultas):
+                plan_antes, ms_antes = previas[posicion] if posicion < len(previas) else ('-', None)
+                lineas.append(
+                    f"| {nombre} | {posicion + 1} | {plan_antes} | "
+                    f"{'-' if ms_antes is None else f'{ms_antes:.2f}'} | {plan} | {ms:.2f} |"
+                )
+        return '\n'.join(lineas) + '\n'
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.recomendaciones import TOP_K, calcular_recomendaciones
+
+
+class Command(BaseCommand):
+    help = "Recalcula la tabla Top-K de recomendaciones (co-compras, co-favoritos y categoría)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Recomendaciones guardadas por producto")
+
+    def handle(self, *args, **options):
+        total = calcular_recomendaciones(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} recomendaciones generadas."))
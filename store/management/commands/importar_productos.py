@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importacion import CHUNK_SIZE, importar_productos, leer_filas
+
+
+class Command(BaseCommand):
+    help = "Importa (upsert por slug) productos desde un archivo CSV o JSONL, por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta al archivo .csv o .jsonl")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help="Por defecto se deduce de la extensión")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--sin-notificar', action='store_true', help="No enviar el correo resumen a suscriptores")
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or ('jsonl' if options['archivo'].endswith('.jsonl') else 'csv')
+
+        try:
+            archivo = open(options['archivo'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir el archivo: {e}")
+
+        with archivo:
+            resumen = importar_productos(
+                leer_filas(archivo, formato),
+                chunk_size=options['chunk_size'],
+                notificar=not options['sin_notificar'],
+                esperar_imagenes=True,
+            )
+
+        for error in resumen['errores']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Fila {error['fila']}: {error['errores']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Creados: {resumen['creados']} | Actualizados: {resumen['actualizados']} | Con error: {resumen['con_error']}"
+        ))
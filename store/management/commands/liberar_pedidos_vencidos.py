@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.ciclo_pedido import LOTE_VENCIDOS, cancelar_pedidos_vencidos
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancela los pedidos PENDIENTE más viejos que el TTL y devuelve su stock. "
+        "Pensado para correr periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=int, default=settings.PEDIDO_PENDIENTE_TTL_HORAS,
+            help="Antigüedad mínima del pedido pendiente (por defecto PEDIDO_PENDIENTE_TTL_HORAS)"
+        )
+        parser.add_argument('--lote', type=int, default=LOTE_VENCIDOS, help="Pedidos por transacción")
+        parser.add_argument('--simular', action='store_true', help="Solo contar los pedidos que se cancelarían")
+
+    def handle(self, *args, **options):
+        total = cancelar_pedidos_vencidos(horas=options['horas'], lote=options['lote'], simular=options['simular'])
+        if options['simular']:
+            self.stdout.write(f"Se cancelarían {total} pedidos pendientes.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {total} pedidos vencidos cancelados y su stock liberado."))
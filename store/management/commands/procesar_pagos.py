@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from store.pagos import LOTE_EVENTOS, procesar_eventos
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de eventos de Bold. Se pueden correr varios en paralelo: "
+        "cada uno toma eventos distintos (SELECT ... FOR UPDATE SKIP LOCKED)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=LOTE_EVENTOS, help="Eventos por transacción")
+        parser.add_argument('--continuo', action='store_true', help="No terminar al vaciar la cola")
+        parser.add_argument('--espera', type=float, default=2.0, help="Segundos entre consultas con la cola vacía")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            procesados = procesar_eventos(limite=options['lote'])
+            total += procesados
+            if procesados:
+                continue
+            if not options['continuo']:
+                break
+            close_old_connections()
+            time.sleep(options['espera'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} eventos de pago procesados."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.contadores import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de popularidad de Producto (programar en cron, ej: cada noche)."
+
+    def handle(self, *args, **options):
+        total = reconciliar_contadores()
+        self.stdout.write(self.style.SUCCESS(f"✅ Contadores reconciliados en {total} productos."))
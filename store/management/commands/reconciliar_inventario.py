@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store.inventario import descuadres, corregir_descuadres
+
+
+class Command(BaseCommand):
+    help = "Compara Producto.stock con la suma del libro de inventario (una sola consulta)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help="Ajustar el stock al saldo del libro")
+
+    def handle(self, *args, **options):
+        filas = list(descuadres())
+        if not filas:
+            self.stdout.write(self.style.SUCCESS("✅ El inventario cuadra con el libro."))
+            return
+
+        for fila in filas:
+            self.stdout.write(
+                f"⚠️ #{fila['id']} {fila['nombre']}: stock {fila['stock']} / libro {fila['saldo_libro']}"
+            )
+
+        if options['corregir']:
+            corregidos = corregir_descuadres([fila['id'] for fila in filas])
+            self.stdout.write(self.style.SUCCESS(f"✅ {corregidos} productos ajustados al saldo del libro."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(filas)} productos descuadrados (usa --corregir para ajustarlos)."))
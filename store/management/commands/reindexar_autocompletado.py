@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from store.autocompletado import reindexar_todo
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de autocompletado (productos, blog, noticias y protocolos visibles). "
+        "Las señales lo mantienen al día; usar tras cargas con update()/SQL directo o para recuperarlo."
+    )
+
+    def handle(self, *args, **options):
+        resumen = reindexar_todo()
+        for tipo, total in resumen.items():
+            self.stdout.write(f"  {tipo}: {total} términos")
+        self.stdout.write(self.style.SUCCESS("✅ Índice de autocompletado reconstruido"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_alter_producto_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoRecomendacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recomendaciones', to='store.producto')),
+                ('recomendado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.producto')),
+            ],
+            options={
+                'verbose_name': 'Recomendación de Producto',
+                'verbose_name_plural': 'Recomendaciones de Productos',
+                'indexes': [models.Index(fields=['producto', '-score'], name='store_recom_prod_score_idx')],
+                'unique_together': {('producto', 'recomendado')},
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:30
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def calcular_contadores(apps, schema_editor):
+    """Lo mismo que `contadores.reconciliar_contadores` (copia congelada): sin esto quedan en 0 hasta el cron."""
+    Producto = apps.get_model('store', 'Producto')
+    DetallePedido = apps.get_model('store', 'DetallePedido')
+    Favorito = apps.get_model('store', 'Favorito')
+
+    def subconsulta(queryset, agregado):
+        return Subquery(
+            queryset.filter(producto=OuterRef('pk')).values('producto').annotate(valor=agregado).values('valor')[:1]
+        )
+
+    ventas = DetallePedido.objects.exclude(pedido__estado='CANCELADO')
+    desde = timezone.now() - timedelta(days=30)
+    Producto.objects.update(
+        unidades_vendidas=Coalesce(subconsulta(ventas, Sum('cantidad')), Value(0)),
+        pedidos_30_dias=Coalesce(
+            subconsulta(ventas.filter(pedido__created_at__gte=desde), Count('pedido', distinct=True)), Value(0)
+        ),
+        ultima_venta=subconsulta(ventas, Max('pedido__created_at')),
+        total_favoritos=Coalesce(subconsulta(Favorito.objects.all(), Count('id')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_productorecomendacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='pedidos_30_dias',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Pedidos últimos 30 días'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='total_favoritos',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='ultima_venta',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='unidades_vendidas',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
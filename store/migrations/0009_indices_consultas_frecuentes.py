@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0011_indices_consultas_frecuentes'),
+        ('store', '0008_producto_contadores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(condition=models.Q(('session_id__isnull', False)), fields=['session_id'], name='store_carrito_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', '-created_at'], name='store_pedido_usr_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-es_destacado', '-id'], name='store_prod_destacado_idx'),
+        ),
+    ]
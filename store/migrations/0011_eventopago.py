@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:45
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_pedidohistorial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento_id', models.CharField(max_length=100, unique=True)),
+                ('tipo', models.CharField(max_length=50)),
+                ('transaccion_id', models.CharField(blank=True, max_length=100)),
+                ('referencia', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('procesado_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pedido',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaccion_id__isnull', False)), fields=('transaccion_id',), name='store_pedido_transaccion_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='eventopago',
+            index=models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['disponible_desde'], name='store_evento_pend_idx'),
+        ),
+    ]
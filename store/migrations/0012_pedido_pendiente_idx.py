@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_eventopago'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['created_at'], name='store_pedido_pendiente_idx'),
+        ),
+    ]
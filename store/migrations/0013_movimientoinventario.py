@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def saldos_iniciales(apps, schema_editor):
+    """Un movimiento de apertura por producto para que el libro cuadre con el stock actual."""
+    Producto = apps.get_model('store', 'Producto')
+    MovimientoInventario = apps.get_model('store', 'MovimientoInventario')
+    MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(producto_id=producto_id, tipo='AJUSTE', cantidad=stock, nota="Saldo inicial")
+        for producto_id, stock in Producto.objects.filter(stock__gt=0).values_list('id', 'stock').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_pedido_pendiente_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('VENTA', 'Venta'), ('CANCELACION', 'Cancelación'), ('AJUSTE', 'Ajuste manual'), ('IMPORTACION', 'Importación')], max_length=20)),
+                ('cantidad', models.IntegerField(help_text='Positivo: entra al inventario. Negativo: sale.')),
+                ('nota', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pedido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.pedido')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='store.producto')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['producto', '-created_at'], name='store_movinv_prod_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(saldos_iniciales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0011_indices_consultas_frecuentes'),
+        ('store', '0013_movimientoinventario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio'], name='store_prod_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['precio'], name='store_prod_stock_precio_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:40
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+_separadores = re.compile(r'[^a-z0-9]+')
+
+
+# Copia congelada de `store.autocompletado.normalizar/terminos`: la migración no debe cambiar si cambia el módulo
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _separadores.sub(' ', texto).strip()
+
+
+def terminos(titulo):
+    palabras = normalizar(titulo).split()
+    return [(i, ' '.join(palabras[i:])[:200]) for i in range(len(palabras))]
+
+
+def indexar_existentes(apps, schema_editor):
+    """Carga inicial del índice con los títulos visibles actuales."""
+    TerminoAutocompletado = apps.get_model('store', 'TerminoAutocompletado')
+    fuentes = [
+        ('producto', apps.get_model('store', 'Producto'), 'nombre', {}),
+        ('blog', apps.get_model('marketing', 'Blog'), 'titulo', {'publicado': True}),
+        ('noticia', apps.get_model('marketing', 'Noticia'), 'titulo', {'publicado': True}),
+        ('protocolo', apps.get_model('marketing', 'Protocolo'), 'titulo', {'es_visible': True}),
+    ]
+    for tipo, modelo, campo, visibles in fuentes:
+        TerminoAutocompletado.objects.bulk_create([
+            TerminoAutocompletado(
+                termino=termino, posicion=posicion, tipo=tipo,
+                objeto_id=objeto_id, titulo=titulo[:200], slug=slug,
+            )
+            for objeto_id, titulo, slug in modelo.objects.filter(**visibles).values_list('id', campo, 'slug').iterator()
+            for posicion, termino in terminos(titulo)
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0011_indices_consultas_frecuentes'),
+        ('store', '0014_indices_filtros_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoAutocompletado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(db_index=True, max_length=200)),
+                ('posicion', models.PositiveSmallIntegerField(default=0, help_text='0 = el título empieza por el término')),
+                ('tipo', models.CharField(choices=[('producto', 'Producto'), ('blog', 'Blog'), ('noticia', 'Noticia'), ('protocolo', 'Protocolo')], max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('titulo', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Término de Autocompletado',
+                'verbose_name_plural': 'Términos de Autocompletado',
+                'indexes': [models.Index(fields=['tipo', 'objeto_id'], name='store_autocomp_objeto_idx')],
+            },
+        ),
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
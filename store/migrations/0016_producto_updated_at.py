@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_terminoautocompletado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_producto_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventopago',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('ERROR', 'Error'), ('REQUIERE_REVISION', 'Requiere revisión')], default='PENDIENTE', max_length=20),
+        ),
+    ]
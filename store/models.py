@@ -1,11 +1,12 @@
 from django.db import models
 from django.conf import settings
 from marketing.models import Categoria 
-from django.utils.text import slugify
+from django.utils import timezone
 from marketing.mixins import WebPConverterMixin
+from marketing.slugs import SlugUnicoMixin
 
 
-class Producto(WebPConverterMixin, models.Model):
+class Producto(SlugUnicoMixin, WebPConverterMixin, models.Model):
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, limit_choices_to={'tipo': 'PRODUCTO'}, related_name='productos')
     nombre = models.CharField(max_length=200, blank=True, null=True)
     slug = models.SlugField(unique=True, max_length=255)
@@ -18,13 +19,41 @@ class Producto(WebPConverterMixin, models.Model):
     # Sistema de Recomendación simple (Productos relacionados)
     relacionados = models.ManyToManyField('self', blank=True)
 
+    # Contadores desnormalizados (se actualizan con F() y se reconcilian con `reconciliar_contadores`)
+    unidades_vendidas = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    total_favoritos = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    pedidos_30_dias = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name="Pedidos últimos 30 días")
+    ultima_venta = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+
+    slug_origen = 'nombre'
+
+    # lastmod del sitemap (los UPDATE de stock y contadores no la tocan)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Orden por defecto del catálogo
+            models.Index(fields=['-es_destacado', '-id'], name='store_prod_destacado_idx'),
+            # Filtros del catálogo: rango de precio, y rango de precio solo con stock
+            models.Index(fields=['precio'], name='store_prod_precio_idx'),
+            models.Index(fields=['precio'], condition=models.Q(stock__gt=0), name='store_prod_stock_precio_idx'),
+        ]
+
+    # Solo cambian con UPDATE atómicos: el libro de inventario (`registrar_movimientos`) y los contadores
+    CAMPOS_ATOMICOS = ('stock', 'unidades_vendidas', 'total_favoritos', 'pedidos_30_dias', 'ultima_venta')
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.nombre)[:255]
         # Solo llamas a la función mágica pasándole el NOMBRE del campo
         if self.imagen_principal:
             self.convertir_imagen_a_webp('imagen_principal')
-        
+
+        # Al editar no se reescriben los valores leídos de stock y contadores: pisarían los
+        # F() que se confirmaron entre la carga y el save (checkout, favoritos)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_ATOMICOS
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -53,6 +82,11 @@ class Carrito(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['session_id'], name='store_carrito_session_idx', condition=models.Q(session_id__isnull=False)),
+        ]
+
 class ItemCarrito(models.Model):
     carrito = models.ForeignKey(Carrito, related_name='items', on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -89,6 +123,24 @@ class Pedido(models.Model):
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     costo_envio = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # "Mis pedidos": filter(usuario=...).order_by('-created_at')
+            models.Index(fields=['usuario', '-created_at'], name='store_pedido_usr_fecha_idx'),
+            # Liberador de pendientes vencidos: filter(estado='PENDIENTE', created_at__lt=...)
+            models.Index(
+                fields=['created_at'], name='store_pedido_pendiente_idx',
+                condition=models.Q(estado='PENDIENTE'),
+            ),
+        ]
+        constraints = [
+            # Una transacción de la pasarela solo puede pagar un pedido
+            models.UniqueConstraint(
+                fields=['transaccion_id'], condition=models.Q(transaccion_id__isnull=False),
+                name='store_pedido_transaccion_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f"Pedido #{self.id} - {self.usuario.email}"
@@ -97,4 +149,145 @@ class DetallePedido(models.Model):
     pedido = models.ForeignKey(Pedido, related_name='detalles', on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
     cantidad = models.PositiveIntegerField()
-    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2) # Guardar precio al momento de compra
\ No newline at end of file
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2) # Guardar precio al momento de compra
+
+
+class PedidoHistorial(models.Model):
+    """
+    Auditoría de cambios de estado de un pedido.
+    Se escribe en bloque desde `store.ciclo_pedido`.
+    """
+    pedido = models.ForeignKey(Pedido, related_name='historial', on_delete=models.CASCADE)
+    estado_anterior = models.CharField(max_length=20, choices=Pedido.ESTADOS)
+    estado_nuevo = models.CharField(max_length=20, choices=Pedido.ESTADOS)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    motivo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Pedido #{self.pedido_id}: {self.estado_anterior} → {self.estado_nuevo}"
+
+
+class MovimientoInventario(models.Model):
+    """
+    Libro de movimientos de stock (solo se agregan filas).
+    `Producto.stock` es el saldo mantenido: siempre debe ser la suma de
+    `cantidad` de sus movimientos (ver `store.inventario`).
+    """
+    TIPOS = [
+        ('VENTA', 'Venta'),
+        ('CANCELACION', 'Cancelación'),
+        ('AJUSTE', 'Ajuste manual'),
+        ('IMPORTACION', 'Importación'),
+    ]
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    cantidad = models.IntegerField(help_text="Positivo: entra al inventario. Negativo: sale.")
+    pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    nota = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Historial por producto y suma de conciliación
+            models.Index(fields=['producto', '-created_at'], name='store_movinv_prod_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad:+d} ({self.producto_id})"
+
+
+class EventoPago(models.Model):
+    """
+    Cola de eventos del webhook de Bold.
+    El webhook solo inserta aquí y responde; `procesar_pagos` consume la cola.
+    """
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'), ('PROCESADO', 'Procesado'), ('ERROR', 'Error'),
+        ('REQUIERE_REVISION', 'Requiere revisión'),  # Cobrado pero el pedido no lo admite: reembolsar
+    ]
+
+    evento_id = models.CharField(max_length=100, unique=True)  # Los reintentos de Bold repiten el id
+    tipo = models.CharField(max_length=50)
+    transaccion_id = models.CharField(max_length=100, blank=True)
+    referencia = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    procesado_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Los workers solo leen los pendientes listos para procesar
+            models.Index(
+                fields=['disponible_desde'], name='store_evento_pend_idx',
+                condition=models.Q(estado='PENDIENTE'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.transaccion_id} ({self.estado})"
+
+
+class ProductoRecomendacion(models.Model):
+    """
+    Tabla compacta Top-K de recomendaciones por producto.
+    Se recalcula completa con el comando `calcular_recomendaciones`.
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='recomendaciones')
+    recomendado = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('producto', 'recomendado')
+        indexes = [
+            models.Index(fields=['producto', '-score'], name='store_recom_prod_score_idx'),
+        ]
+        verbose_name = "Recomendación de Producto"
+        verbose_name_plural = "Recomendaciones de Productos"
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.recomendado_id} ({self.score:.3f})"
+
+
+class TerminoAutocompletado(models.Model):
+    """
+    Índice de prefijos del buscador (ver `store/autocompletado.py`).
+    Una fila por palabra de cada título visible, con el resto del título
+    desde esa palabra, normalizado. Se mantiene con señales y se reconstruye
+    con el comando `reindexar_autocompletado`.
+    """
+    TIPOS = (
+        ('producto', 'Producto'),
+        ('blog', 'Blog'),
+        ('noticia', 'Noticia'),
+        ('protocolo', 'Protocolo'),
+    )
+
+    # db_index: en PostgreSQL Django crea además el índice *_like (varchar_pattern_ops) que usa LIKE 'prefijo%'
+    termino = models.CharField(max_length=200, db_index=True)
+    posicion = models.PositiveSmallIntegerField(default=0, help_text="0 = el título empieza por el término")
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    objeto_id = models.PositiveIntegerField()
+    titulo = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo', 'objeto_id'], name='store_autocomp_objeto_idx'),
+        ]
+        verbose_name = "Término de Autocompletado"
+        verbose_name_plural = "Términos de Autocompletado"
+
+    def __str__(self):
+        return f"{self.termino} -> {self.tipo} {self.objeto_id}"
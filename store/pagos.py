@@ -0,0 +1,218 @@
+# store/pagos.py
+"""
+Integración de pagos con Bold.
+
+- Checkout: `datos_checkout` genera la referencia y el hash de integridad
+  que exige el botón de pagos de Bold.
+- Webhook: `verificar_firma` valida el header `x-bold-signature` y
+  `encolar_evento` guarda el evento en `EventoPago` (un INSERT, sin más
+  trabajo en la petición) para que Bold reciba su 200 de inmediato.
+- Workers: `procesar_eventos` toma lotes de la cola con
+  `select_for_update(skip_locked=True)`, así varios procesos pueden
+  consumirla a la vez sin pisarse. Aplicar un pago es idempotente por
+  `transaccion_id`.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ciclo_pedido import transicionar_pedidos
+from .models import EventoPago, Pedido
+
+logger = logging.getLogger(__name__)
+
+MONEDA = 'COP'
+PREFIJO_REFERENCIA = 'PED-'
+MAX_INTENTOS = 5
+LOTE_EVENTOS = 50
+
+
+class PagoInvalido(Exception):
+    """El evento no se puede aplicar (y reintentarlo no lo va a arreglar)."""
+
+
+class PagoRequiereRevision(PagoInvalido):
+    """Bold cobró pero el pedido ya no admite el pago (ej: lo canceló el barrido): hay que reembolsar."""
+
+
+# --- Checkout ---
+
+def referencia_pedido(pedido):
+    return f"{PREFIJO_REFERENCIA}{pedido.id}"
+
+
+def _monto(valor):
+    """Bold recibe montos en pesos sin decimales."""
+    return str(Decimal(valor).quantize(Decimal('1')))
+
+
+def hash_integridad(referencia, monto, moneda=MONEDA):
+    """SHA-256 de {referencia}{monto}{moneda}{llave de integridad}."""
+    cadena = f"{referencia}{monto}{moneda}{settings.BOLD_INTEGRITY_SECRET}"
+    return hashlib.sha256(cadena.encode()).hexdigest()
+
+
+def datos_checkout(pedido):
+    referencia = referencia_pedido(pedido)
+    monto = _monto(pedido.total)
+    return {
+        'referencia': referencia,
+        'monto': monto,
+        'moneda': MONEDA,
+        'hash_integridad': hash_integridad(referencia, monto),
+        'api_key': settings.BOLD_API_KEY,
+        'redirect_url': f"{settings.FRONTEND_URL}/pedidos/{pedido.id}",
+    }
+
+
+# --- Webhook ---
+
+def _llave_firma():
+    """
+    Llave del HMAC del webhook, o None si no hay con qué verificar (se rechaza todo).
+    En el ambiente de pruebas Bold firma con una llave vacía: solo se acepta con
+    BOLD_FIRMA_VACIA_SANDBOX y DEBUG, nunca por omisión.
+    """
+    if settings.BOLD_ENVIRONMENT == 'sandbox' and settings.BOLD_FIRMA_VACIA_SANDBOX and settings.DEBUG:
+        return ''
+    return settings.BOLD_SECRET_KEY or None
+
+
+def firmar(cuerpo, llave):
+    """HMAC-SHA256 (hex) del cuerpo codificado en base64, como lo calcula Bold."""
+    return hmac.new(llave.encode(), base64.b64encode(cuerpo), hashlib.sha256).hexdigest()
+
+
+def verificar_firma(cuerpo, firma):
+    llave = _llave_firma()
+    if llave is None:
+        logger.error("Webhook de Bold rechazado: BOLD_SECRET_KEY no está configurada")
+        return False
+    return bool(firma) and hmac.compare_digest(firmar(cuerpo, llave), firma)
+
+
+def encolar_evento(payload):
+    """
+    Guarda el evento en la cola. Los reintentos de Bold (mismo `id`) se
+    descartan en la propia base de datos (ON CONFLICT DO NOTHING).
+    """
+    datos = payload.get('data') or {}
+    evento = EventoPago(
+        evento_id=payload['id'],
+        tipo=payload.get('type', ''),
+        transaccion_id=datos.get('payment_id', ''),
+        referencia=(datos.get('metadata') or {}).get('reference', ''),
+        payload=payload,
+    )
+    EventoPago.objects.bulk_create([evento], ignore_conflicts=True)
+
+
+# --- Workers ---
+
+def _pedido_de_referencia(evento):
+    referencia = evento.referencia
+    if not evento.transaccion_id:
+        raise PagoInvalido("El evento no trae payment_id")
+    if not referencia.startswith(PREFIJO_REFERENCIA):
+        raise PagoInvalido(f"Referencia desconocida: '{referencia}'")
+    try:
+        pedido_id = int(referencia[len(PREFIJO_REFERENCIA):])
+    except ValueError:
+        raise PagoInvalido(f"Referencia desconocida: '{referencia}'")
+
+    pedido = Pedido.objects.select_for_update().filter(id=pedido_id).first()
+    if pedido is None:
+        raise PagoInvalido(f"El pedido {pedido_id} no existe")
+    return pedido
+
+
+def _aplicar_pago_aprobado(evento):
+    pedido = _pedido_de_referencia(evento)
+
+    if pedido.transaccion_id == evento.transaccion_id:
+        return  # Ya aplicado (evento repetido con otro id): idempotente
+
+    if pedido.estado != 'PENDIENTE':
+        raise PagoRequiereRevision(
+            f"Pago {evento.transaccion_id} aprobado pero el pedido #{pedido.id} está {pedido.estado}: reembolsar"
+        )
+
+    datos = evento.payload.get('data') or {}
+    total = (datos.get('amount') or {}).get('total')  # Bold puede mandar "amount": null
+    if total is None:
+        raise PagoInvalido(f"El pago {evento.transaccion_id} no trae el total cobrado")
+    if _monto(total) != _monto(pedido.total):
+        raise PagoInvalido(f"Monto {total} no coincide con el total del pedido #{pedido.id} ({pedido.total})")
+
+    metodo = datos.get('payment_method') or 'BOLD'
+    Pedido.objects.filter(id=pedido.id).update(transaccion_id=evento.transaccion_id, metodo_pago=metodo)
+    transicionar_pedidos([pedido.id], 'PAGADO', motivo=f"Pago Bold {evento.transaccion_id}")
+
+
+def _aplicar_anulacion(evento):
+    pedido = _pedido_de_referencia(evento)
+    if pedido.transaccion_id != evento.transaccion_id:
+        raise PagoInvalido(f"La anulación {evento.transaccion_id} no corresponde al pago del pedido #{pedido.id}")
+    if pedido.estado != 'CANCELADO':
+        resultado = transicionar_pedidos([pedido.id], 'CANCELADO', motivo=f"Anulación Bold {evento.transaccion_id}")
+        if resultado['omitidos']:
+            raise PagoInvalido(resultado['omitidos'][0]['detalle'])
+
+
+MANEJADORES = {
+    'SALE_APPROVED': _aplicar_pago_aprobado,
+    'VOID_APPROVED': _aplicar_anulacion,
+    # SALE_REJECTED / VOID_REJECTED: el pedido no cambia (queda en la cola como registro)
+}
+
+
+def _procesar(evento):
+    manejador = MANEJADORES.get(evento.tipo)
+    try:
+        with transaction.atomic():
+            if manejador:
+                manejador(evento)
+    except PagoRequiereRevision as e:
+        evento.estado, evento.error = 'REQUIERE_REVISION', str(e)
+        logger.error(f"Evento de pago {evento.evento_id} requiere revisión: {e}")
+    except PagoInvalido as e:
+        evento.estado, evento.error = 'ERROR', str(e)
+        logger.warning(f"Evento de pago {evento.evento_id} descartado: {e}")
+    except Exception as e:
+        evento.intentos += 1
+        evento.error = str(e)
+        if evento.intentos >= MAX_INTENTOS:
+            evento.estado = 'ERROR'
+        else:
+            # Reintento con espera exponencial: 1, 2, 4, 8 minutos
+            evento.disponible_desde = timezone.now() + timedelta(minutes=2 ** (evento.intentos - 1))
+        logger.error(f"Error procesando el evento de pago {evento.evento_id}: {e}")
+    else:
+        evento.estado, evento.error = 'PROCESADO', ''
+        evento.procesado_at = timezone.now()
+
+
+def procesar_eventos(limite=LOTE_EVENTOS):
+    """
+    Procesa un lote de eventos pendientes. Retorna cuántos se tomaron.
+    Los eventos se toman bloqueados y los que tiene otro worker se saltan.
+    """
+    with transaction.atomic():
+        eventos = list(
+            EventoPago.objects.select_for_update(skip_locked=True)
+            .filter(estado='PENDIENTE', disponible_desde__lte=timezone.now())
+            .order_by('disponible_desde', 'id')[:limite]
+        )
+        for evento in eventos:
+            _procesar(evento)
+        EventoPago.objects.bulk_update(
+            eventos, ['estado', 'intentos', 'error', 'disponible_desde', 'procesado_at']
+        )
+    return len(eventos)
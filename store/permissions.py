@@ -1,16 +1,18 @@
 from rest_framework import permissions
 
+from config.metricas import contar_permiso
+
 class IsDespachadorOrAdmin(permissions.BasePermission):
     """
     Permite acceso a Despachadores o Administradores (Ya lo tenías para Pedidos).
     """
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
-            return False
-        return (
+            return contar_permiso(self, False)
+        return contar_permiso(self, (
             request.user.is_superuser or 
             request.user.groups.filter(name__in=['Administrador', 'Despachador']).exists()
-        )
+        ))
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -22,8 +24,8 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        # 2. Si es escritura, verificar que sea Admin
-        return request.user.is_authenticated and (
+        # 2. Si es escritura, verificar que sea Admin (solo se cuentan estos chequeos)
+        return contar_permiso(self, request.user.is_authenticated and (
             request.user.is_superuser or 
             request.user.groups.filter(name='Administrador').exists()
-        )
\ No newline at end of file
+        ))
\ No newline at end of file
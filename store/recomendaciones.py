@@ -0,0 +1,191 @@
+# store/recomendaciones.py
+"""
+Motor de recomendaciones item-a-item.
+
+El cálculo pesado se hace offline (comando `calcular_recomendaciones`):
+las co-ocurrencias se agregan en la base de datos con una sola consulta
+agrupada por fuente y el resultado se guarda como una tabla Top-K por
+producto (`ProductoRecomendacion`). Servir recomendaciones es solo leer
+esa tabla.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .favoritos import anotar_favoritos
+from .models import Producto, DetallePedido, Favorito, ProductoRecomendacion
+
+TOP_K = 20
+
+# Peso de cada señal en el score final
+PESO_COMPRA = 0.6
+PESO_FAVORITO = 0.3
+PESO_CATEGORIA = 0.1
+
+
+def _similitud_coseno(pares, totales):
+    """
+    Convierte conteos de co-ocurrencia en similitud coseno:
+    co(i, j) / sqrt(n_i * n_j)
+    """
+    similitud = defaultdict(dict)
+    for origen, destino, conteo in pares:
+        denominador = math.sqrt(totales.get(origen, 0) * totales.get(destino, 0))
+        if denominador:
+            similitud[origen][destino] = conteo / denominador
+    return similitud
+
+
+def _co_compras():
+    """Pares de productos comprados en el mismo pedido."""
+    totales = dict(
+        DetallePedido.objects.values_list('producto_id')
+        .annotate(n=Count('pedido_id', distinct=True))
+    )
+    pares = (
+        DetallePedido.objects
+        .annotate(otro=F('pedido__detalles__producto_id'))
+        .exclude(producto_id=F('otro'))
+        .values_list('producto_id', 'otro')
+        .annotate(n=Count('pedido_id', distinct=True))
+    )
+    return _similitud_coseno(pares, totales)
+
+
+def _co_favoritos():
+    """Pares de productos marcados como favorito por el mismo usuario."""
+    totales = dict(
+        Favorito.objects.values_list('producto_id')
+        .annotate(n=Count('usuario_id', distinct=True))
+    )
+    pares = (
+        Favorito.objects
+        .annotate(otro=F('usuario__favorito__producto_id'))
+        .exclude(producto_id=F('otro'))
+        .values_list('producto_id', 'otro')
+        .annotate(n=Count('usuario_id', distinct=True))
+    )
+    return _similitud_coseno(pares, totales)
+
+
+def _afinidad_categoria(top_k):
+    """
+    Devuelve (categoria_por_producto, candidatos_por_categoria).
+    Los candidatos de cada categoría se limitan a `top_k` + 1 (destacados
+    primero) para no generar pares cuadráticos en categorías grandes: uno de
+    más porque cada producto se descarta a sí mismo de sus candidatos y aun
+    así debe quedarle `top_k`.
+    """
+    categoria_por_producto = {}
+    candidatos = defaultdict(list)
+    filas = Producto.objects.order_by('-es_destacado', '-id').values_list('id', 'categoria_id')
+    for producto_id, categoria_id in filas:
+        categoria_por_producto[producto_id] = categoria_id
+        if categoria_id is not None and len(candidatos[categoria_id]) <= top_k:
+            candidatos[categoria_id].append(producto_id)
+    return categoria_por_producto, candidatos
+
+
+def calcular_recomendaciones(top_k=TOP_K):
+    """
+    Recalcula la tabla de recomendaciones completa.
+    Retorna el número de filas generadas.
+    """
+    compras = _co_compras()
+    favoritos = _co_favoritos()
+    categoria_por_producto, candidatos_categoria = _afinidad_categoria(top_k)
+
+    filas = []
+    for producto_id, categoria_id in categoria_por_producto.items():
+        candidatos = set(compras.get(producto_id, ())) | set(favoritos.get(producto_id, ()))
+        if categoria_id is not None:
+            candidatos.update(candidatos_categoria[categoria_id])
+        candidatos.discard(producto_id)
+
+        puntajes = []
+        for otro_id in candidatos:
+            score = (
+                PESO_COMPRA * compras.get(producto_id, {}).get(otro_id, 0)
+                + PESO_FAVORITO * favoritos.get(producto_id, {}).get(otro_id, 0)
+            )
+            if categoria_id is not None and categoria_por_producto.get(otro_id) == categoria_id:
+                score += PESO_CATEGORIA
+            if score > 0:
+                puntajes.append((score, otro_id))
+
+        puntajes.sort(reverse=True)
+        filas.extend(
+            ProductoRecomendacion(producto_id=producto_id, recomendado_id=otro_id, score=score)
+            for score, otro_id in puntajes[:top_k]
+        )
+
+    with transaction.atomic():
+        ProductoRecomendacion.objects.all().delete()
+        ProductoRecomendacion.objects.bulk_create(filas, batch_size=1000)
+
+    return len(filas)
+
+
+def _productos(usuario):
+    """Productos para las tarjetas, con `is_favorito` del usuario que las ve."""
+    return anotar_favoritos(Producto.objects.select_related('categoria'), usuario)
+
+
+def _completar_con_destacados(productos, limite, usuario, excluir=()):
+    """Rellena la lista con productos destacados si faltan recomendaciones."""
+    if len(productos) >= limite:
+        return productos[:limite]
+
+    ids_usados = {p.id for p in productos} | set(excluir)
+    destacados = (
+        _productos(usuario).filter(es_destacado=True)
+        .exclude(id__in=ids_usados)
+        .order_by('-id')[:limite - len(productos)]
+    )
+    return productos + list(destacados)
+
+
+def _productos_en_orden(ids, usuario):
+    """Carga los productos respetando el orden del ranking."""
+    por_id = _productos(usuario).in_bulk(ids)
+    return [por_id[i] for i in ids if i in por_id]
+
+
+def recomendar_para_producto(producto, limite=6, usuario=None):
+    """Recomendaciones "Quienes compraron esto también compraron" (`usuario`: quien las ve)."""
+    ids = list(
+        ProductoRecomendacion.objects.filter(producto=producto)
+        .order_by('-score')
+        .values_list('recomendado_id', flat=True)[:limite]
+    )
+    return _completar_con_destacados(_productos_en_orden(ids, usuario), limite, usuario, excluir=[producto.id])
+
+
+def recomendar_para_usuario(usuario, limite=6):
+    """
+    Recomendaciones personalizadas: suma los scores de los vecinos de todo
+    lo que el usuario compró o marcó como favorito.
+    Usuarios anónimos o sin historial reciben los destacados.
+    """
+    if not usuario or not usuario.is_authenticated:
+        return _completar_con_destacados([], limite, usuario)
+
+    semillas = set(
+        DetallePedido.objects.filter(pedido__usuario=usuario).values_list('producto_id', flat=True)
+    ) | set(
+        Favorito.objects.filter(usuario=usuario).values_list('producto_id', flat=True)
+    )
+    if not semillas:
+        return _completar_con_destacados([], limite, usuario)
+
+    ids = list(
+        ProductoRecomendacion.objects.filter(producto_id__in=semillas)
+        .exclude(recomendado_id__in=semillas)
+        .values('recomendado_id')
+        .annotate(total=Sum('score'))
+        .order_by('-total')
+        .values_list('recomendado_id', flat=True)[:limite]
+    )
+    return _completar_con_destacados(_productos_en_orden(ids, usuario), limite, usuario, excluir=semillas)
@@ -1,15 +1,21 @@
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
-from .models import Producto, Favorito, Carrito, ItemCarrito, Pedido, DetallePedido, Direccion, TarifaEnvio
+from django.utils.text import slugify
+from .favoritos import MAX_PRODUCTOS_POR_LOTE
+from .models import Producto, Favorito, Carrito, ItemCarrito, Pedido, DetallePedido, Direccion, TarifaEnvio, MovimientoInventario, TerminoAutocompletado
 
 # --- PRODUCTOS ---
 class ProductoCardSerializer(serializers.ModelSerializer):
     """Vista ligera para listas"""
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
+    # Anotación de `favoritos.anotar_favoritos`; False donde la consulta no la trae
+    is_favorito = serializers.BooleanField(read_only=True, default=False)
     
     class Meta:
         model = Producto
-        fields = ['id', 'nombre', 'slug', 'precio', 'imagen_principal', 'es_destacado', 'categoria_nombre']
+        fields = ['id', 'nombre', 'slug', 'precio', 'imagen_principal', 'es_destacado', 'categoria_nombre', 'is_favorito']
+        select_related = ['categoria']
+        columnas_extra = []  # is_favorito no es columna
 
 class ProductoDetailSerializer(serializers.ModelSerializer):
     """Vista completa para detalle"""
@@ -20,6 +26,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
         model = Producto
         fields = '__all__'
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at', 'categoria_nombre']
+        select_related = ['categoria']
 
 # --- CARRITO ---
 class ItemCarritoSerializer(serializers.ModelSerializer):
@@ -57,6 +64,7 @@ class DetallePedidoSerializer(serializers.ModelSerializer):
     class Meta:
         model = DetallePedido
         fields = ['producto_nombre', 'cantidad', 'precio_unitario']
+        select_related = ['producto']
 
 class PedidoSerializer(serializers.ModelSerializer):
     detalles = DetallePedidoSerializer(many=True, read_only=True)
@@ -78,6 +86,33 @@ class FavoritoSerializer(serializers.ModelSerializer):
         fields = ['id', 'producto', 'producto_id', 'created_at']
         read_only_fields = ['created_at', 'id', 'producto_id']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['producto']['is_favorito'] = True  # Viene de la lista de favoritos, no de una anotación
+        return data
+
+class FavoritosLoteSerializer(serializers.Serializer):
+    producto_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_PRODUCTOS_POR_LOTE,
+        help_text=f"IDs de los productos (máx. {MAX_PRODUCTOS_POR_LOTE})"
+    )
+
+class FavoritosAgregadosSerializer(serializers.Serializer):
+    agregados = serializers.ListField(child=serializers.IntegerField())
+    no_encontrados = serializers.ListField(child=serializers.IntegerField())
+
+class FavoritosQuitadosSerializer(serializers.Serializer):
+    quitados = serializers.IntegerField()
+
+class FavoritosIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField())
+
+class AutocompletadoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    titulo = serializers.CharField()
+    slug = serializers.SlugField()
+    tipo = serializers.ChoiceField(choices=TerminoAutocompletado.TIPOS)
+
 class TarifaEnvioSerializer(serializers.ModelSerializer):
     class Meta:
         model = TarifaEnvio
@@ -88,6 +123,84 @@ class DireccionSerializer(serializers.ModelSerializer):
         model = Direccion
         fields = ['id', 'nombre_completo', 'direccion', 'ciudad', 'departamento', 'telefono', 'referencia', 'es_principal']
 
+class ProductoImportSerializer(serializers.Serializer):
+    """
+    Valida una fila de la importación masiva (CSV o JSONL).
+    `categoria` es el slug de una Categoría tipo PRODUCTO e `imagen` la ruta
+    del archivo ya subido al storage (ej: productos/semilla.jpg).
+    """
+    nombre = serializers.CharField(max_length=200)
+    slug = serializers.SlugField(max_length=255, required=False, allow_blank=True)
+    descripcion = serializers.CharField(required=False, allow_blank=True)
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2)
+    stock = serializers.IntegerField(min_value=0, required=False, default=0)
+    es_destacado = serializers.BooleanField(required=False, default=False)
+    categoria = serializers.SlugField(required=False, allow_blank=True)
+    imagen = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate_categoria(self, value):
+        if not value:
+            return None
+        categorias = self.context['categorias']
+        if value not in categorias:
+            raise serializers.ValidationError(f"No existe la categoría de producto '{value}'.")
+        return categorias[value]
+
+    def validate(self, attrs):
+        attrs['slug'] = attrs.get('slug') or slugify(attrs['nombre'])[:255]
+        if not attrs['slug']:
+            raise serializers.ValidationError({"slug": "No se pudo generar un slug a partir del nombre."})
+        return attrs
+
+class ImportarProductosSerializer(serializers.Serializer):
+    archivo = serializers.FileField(help_text="Archivo .csv o .jsonl (una fila/objeto por producto)")
+
+class ExportarPedidosSerializer(serializers.Serializer):
+    """Filtros (query params) para la exportación masiva de pedidos."""
+    formato = serializers.ChoiceField(choices=['csv', 'jsonl'], default='csv')
+    estado = serializers.ChoiceField(choices=Pedido.ESTADOS, required=False)
+    desde = serializers.DateField(required=False, help_text="Fecha inicial (inclusive) YYYY-MM-DD")
+    hasta = serializers.DateField(required=False, help_text="Fecha final (inclusive) YYYY-MM-DD")
+
+    def validate(self, attrs):
+        if attrs.get('desde') and attrs.get('hasta') and attrs['desde'] > attrs['hasta']:
+            raise serializers.ValidationError({"hasta": "Debe ser posterior a 'desde'."})
+        return attrs
+
+class TransicionPedidosSerializer(serializers.Serializer):
+    """Cambio de estado masivo para despacho."""
+    pedidos = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000,
+        help_text="IDs de los pedidos a mover (máx. 1000)"
+    )
+    estado = serializers.ChoiceField(choices=Pedido.ESTADOS)
+    motivo = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+class PedidoOmitidoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    estado = serializers.CharField(allow_null=True)
+    detalle = serializers.CharField()
+
+class TransicionResultadoSerializer(serializers.Serializer):
+    actualizados = serializers.ListField(child=serializers.IntegerField())
+    omitidos = PedidoOmitidoSerializer(many=True)
+
+class MovimientoInventarioSerializer(serializers.ModelSerializer):
+    usuario_email = serializers.EmailField(source='usuario.email', read_only=True, default=None)
+
+    class Meta:
+        model = MovimientoInventario
+        fields = ['id', 'tipo', 'cantidad', 'pedido', 'usuario_email', 'nota', 'created_at']
+
+class DatosPagoSerializer(serializers.Serializer):
+    """Parámetros para el botón de pagos de Bold."""
+    referencia = serializers.CharField()
+    monto = serializers.CharField(help_text="Pesos sin decimales")
+    moneda = serializers.CharField()
+    hash_integridad = serializers.CharField()
+    api_key = serializers.CharField()
+    redirect_url = serializers.CharField()
+
 class ErrorResponseSerializer(serializers.Serializer):
     detail = serializers.CharField(help_text="Descripción legible del error")
     code = serializers.CharField(help_text="Código de error para el frontend")
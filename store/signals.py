@@ -1,5 +1,7 @@
 # store/signals.py
-from django.db.models.signals import post_save
+import logging
+
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
@@ -7,14 +9,23 @@ from django.utils.html import strip_tags
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
-from .models import Producto, Pedido
+from config.senales import diferir, acumular
+from marketing.models import Blog, Noticia, Protocolo
+from .models import Producto, Pedido, Favorito
+from .contadores import sumar_favorito, restar_favorito, aplicar_deltas_favoritos
+from .autocompletado import TIPO_POR_MODELO, reindexar_lote
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 # --- 1. Notificación de Nuevo Producto ---
 @receiver(post_save, sender=Producto)
 def notificar_nuevo_producto(sender, instance, created, **kwargs):
     if created: # Solo al crear
+        # En un lote de señales se envía un único resumen al final
+        if diferir(_productos_nuevos_en_lote, instance.id, instance.nombre):
+            return
+
         # Filtrar usuarios interesados en ofertas
         destinatarios = User.objects.filter(is_active=True, recibir_ofertas=True).values_list('email', flat=True)
         
@@ -44,6 +55,63 @@ def notificar_nuevo_producto(sender, instance, created, **kwargs):
         msg.send()
 
 
+def notificar_productos_importados(nombres):
+    """
+    Resumen único para importaciones masivas (bulk_create no dispara post_save):
+    un solo correo con los productos nuevos en lugar de uno por producto.
+    """
+    if not nombres:
+        return
+
+    destinatarios = User.objects.filter(is_active=True, recibir_ofertas=True).values_list('email', flat=True)
+    if not destinatarios:
+        return
+
+    resumen = ", ".join(nombres[:10])
+    if len(nombres) > 10:
+        resumen += f" y {len(nombres) - 10} más..."
+
+    html_content = render_to_string('emails/nuevo_contenido.html', {
+        'titulo': "¡Nuevos Productos Disponibles!",
+        'tipo_contenido': "NUEVOS LANZAMIENTOS",
+        'titulo_contenido': f"{len(nombres)} productos nuevos en la tienda",
+        'resumen': resumen,
+        'link': f"{settings.FRONTEND_URL}/tienda",
+        'imagen_url': ""
+    })
+    text_content = strip_tags(html_content)
+
+    msg = EmailMultiAlternatives(
+        f"🎁 {len(nombres)} Nuevos Productos",
+        text_content,
+        settings.DEFAULT_FROM_EMAIL,
+        bcc=list(destinatarios)
+    )
+    msg.attach_alternative(html_content, "text/html")
+    msg.send()
+
+
+def _productos_nuevos_en_lote(nombres_por_id):
+    notificar_productos_importados(list(nombres_por_id.values()))
+
+
+def _pedidos_nuevos_en_lote(pedidos_por_id):
+    """Un solo aviso al admin con todos los pedidos creados en el lote."""
+    admins = User.objects.correos_administradores()
+    if not admins:
+        return
+
+    pedidos = pedidos_por_id.values()
+    lineas = [f"#{p.id} - {p.usuario.email} - ${p.total:,.0f}" for p in pedidos]
+    send_mail(
+        subject=f"💰 {len(lineas)} Nuevas Ventas",
+        message="Pedidos registrados:\n" + "\n".join(lineas) + "\n\nRevisa el panel de administración.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=admins,
+        fail_silently=True
+    )
+
+
 # --- 2. Notificación de Pedido (Compra) ---
 @receiver(post_save, sender=Pedido)
 def notificar_pedido(sender, instance, created, **kwargs):
@@ -78,7 +146,7 @@ def notificar_pedido(sender, instance, created, **kwargs):
             msg_user.send()
 
         except Exception as e:
-            print(f"Error enviando confirmación de pedido al cliente: {e}")
+            logger.error(f"Error enviando confirmación de pedido al cliente: {e}", exc_info=True)
 
         # B. Correo de Alerta al ADMIN (Como notificación web)
         try:
@@ -94,7 +162,7 @@ def notificar_pedido(sender, instance, created, **kwargs):
                     fail_silently=True
                 )
         except Exception as e:
-            print(f"Error notificando al admin: {e}")
+            logger.error(f"Error notificando al admin: {e}", exc_info=True)
 
 @receiver(post_save, sender=Pedido)
 def notificar_pedido(sender, instance, created, **kwargs):
@@ -102,15 +170,12 @@ def notificar_pedido(sender, instance, created, **kwargs):
         # A. Correo al Cliente (Ya lo tenías, se mantiene igual)
         # ...
 
+        if diferir(_pedidos_nuevos_en_lote, instance.id, instance):
+            return
+
         # B. Correo de Alerta al ADMIN (ACTUALIZADO)
         try:
-            admins = User.objects.filter(
-                groups__name='Administrador', 
-                is_active=True
-            ).values_list('email', flat=True)
-
-            if not admins:
-                admins = User.objects.filter(is_superuser=True).values_list('email', flat=True)
+            admins = User.objects.correos_administradores()
             
             if admins:
                 # Link al detalle del pedido en el Admin de Django
@@ -134,10 +199,31 @@ def notificar_pedido(sender, instance, created, **kwargs):
                     f"💰 Nueva Venta: Pedido #{instance.id}",
                     text_admin,
                     settings.DEFAULT_FROM_EMAIL,
-                    to=list(admins)
+                    to=admins
                 )
                 msg_admin.attach_alternative(html_admin, "text/html")
                 msg_admin.send()
 
         except Exception as e:
-            print(f"Error notificando al admin: {e}")
\ No newline at end of file
+            logger.error(f"Error notificando al admin: {e}", exc_info=True)
+
+# --- 3. Contadores de Favoritos ---
+@receiver(post_save, sender=Favorito)
+def contar_favorito(sender, instance, created, **kwargs):
+    if created and not acumular(aplicar_deltas_favoritos, instance.producto_id, 1):
+        sumar_favorito(instance.producto_id)
+
+@receiver(post_delete, sender=Favorito)
+def descontar_favorito(sender, instance, **kwargs):
+    if not acumular(aplicar_deltas_favoritos, instance.producto_id, -1):
+        restar_favorito(instance.producto_id)
+
+# --- 4. Índice de autocompletado ---
+@receiver([post_save, post_delete], sender=Producto)
+@receiver([post_save, post_delete], sender=Blog)
+@receiver([post_save, post_delete], sender=Noticia)
+@receiver([post_save, post_delete], sender=Protocolo)
+def actualizar_autocompletado(sender, instance, **kwargs):
+    clave = (TIPO_POR_MODELO[sender], instance.pk)
+    if not diferir(reindexar_lote, clave, notificacion=False):
+        reindexar_lote({clave: None})
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import hmac
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+from importlib import import_module
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from rest_framework.test import APIClient, APITestCase
+
+from marketing.models import Blog, Categoria, Noticia
+from .models import (
+    Producto, Pedido, DetallePedido, Favorito, Carrito, ItemCarrito, EventoPago, Direccion, TarifaEnvio,
+    PedidoHistorial, ProductoRecomendacion, TerminoAutocompletado,
+)
+from .autocompletado import autocompletar, normalizar, terminos
+from .ciclo_pedido import cancelar_pedidos_vencidos, transicionar_pedidos
+from .facetas import calcular_facetas
+from .contadores import reconciliar_contadores, registrar_venta, revertir_venta, revertir_ventas
+from .importacion import importar_productos, leer_filas
+from .recomendaciones import PESO_CATEGORIA, calcular_recomendaciones, recomendar_para_usuario
+from .inventario import ajustar_stock, descuadres, mover_stock
+from .pagos import procesar_eventos
+
+User = get_user_model()
+
+
+class ConsultasConstantesMixin:
+    """
+    Verifica que un endpoint de lista haga el mismo número de consultas
+    con 1 elemento que con varios (sin N+1).
+    """
+
+    def contar_consultas(self, url):
+        cache.clear()  # Los throttles usan el cache por defecto
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(consultas)
+
+    def assertConsultasConstantes(self, url, crear_elemento, extra=5):
+        crear_elemento(0)
+        con_uno = self.contar_consultas(url)
+        for i in range(1, extra + 1):
+            crear_elemento(i)
+        self.assertEqual(self.contar_consultas(url), con_uno)
+
+
+class ConsultasTiendaTests(ConsultasConstantesMixin, APITestCase):
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        self.usuario = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana', last_name='Ruiz')
+        self.client.force_authenticate(self.usuario)
+
+    def crear_producto(self, i):
+        return Producto.objects.create(
+            nombre=f"Producto {i}", precio=1000, stock=10, categoria=self.categoria, descripcion="Descripción"
+        )
+
+    def test_lista_productos(self):
+        self.assertConsultasConstantes('/api/productos/', self.crear_producto)
+
+    def test_detalle_producto_con_relacionados(self):
+        principal = self.crear_producto('principal')
+
+        def agregar_relacionado(i):
+            principal.relacionados.add(self.crear_producto(i))
+
+        self.assertConsultasConstantes(f'/api/productos/{principal.slug}/', agregar_relacionado)
+
+    def test_lista_pedidos(self):
+        def crear_pedido(i):
+            pedido = Pedido.objects.create(usuario=self.usuario)
+            DetallePedido.objects.create(pedido=pedido, producto=self.crear_producto(i), cantidad=1, precio_unitario=1000)
+
+        self.assertConsultasConstantes('/api/pedidos/', crear_pedido)
+
+    def test_lista_favoritos(self):
+        def crear_favorito(i):
+            Favorito.objects.create(usuario=self.usuario, producto=self.crear_producto(i))
+
+        self.assertConsultasConstantes('/api/favoritos/', crear_favorito)
+
+    def test_carrito(self):
+        carrito = Carrito.objects.create(usuario=self.usuario)
+
+        def agregar_item(i):
+            ItemCarrito.objects.create(carrito=carrito, producto=self.crear_producto(i), cantidad=1)
+
+        self.assertConsultasConstantes('/api/carrito/', agregar_item)
+
+
+# --- Pagos con Bold ---
+
+LLAVE_INTEGRIDAD = 'llave-integridad-pruebas'
+LLAVE_WEBHOOK = 'llave-webhook-pruebas'
+
+
+class BoldSimulado:
+    """
+    Pasarela local que se comporta como Bold: valida el hash de integridad
+    del checkout, y al "cobrar" envía el webhook firmado por HTTP real.
+    """
+
+    def __init__(self, url_webhook):
+        self.url_webhook = url_webhook
+        self.ultimo_evento = None
+        simulador = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                datos = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                codigo, respuesta = simulador.cobrar(**datos)
+                self.send_response(codigo)
+                self.end_headers()
+                self.wfile.write(json.dumps(respuesta).encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}/pagar"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def cobrar(self, referencia, monto, moneda, hash_integridad, monto_cobrado=None, tipo='SALE_APPROVED'):
+        esperado = hashlib.sha256(f"{referencia}{monto}{moneda}{LLAVE_INTEGRIDAD}".encode()).hexdigest()
+        if hash_integridad != esperado:
+            return 400, {'error': 'hash de integridad inválido'}
+
+        self.ultimo_evento = {
+            'id': str(uuid.uuid4()),
+            'type': tipo,
+            'data': {
+                'payment_id': f"BOLD-{uuid.uuid4().hex[:10]}",
+                'amount': {'total': monto_cobrado or monto, 'currency': moneda},
+                'payment_method': 'CARD',
+                'metadata': {'reference': referencia},
+            },
+        }
+        return 200, {'webhook': self.enviar(self.ultimo_evento)}
+
+    def enviar(self, evento, llave=LLAVE_WEBHOOK):
+        cuerpo = json.dumps(evento).encode()
+        firma = hmac.new(llave.encode(), base64.b64encode(cuerpo), hashlib.sha256).hexdigest()
+        peticion = Request(
+            self.url_webhook, data=cuerpo, method='POST',
+            headers={'Content-Type': 'application/json', 'x-bold-signature': firma},
+        )
+        try:
+            with urlopen(peticion, timeout=5) as respuesta:
+                return respuesta.status
+        except HTTPError as e:
+            return e.code
+
+    def pagar(self, datos_checkout, **extra):
+        cuerpo = {k: datos_checkout[k] for k in ('referencia', 'monto', 'moneda', 'hash_integridad')}
+        peticion = Request(self.url, data=json.dumps({**cuerpo, **extra}).encode(), method='POST')
+        try:
+            with urlopen(peticion, timeout=5) as respuesta:
+                return respuesta.status, json.loads(respuesta.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+
+@override_settings(
+    BOLD_ENVIRONMENT='production', BOLD_SECRET_KEY=LLAVE_WEBHOOK, BOLD_INTEGRITY_SECRET=LLAVE_INTEGRIDAD
+)
+class PagosBoldTests(LiveServerTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.bold = BoldSimulado(f"{self.live_server_url}/api/pagos/bold/webhook/")
+        self.addCleanup(self.bold.detener)
+
+        self.usuario = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.pedido = Pedido.objects.create(usuario=self.usuario, subtotal=25000, total=25000)
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def datos_checkout(self):
+        response = self.api.get(f'/api/pedidos/{self.pedido.id}/pago/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pago_aprobado_se_encola_y_el_worker_marca_pagado(self):
+        codigo, respuesta = self.bold.pagar(self.datos_checkout())
+        self.assertEqual((codigo, respuesta['webhook']), (200, 200))
+
+        # El webhook solo encola: el pedido sigue pendiente hasta que corre el worker
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'PENDIENTE')
+        self.assertEqual(EventoPago.objects.filter(estado='PENDIENTE').count(), 1)
+
+        self.assertEqual(procesar_eventos(), 1)
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'PAGADO')
+        self.assertEqual(self.pedido.transaccion_id, self.bold.ultimo_evento['data']['payment_id'])
+        self.assertEqual(self.pedido.historial.count(), 1)
+
+    def test_reintentos_son_idempotentes(self):
+        self.bold.pagar(self.datos_checkout())
+        evento = self.bold.ultimo_evento
+
+        # Mismo evento reenviado y mismo pago con otro id de evento
+        self.assertEqual(self.bold.enviar(evento), 200)
+        self.assertEqual(self.bold.enviar({**evento, 'id': str(uuid.uuid4())}), 200)
+        self.assertEqual(EventoPago.objects.count(), 2)
+
+        procesar_eventos()
+        self.assertEqual(EventoPago.objects.filter(estado='PROCESADO').count(), 2)
+        self.assertEqual(self.pedido.historial.count(), 1)
+
+    def test_firma_invalida_se_rechaza(self):
+        self.bold.pagar(self.datos_checkout())
+        EventoPago.objects.all().delete()
+
+        self.assertEqual(self.bold.enviar(self.bold.ultimo_evento, llave='otra-llave'), 403)
+        self.assertFalse(EventoPago.objects.exists())
+
+    def evento_aprobado(self):
+        return {
+            'id': str(uuid.uuid4()), 'type': 'SALE_APPROVED',
+            'data': {'payment_id': 'BOLD-x', 'amount': {'total': '25000'}, 'metadata': {'reference': f'PED-{self.pedido.id}'}},
+        }
+
+    @override_settings(BOLD_ENVIRONMENT='sandbox', BOLD_SECRET_KEY='')
+    def test_llave_vacia_se_rechaza_por_omision(self):
+        self.assertEqual(self.bold.enviar(self.evento_aprobado(), llave=''), 403)
+        with self.settings(BOLD_FIRMA_VACIA_SANDBOX=True):  # Sin DEBUG tampoco
+            self.assertEqual(self.bold.enviar(self.evento_aprobado(), llave=''), 403)
+        self.assertFalse(EventoPago.objects.exists())
+
+    @override_settings(BOLD_ENVIRONMENT='sandbox', BOLD_SECRET_KEY='', BOLD_FIRMA_VACIA_SANDBOX=True, DEBUG=True)
+    def test_llave_vacia_en_sandbox_con_opt_in(self):
+        self.assertEqual(self.bold.enviar(self.evento_aprobado(), llave=''), 200)
+
+    def test_pago_sin_total_se_descarta_sin_reintentos(self):
+        for amount in (None, {}):
+            evento = self.evento_aprobado()
+            evento['data'] = {**evento['data'], 'amount': amount, 'payment_method': None}
+            self.assertEqual(self.bold.enviar(evento), 200)
+        procesar_eventos()
+
+        self.assertEqual(
+            list(EventoPago.objects.values_list('estado', 'intentos')), [('ERROR', 0), ('ERROR', 0)]
+        )
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'PENDIENTE')
+
+    def test_pago_de_pedido_cancelado_requiere_revision(self):
+        datos = self.datos_checkout()
+        transicionar_pedidos([self.pedido.id], 'CANCELADO', motivo="Vencido")
+        self.bold.pagar(datos)
+        procesar_eventos()
+
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'CANCELADO')
+        self.assertEqual(EventoPago.objects.get().estado, 'REQUIERE_REVISION')
+
+    def test_hash_de_integridad_alterado_lo_rechaza_la_pasarela(self):
+        datos = self.datos_checkout()
+        codigo, _ = self.bold.pagar({**datos, 'monto': '1000'})
+        self.assertEqual(codigo, 400)
+
+    def test_monto_distinto_no_marca_pagado(self):
+        self.bold.pagar(self.datos_checkout(), monto_cobrado='1000')
+        procesar_eventos()
+
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, 'PENDIENTE')
+        self.assertEqual(EventoPago.objects.get().estado, 'ERROR')
+
+
+
+# --- Libro de inventario ---
+
+class TiendaMixin:
+    """Productos con saldo en el libro y checkout real por la API."""
+
+    def crear_producto(self, nombre, stock):
+        producto = Producto.objects.create(
+            nombre=nombre, precio=1000, categoria=self.categoria, descripcion="Descripción"
+        )
+        mover_stock(producto.id, stock, 'AJUSTE', nota="Saldo inicial")
+        return producto
+
+    def stock(self, producto):
+        return Producto.objects.values_list('stock', flat=True).get(id=producto.id)
+
+    def comprar(self, usuario, *items):
+        """items: (producto, cantidad). Retorna el id del pedido creado."""
+        TarifaEnvio.objects.get_or_create(ciudad="Bogotá", defaults={'departamento': "Cundinamarca", 'precio_base': 5000})
+        direccion = Direccion.objects.create(usuario=usuario, nombre_completo="Ana Ruiz", direccion="Calle 1", ciudad="Bogotá")
+        carrito, _ = Carrito.objects.get_or_create(usuario=usuario)
+        for producto, cantidad in items:
+            ItemCarrito.objects.create(carrito=carrito, producto=producto, cantidad=cantidad)
+
+        api = APIClient()
+        api.force_authenticate(usuario)
+        response = api.post('/api/pedidos/', {'direccion_id': direccion.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+
+class InventarioTests(TiendaMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.admin = User.objects.create_superuser('admin@example.com', 'clave-segura')
+        self.cliente = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.producto = self.crear_producto("Aceite", 10)
+
+    def assertCuadra(self):
+        self.assertEqual(list(descuadres()), [])
+
+    def test_checkout_cancelacion_ediciones_e_importacion_cuadran(self):
+        pedido_id = self.comprar(self.cliente, (self.producto, 3))
+        self.assertEqual(self.stock(self.producto), 7)
+        self.assertCuadra()
+
+        transicionar_pedidos([pedido_id], 'CANCELADO', motivo="Cliente")
+        self.assertEqual(self.stock(self.producto), 10)
+        self.assertCuadra()
+
+        self.client.force_login(self.admin)
+        response = self.client.post(f'/admin/store/producto/{self.producto.id}/change/', {
+            'categoria': self.categoria.id, 'nombre': "Aceite", 'slug': self.producto.slug,
+            'descripcion': "Descripción", 'precio': '1000', 'stock': 15,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stock(self.producto), 15)
+        self.assertCuadra()
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(f'/api/productos/{self.producto.slug}/', {'stock': 12}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(self.producto), 12)
+        self.assertCuadra()
+
+        importar_productos(
+            [{'slug': self.producto.slug, 'nombre': "Aceite", 'precio': '1000', 'stock': '20'}], notificar=False
+        )
+        self.assertEqual(self.stock(self.producto), 20)
+        self.assertCuadra()
+        self.assertEqual(
+            list(self.producto.movimientos.order_by('id').values_list('tipo', 'cantidad')),
+            [('AJUSTE', 10), ('VENTA', -3), ('CANCELACION', 3), ('AJUSTE', 5), ('AJUSTE', -3), ('IMPORTACION', 8)],
+        )
+
+    def test_editar_no_pisa_stock_ni_contadores_concurrentes(self):
+        producto = Producto.objects.get(id=self.producto.id)
+        # Checkout confirmado entre la carga y el save
+        mover_stock(producto.id, -4, 'VENTA')
+        registrar_venta(producto.id, 4)
+
+        producto.nombre = "Aceite de oliva"
+        producto.save()
+
+        producto.refresh_from_db()
+        self.assertEqual((producto.nombre, producto.stock, producto.unidades_vendidas), ("Aceite de oliva", 6, 4))
+        self.assertCuadra()
+
+    def test_ajustar_stock_con_descuento_concurrente(self):
+        producto = Producto.objects.get(id=self.producto.id)  # Leído con stock 10
+        mover_stock(producto.id, -4, 'VENTA')
+
+        ajustar_stock(producto, 15)
+
+        self.assertEqual(self.stock(producto), 15)
+        self.assertEqual(producto.movimientos.order_by('-id').values_list('cantidad', flat=True)[0], 9)
+        self.assertCuadra()
+
+    def test_reconciliar_inventario_corregir(self):
+        Producto.objects.filter(id=self.producto.id).update(stock=99)
+
+        call_command('reconciliar_inventario', stdout=StringIO())
+        self.assertEqual(self.stock(self.producto), 99)  # Sin --corregir solo informa
+
+        call_command('reconciliar_inventario', '--corregir', stdout=StringIO())
+        self.assertEqual(self.stock(self.producto), 10)
+        self.assertCuadra()
+
+    def test_movimientos_solo_despachador_o_administrador(self):
+        url = f'/api/productos/{self.producto.slug}/movimientos/'
+        despachador = User.objects.create_user('despacho@example.com', 'clave-segura')
+        despachador.groups.add(Group.objects.get(name='Despachador'))
+
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+        for usuario, codigo in ((self.cliente, 403), (despachador, 200), (self.admin, 200)):
+            self.client.force_authenticate(usuario)
+            self.assertEqual(self.client.get(url).status_code, codigo)
+
+        self.assertEqual(self.client.get(url).data['results'][0]['cantidad'], 10)
+
+
+# --- Ciclo de vida de los pedidos ---
+
+class CicloPedidoTests(TiendaMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.cliente = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.despachador = User.objects.create_user('despacho@example.com', 'clave-segura')
+        self.despachador.groups.add(Group.objects.get(name='Despachador'))
+        self.producto = self.crear_producto("Aceite", 10)
+
+    def test_transicion_invalida_se_omite(self):
+        pedido_id = self.comprar(self.cliente, (self.producto, 1))
+
+        resultado = transicionar_pedidos([pedido_id], 'ENVIADO')
+
+        self.assertEqual(resultado['actualizados'], [])
+        self.assertEqual(resultado['omitidos'], [{
+            'id': pedido_id, 'estado': 'PENDIENTE', 'detalle': "No se puede pasar de PENDIENTE a ENVIADO.",
+        }])
+        self.assertEqual(Pedido.objects.get(id=pedido_id).estado, 'PENDIENTE')
+        self.assertFalse(PedidoHistorial.objects.exists())
+
+    def test_cancelar_dos_veces_repone_una_sola_vez(self):
+        pedido_id = self.comprar(self.cliente, (self.producto, 4))
+        self.assertEqual(self.stock(self.producto), 6)
+
+        primero = transicionar_pedidos([pedido_id], 'CANCELADO')
+        segundo = transicionar_pedidos([pedido_id], 'CANCELADO')
+
+        self.assertEqual(primero['actualizados'], [pedido_id])
+        self.assertEqual(segundo['omitidos'][0]['estado'], 'CANCELADO')
+        self.assertEqual(self.stock(self.producto), 10)
+        self.assertEqual(self.producto.movimientos.filter(tipo='CANCELACION').count(), 1)
+        self.assertEqual(Producto.objects.get(id=self.producto.id).unidades_vendidas, 0)
+
+    def test_lote_por_endpoint_con_resultados_mixtos(self):
+        pendiente = self.comprar(self.cliente, (self.producto, 1))
+        enviado = self.comprar(self.cliente, (self.producto, 1))
+        transicionar_pedidos([enviado], 'PAGADO')
+        transicionar_pedidos([enviado], 'ENVIADO')
+
+        self.client.force_authenticate(self.despachador)
+        response = self.client.post('/api/despacho/pedidos/transicion/', {
+            'pedidos': [pendiente, enviado, 999999], 'estado': 'CANCELADO', 'motivo': "Sin pago",
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['actualizados'], [pendiente])
+        self.assertEqual(
+            [(o['id'], o['estado']) for o in response.data['omitidos']],
+            [(enviado, 'ENVIADO'), (999999, None)],
+        )
+        self.assertEqual(self.stock(self.producto), 9)  # Solo vuelve la unidad del pendiente
+
+        historial = PedidoHistorial.objects.get(pedido_id=pendiente)
+        self.assertEqual(
+            (historial.estado_anterior, historial.estado_nuevo, historial.usuario, historial.motivo),
+            ('PENDIENTE', 'CANCELADO', self.despachador, "Sin pago"),
+        )
+        self.assertEqual(
+            list(PedidoHistorial.objects.filter(pedido_id=enviado).order_by('id').values_list('estado_nuevo', flat=True)),
+            ['PAGADO', 'ENVIADO'],
+        )
+
+    def test_lote_solo_para_despacho(self):
+        self.client.force_authenticate(self.cliente)
+        response = self.client.post(
+            '/api/despacho/pedidos/transicion/', {'pedidos': [1], 'estado': 'CANCELADO'}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class PedidosVencidosTests(TiendaMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.cliente = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.producto = self.crear_producto("Aceite", 20)
+
+    def pedido(self, cantidad, horas, estado='PENDIENTE'):
+        pedido_id = self.comprar(self.cliente, (self.producto, cantidad))
+        if estado != 'PENDIENTE':
+            transicionar_pedidos([pedido_id], estado)
+        Pedido.objects.filter(id=pedido_id).update(created_at=timezone.now() - timedelta(hours=horas))
+        return pedido_id
+
+    def test_solo_cancela_pendientes_vencidos_y_devuelve_su_stock(self):
+        vencidos = [self.pedido(1, horas=72), self.pedido(2, horas=50)]
+        reciente = self.pedido(3, horas=1)
+        pagado = self.pedido(4, horas=72, estado='PAGADO')
+        self.assertEqual(self.stock(self.producto), 10)
+
+        self.assertEqual(cancelar_pedidos_vencidos(horas=48, simular=True), 2)
+        self.assertEqual(self.stock(self.producto), 10)
+
+        call_command('liberar_pedidos_vencidos', '--horas', '48', '--lote', '1', stdout=StringIO())
+
+        estados = dict(Pedido.objects.values_list('id', 'estado'))
+        self.assertEqual([estados[i] for i in vencidos], ['CANCELADO', 'CANCELADO'])
+        self.assertEqual((estados[reciente], estados[pagado]), ('PENDIENTE', 'PAGADO'))
+
+        self.assertEqual(self.stock(self.producto), 13)
+        self.assertEqual(
+            sorted(self.producto.movimientos.filter(tipo='CANCELACION').values_list('pedido_id', 'cantidad')),
+            [(vencidos[0], 1), (vencidos[1], 2)],
+        )
+        self.assertEqual(list(descuadres()), [])
+
+    def test_no_cancela_pedidos_con_pago_en_cola(self):
+        pedido_id = self.pedido(1, horas=72)
+        EventoPago.objects.create(evento_id='evt-1', tipo='SALE_APPROVED', referencia=f'PED-{pedido_id}', payload={})
+
+        self.assertEqual(cancelar_pedidos_vencidos(horas=48), 0)
+        self.assertEqual(Pedido.objects.get(id=pedido_id).estado, 'PENDIENTE')
+
+
+# --- Recomendaciones ---
+
+class RecomendacionesFavoritosTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.usuario = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.aceite, self.jabon, self.crema = [
+            Producto.objects.create(nombre=nombre, precio=1000, categoria=categoria, descripcion="Descripción", es_destacado=True)
+            for nombre in ("Aceite", "Jabón", "Crema")
+        ]
+        ProductoRecomendacion.objects.create(producto=self.aceite, recomendado=self.jabon, score=1)
+        Favorito.objects.create(usuario=self.usuario, producto=self.jabon)
+
+    def favoritos_en(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {p['id']: p['is_favorito'] for p in response.data}
+
+    def test_recomendados_marcan_favoritos_del_usuario(self):
+        url = f'/api/productos/{self.aceite.slug}/recomendados/'
+        self.assertEqual(self.favoritos_en(url), {self.jabon.id: False, self.crema.id: False})
+
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.favoritos_en(url), {self.jabon.id: True, self.crema.id: False})
+
+    def test_recomendaciones_del_usuario_vienen_anotadas(self):
+        # Sus favoritos son semillas y no se recomiendan, pero todas las tarjetas traen la anotación
+        productos = recomendar_para_usuario(self.usuario)
+        self.assertEqual({p.id: p.is_favorito for p in productos}, {self.aceite.id: False, self.crema.id: False})
+
+
+class MotorRecomendacionesTests(TestCase):
+
+    def setUp(self):
+        semillas = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        abonos = Categoria.objects.create(nombre="Abonos", tipo='PRODUCTO')
+        self.maiz, self.frijol, self.arveja, self.avena = [
+            Producto.objects.create(nombre=nombre, precio=1000, categoria=semillas, descripcion="Descripción")
+            for nombre in ("Maíz", "Frijol", "Arveja", "Avena")
+        ]
+        self.compost, self.humus, self.cal = [
+            Producto.objects.create(nombre=nombre, precio=1000, categoria=abonos, descripcion="Descripción")
+            for nombre in ("Compost", "Humus", "Cal")
+        ]
+        ana, luis = [
+            User.objects.create_user(email, 'clave-segura', first_name=nombre)
+            for email, nombre in (('ana@example.com', "Ana"), ('luis@example.com', "Luis"))
+        ]
+        # Co-compras: maíz con compost en 2 de sus 3 pedidos, con frijol en 1
+        for productos in ((self.maiz, self.compost), (self.maiz, self.compost), (self.maiz, self.frijol)):
+            pedido = Pedido.objects.create(usuario=ana)
+            for producto in productos:
+                DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=1000)
+        # Co-favoritos: maíz con humus (Ana) y con arveja (Luis)
+        for usuario, producto in ((ana, self.maiz), (ana, self.humus), (luis, self.maiz), (luis, self.arveja)):
+            Favorito.objects.create(usuario=usuario, producto=producto)
+
+    def recomendados(self, producto):
+        return list(
+            ProductoRecomendacion.objects.filter(producto=producto)
+            .order_by('-score').values_list('recomendado__nombre', flat=True)
+        )
+
+    def test_combina_compras_favoritos_y_categoria(self):
+        calcular_recomendaciones()
+
+        # compost 0.6·2/√6 > frijol 0.6·1/√3 + 0.1 > arveja 0.3/√2 + 0.1 > humus 0.3/√2 > avena 0.1
+        self.assertEqual(self.recomendados(self.maiz), ["Compost", "Frijol", "Arveja", "Humus", "Avena"])
+
+    def test_top_k_corta_la_lista(self):
+        calcular_recomendaciones(top_k=2)
+
+        self.assertEqual(self.recomendados(self.maiz), ["Compost", "Frijol"])
+
+    def test_sin_senales_recomienda_su_categoria(self):
+        calcular_recomendaciones(top_k=2)
+
+        # Cal no tiene compras ni favoritos: solo afinidad de categoría
+        self.assertEqual(set(self.recomendados(self.cal)), {"Compost", "Humus"})
+        # Avena está entre los top_k + 1 candidatos de Semillas y aun sin sí misma le quedan top_k
+        self.assertEqual(len(self.recomendados(self.avena)), 2)
+        self.assertTrue(ProductoRecomendacion.objects.filter(producto=self.avena, score=PESO_CATEGORIA).exists())
+
+
+# --- Contadores de popularidad ---
+
+class ContadoresTests(TiendaMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.cliente = User.objects.create_user('cliente@example.com', 'clave-segura', first_name='Ana')
+        self.producto = self.crear_producto("Aceite", 20)
+
+    def contadores(self):
+        return Producto.objects.values_list('unidades_vendidas', 'pedidos_30_dias', 'total_favoritos').get(id=self.producto.id)
+
+    def test_revertir_una_y_en_lote_no_bajan_de_cero(self):
+        registrar_venta(self.producto.id, 2)
+
+        revertir_venta(self.producto.id, 5)
+        self.assertEqual(self.contadores()[:2], (0, 0))
+
+        registrar_venta(self.producto.id, 2)
+        revertir_ventas({self.producto.id: 5}, {self.producto.id: 3})
+        self.assertEqual(self.contadores()[:2], (0, 0))
+
+    def test_cancelar_descuenta_pedidos_de_la_ventana(self):
+        reciente = self.comprar(self.cliente, (self.producto, 2))
+        viejo = self.comprar(self.cliente, (self.producto, 3))
+        Pedido.objects.filter(id=viejo).update(created_at=timezone.now() - timedelta(days=40))
+        self.assertEqual(self.contadores()[:2], (5, 2))
+
+        transicionar_pedidos([reciente], 'CANCELADO')
+        self.assertEqual(self.contadores()[:2], (3, 1))
+
+        # El viejo ya salió de la ventana: solo descuenta unidades
+        transicionar_pedidos([viejo], 'CANCELADO')
+        self.assertEqual(self.contadores()[:2], (0, 1))
+
+        reconciliar_contadores()
+        self.assertEqual(self.contadores()[:2], (0, 0))
+
+    def test_migracion_calcula_los_contadores_existentes(self):
+        self.comprar(self.cliente, (self.producto, 2))
+        cancelado = self.comprar(self.cliente, (self.producto, 4))
+        transicionar_pedidos([cancelado], 'CANCELADO')
+        Favorito.objects.create(usuario=self.cliente, producto=self.producto)
+        Producto.objects.update(unidades_vendidas=0, pedidos_30_dias=0, total_favoritos=0, ultima_venta=None)
+
+        import_module('store.migrations.0008_producto_contadores').calcular_contadores(apps, None)
+
+        self.assertEqual(self.contadores(), (2, 1, 1))
+        self.assertIsNotNone(Producto.objects.get(id=self.producto.id).ultima_venta)
+
+
+# --- Importación masiva ---
+
+class ImportacionIlegibleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin@example.com', 'clave-segura')
+        User.objects.create_user('suscriptor@example.com', 'clave-segura', recibir_ofertas=True)
+        mail.outbox = []  # Sin los correos de bienvenida
+
+    def test_linea_ilegible_en_un_lote_tardio_se_reporta_y_se_notifica(self):
+        archivo = StringIO(
+            '{"nombre": "Aceite", "precio": "1000"}\n'
+            '{"nombre": "Jabón", "precio": "2000"}\n'
+            '{"nombre": "Crema", "precio": "3000"}\n'
+            '{"nombre": "Roto", "precio": \n'
+            '[1, 2]\n'
+            '{"nombre": "Sal", "precio": "500"}\n'
+        )
+        resumen = importar_productos(leer_filas(archivo, 'jsonl'), chunk_size=2)
+
+        self.assertEqual((resumen['creados'], resumen['con_error']), (4, 2))
+        self.assertEqual([e['fila'] for e in resumen['errores']], [4, 5])
+        self.assertIn("JSON inválido", resumen['errores'][0]['errores']['fila'][0])
+        self.assertEqual(Producto.objects.count(), 4)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("4 Nuevos Productos", mail.outbox[0].subject)
+
+    def test_endpoint_devuelve_resumen_parcial_con_csv_ilegible(self):
+        contenido = 'nombre,precio\nAceite,1000\n"' + 'x' * 140000 + '",2000\nJabón,3000\n'
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.csv', contenido.encode(), content_type='text/csv'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creados'], response.data['con_error']), (2, 1))
+        self.assertEqual(response.data['errores'][0]['fila'], 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_archivo_que_no_es_utf8_no_falla(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.csv', b'nombre,precio\n\xff\xfe,1\n', content_type='text/csv'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creados'], response.data['con_error']), (0, 1))
+        self.assertIn("UTF-8", response.data['errores'][0]['errores']['fila'][0])
+
+
+# --- Facetas del catálogo ---
+
+class FacetasTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()  # Throttle del catálogo y facetas cacheadas
+        self.semillas = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        self.abonos = Categoria.objects.create(nombre="Abonos", tipo='PRODUCTO')
+        for nombre, categoria, precio, stock in (
+            ("Maíz", self.semillas, 30000, 5),
+            ("Frijol", self.semillas, 120000, 0),
+            ("Invernadero", self.semillas, 600000, 2),
+            ("Compost", self.abonos, 70000, 0),
+            ("Humus", self.abonos, 40000, 3),
+        ):
+            Producto.objects.create(nombre=nombre, precio=precio, stock=stock, categoria=categoria, descripcion="Descripción")
+
+    def facetas(self, consulta=''):
+        response = self.client.get(f'/api/productos/?facetas=true{consulta}')
+        self.assertEqual(response.status_code, 200)
+        facetas = response.data['facetas']
+        return (
+            {c['nombre']: c['total'] for c in facetas['categorias']},
+            [r['total'] for r in facetas['precios']],
+            facetas['stock'],
+            response.data['count'],
+        )
+
+    def test_sin_filtros(self):
+        categorias, precios, stock, total = self.facetas()
+
+        self.assertEqual(categorias, {"Abonos": 2, "Semillas": 3})
+        self.assertEqual(precios, [2, 1, 1, 0, 1])
+        self.assertEqual(stock, {'en_stock': 3, 'agotados': 2})
+        self.assertEqual(total, 5)
+
+    def test_una_faceta_no_se_filtra_a_si_misma(self):
+        categorias, precios, stock, total = self.facetas(f'&categoria={self.semillas.id}')
+
+        self.assertEqual(categorias, {"Abonos": 2, "Semillas": 3})  # Siguen todas las categorías
+        self.assertEqual(precios, [1, 0, 1, 0, 1])
+        self.assertEqual(stock, {'en_stock': 2, 'agotados': 1})
+        self.assertEqual(total, 3)
+
+    def test_dos_facetas_se_cruzan(self):
+        categorias, precios, stock, total = self.facetas(f'&categoria={self.semillas.id}&en_stock=true')
+
+        self.assertEqual(categorias, {"Abonos": 1, "Semillas": 2})
+        self.assertEqual(precios, [1, 0, 0, 0, 1])
+        self.assertEqual(stock, {'en_stock': 2, 'agotados': 1})  # Sin su propio filtro
+        self.assertEqual(total, 2)
+
+    def test_misma_combinacion_reutiliza_el_cache(self):
+        with mock.patch('store.views.calcular_facetas', wraps=calcular_facetas) as calcular:
+            self.facetas(f'&categoria={self.semillas.id}&en_stock=true')
+            Producto.objects.create(nombre="Avena", precio=10000, stock=1, categoria=self.semillas, descripcion="Descripción")
+            categorias, _, _, total = self.facetas(f'&en_stock=true&page=1&categoria={self.semillas.id}')
+            self.assertEqual(calcular.call_count, 1)
+            self.assertEqual((categorias["Semillas"], total), (2, 3))  # Facetas del cache, lista al día
+
+            self.facetas(f'&categoria={self.abonos.id}&en_stock=true')
+            self.assertEqual(calcular.call_count, 2)
+
+
+# --- Autocompletado ---
+
+class AutocompletadoTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        categoria = Categoria.objects.create(nombre="Aceites", tipo='PRODUCTO')
+        self.aceite = Producto.objects.create(nombre="Aceite de Coco", precio=1000, categoria=categoria, descripcion="Descripción")
+        self.blog = Blog.objects.create(titulo="Usos del ACEITE esencial", resumen="Resumen")
+        Noticia.objects.create(titulo="Aceites en borrador", publicado=False)
+
+    def sugerencias(self, q, **parametros):
+        cache.clear()  # Cada prefijo queda un minuto en cache
+        response = self.client.get('/api/autocompletar/', {'q': q, **parametros})
+        self.assertEqual(response.status_code, 200)
+        return [(r['tipo'], r['titulo']) for r in response.data]
+
+    def test_normaliza_tildes_mayusculas_y_separadores(self):
+        self.assertEqual(normalizar("Bálsamo  Ñame-2"), "balsamo name 2")
+        self.assertEqual(terminos("Aceite de Coco"), [(0, "aceite de coco"), (1, "de coco"), (2, "coco")])
+        self.assertEqual(self.sugerencias("ÁCEÍTE d"), [('producto', "Aceite de Coco")])
+
+    def test_prefijo_en_todos_los_tipos_visibles(self):
+        self.assertEqual(
+            self.sugerencias("acei"),
+            [('producto', "Aceite de Coco"), ('blog', "Usos del ACEITE esencial")],  # Primero los que empiezan así
+        )
+        self.assertEqual(self.sugerencias("a"), [])  # Menos de MIN_CARACTERES
+
+    def test_renombrar_ocultar_y_borrar_reindexan(self):
+        self.aceite.nombre = "Jabón de Coco"
+        self.aceite.save()
+        self.blog.publicado = False
+        self.blog.save()
+
+        self.assertEqual(self.sugerencias("acei"), [])
+        self.assertEqual(self.sugerencias("jabon"), [('producto', "Jabón de Coco")])
+
+        self.aceite.delete()
+        self.assertEqual(self.sugerencias("coco"), [])
+        self.assertFalse(TerminoAutocompletado.objects.filter(tipo='producto', objeto_id=self.aceite.id).exists())
+
+    def test_filtro_por_tipo_y_limite(self):
+        categoria = self.aceite.categoria
+        for i in range(5):
+            Producto.objects.create(nombre=f"Aceite {i} aceite", precio=1000, categoria=categoria, descripcion="Descripción")
+
+        self.assertEqual(self.sugerencias("acei", tipo='blog'), [('blog', "Usos del ACEITE esencial")])
+        self.assertEqual(self.client.get('/api/autocompletar/', {'q': "acei", 'tipo': 'pedido'}).status_code, 400)
+        cache.clear()
+        resultados = autocompletar("acei", limite=3)
+        self.assertEqual(len(resultados), 3)
+        self.assertEqual(len({r['id'] for r in resultados}), 3)  # Sin repetir por coincidir en dos palabras
+
+    def test_migracion_llena_el_indice(self):
+        indexados = set(TerminoAutocompletado.objects.values_list('tipo', 'objeto_id', 'posicion', 'termino'))
+        TerminoAutocompletado.objects.all().delete()
+
+        import_module('store.migrations.0015_terminoautocompletado').indexar_existentes(apps, None)
+
+        self.assertEqual(
+            set(TerminoAutocompletado.objects.values_list('tipo', 'objeto_id', 'posicion', 'termino')), indexados
+        )
+        self.assertEqual(len(self.sugerencias("acei")), 2)
+
+
+# --- Exportación de pedidos ---
+
+class ExportacionPedidosTests(TiendaMixin, APITestCase):
+    URL = '/api/despacho/pedidos/exportar/'
+
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre="Semillas", tipo='PRODUCTO')
+        self.cliente = User.objects.create_user(
+            'cliente@example.com', 'clave-segura', first_name='=HYPERLINK("http://x.test")', last_name='Ruiz'
+        )
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'clave-segura'))
+
+        self.con_productos = self.comprar(self.cliente, (self.crear_producto("Maíz", 10), 2))
+        Direccion.objects.update(nombre_completo="@SUMA(A1:A9)", direccion="+57 Calle 1", referencia="-1+1")
+        self.sin_productos = Pedido.objects.create(usuario=self.cliente).id
+        for pedido_id, dia in ((self.con_productos, datetime(2026, 1, 10, 12)), (self.sin_productos, datetime(2026, 2, 10, 12))):
+            Pedido.objects.filter(id=pedido_id).update(created_at=timezone.make_aware(dia))
+
+    def exportar(self, **filtros):
+        response = self.client.get(self.URL, filtros)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def filas_csv(self, **filtros):
+        return list(csv.DictReader(StringIO(self.exportar(formato='csv', **filtros))))
+
+    def lineas_jsonl(self, **filtros):
+        return [json.loads(linea) for linea in self.exportar(formato='jsonl', **filtros).splitlines()]
+
+    def test_csv_incluye_pedidos_sin_productos_y_neutraliza_formulas(self):
+        con_productos, sin_productos = self.filas_csv()
+
+        self.assertEqual(
+            (con_productos['pedido_id'], con_productos['producto'], con_productos['cantidad']),
+            (str(self.con_productos), "Maíz", '2'),
+        )
+        self.assertEqual(
+            (sin_productos['pedido_id'], sin_productos['producto'], sin_productos['cantidad'], sin_productos['precio_unitario']),
+            (str(self.sin_productos), '', '', ''),
+        )
+        self.assertEqual(con_productos['cliente'], "'=HYPERLINK(\"http://x.test\") Ruiz")
+        self.assertEqual(
+            (con_productos['recibe'], con_productos['direccion'], con_productos['referencia'], con_productos['ciudad']),
+            ("'@SUMA(A1:A9)", "'+57 Calle 1", "'-1+1", "Bogotá"),
+        )
+
+    def test_jsonl_conserva_los_valores_originales(self):
+        con_productos, sin_productos = self.lineas_jsonl()
+
+        self.assertEqual(con_productos['detalles'], [{'producto': "Maíz", 'cantidad': 2, 'precio_unitario': '1000.00'}])
+        self.assertEqual((con_productos['cliente'], con_productos['recibe']), ('=HYPERLINK("http://x.test") Ruiz', "@SUMA(A1:A9)"))
+        self.assertEqual((sin_productos['pedido_id'], sin_productos['detalles']), (self.sin_productos, []))
+
+    def test_filtros_de_fecha_inclusivos(self):
+        for filtros, esperados in (
+            ({'desde': '2026-02-01'}, [self.sin_productos]),
+            ({'hasta': '2026-01-10'}, [self.con_productos]),
+            ({'desde': '2026-01-10', 'hasta': '2026-02-10'}, [self.con_productos, self.sin_productos]),
+            ({'desde': '2026-03-01'}, []),
+        ):
+            with self.subTest(**filtros):
+                self.assertEqual([int(f['pedido_id']) for f in self.filas_csv(**filtros)], esperados)
+                self.assertEqual([l['pedido_id'] for l in self.lineas_jsonl(**filtros)], esperados)
+
+        response = self.client.get(self.URL, {'desde': '2026-02-01', 'hasta': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
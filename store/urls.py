@@ -5,7 +5,11 @@ from .views import (
     CarritoViewSet, 
     PedidoViewSet, 
     FavoritoViewSet,
-    DireccionViewSet
+    DireccionViewSet,
+    ExportarPedidosView,
+    TransicionPedidosView,
+    WebhookBoldView,
+    AutocompletarView
 )
 
 router = DefaultRouter()
@@ -16,5 +20,9 @@ router.register(r'favoritos', FavoritoViewSet, basename='favorito')
 router.register(r'direcciones', DireccionViewSet, basename='direccion')
 
 urlpatterns = [
+    path('despacho/pedidos/exportar/', ExportarPedidosView.as_view(), name='pedidos-exportar'),
+    path('despacho/pedidos/transicion/', TransicionPedidosView.as_view(), name='pedidos-transicion'),
+    path('pagos/bold/webhook/', WebhookBoldView.as_view(), name='bold-webhook'),
+    path('autocompletar/', AutocompletarView.as_view(), name='autocompletar'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,46 +1,173 @@
 from rest_framework import viewsets, status, filters, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.exceptions import ValidationError, NotFound, PermissionDenied
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from datetime import datetime, time, timedelta
+import io
+import json
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from drf_spectacular.types import OpenApiTypes
+from config.metricas import AGOTADOS, CARRITO_ITEMS, CHECKOUTS
+from marketing.mixins import QuerysetOptimizadoMixin, optimizar_queryset
 
+from .filters import ProductoFilter
 from .permissions import IsAdminOrReadOnly, IsDespachadorOrAdmin 
-
-from .models import Producto, Carrito, ItemCarrito, Pedido, DetallePedido, Favorito, Direccion, TarifaEnvio
+from .contadores import registrar_venta
+from .inventario import registrar_movimientos, ajustar_stock
+from .autocompletado import autocompletar, FUENTES, MIN_CARACTERES, CACHE_SEGUNDOS
+from .ciclo_pedido import transicionar_pedidos
+from .facetas import calcular_facetas, facetas_en_cache
+from .favoritos import anotar_favoritos, agregar_favoritos, quitar_favoritos, ids_favoritos
+from .pagos import datos_checkout, verificar_firma, encolar_evento
+from .importacion import importar_productos, leer_filas
+from .exportacion import pedidos_para_exportar, filas_csv, lineas_jsonl
+from .recomendaciones import recomendar_para_producto, recomendar_para_usuario
+
+from .models import Producto, Carrito, ItemCarrito, Pedido, DetallePedido, Favorito, Direccion, TarifaEnvio, MovimientoInventario, TerminoAutocompletado
 from .serializers import (
     ProductoCardSerializer, ProductoDetailSerializer, 
     CarritoSerializer, ItemCarritoSerializer, 
-    PedidoSerializer, FavoritoSerializer, DireccionSerializer, ErrorResponseSerializer
+    PedidoSerializer, FavoritoSerializer, DireccionSerializer, ErrorResponseSerializer,
+    ExportarPedidosSerializer, ImportarProductosSerializer,
+    TransicionPedidosSerializer, TransicionResultadoSerializer, DatosPagoSerializer,
+    MovimientoInventarioSerializer, FavoritosLoteSerializer, FavoritosAgregadosSerializer,
+    FavoritosQuitadosSerializer, FavoritosIdsSerializer, AutocompletadoSerializer
 )
 from store import serializers
 
 @extend_schema(tags=['Tienda - Productos'])
-class ProductoViewSet(viewsets.ModelViewSet): # <--- CAMBIO: ModelViewSet habilita POST/PUT/DELETE
+class ProductoViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet): # <--- CAMBIO: ModelViewSet habilita POST/PUT/DELETE
     queryset = Producto.objects.all().order_by('-es_destacado', '-id')
     
     # PERMISOS: Admin edita, el mundo ve
     permission_classes = [IsAdminOrReadOnly] 
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['categoria', 'es_destacado']
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = ProductoFilter
     search_fields = ['nombre', 'descripcion']
+    # Contadores indexados: ?ordering=-unidades_vendidas, ?ordering=-total_favoritos, etc.
+    ordering_fields = ['unidades_vendidas', 'total_favoritos', 'pedidos_30_dias', 'ultima_venta']
     lookup_field = 'slug'
 
+    @property
+    def throttle_scope(self):
+        # Las lecturas del catálogo tienen su propio límite (más alto que 'anon')
+        return 'catalogo' if self.request.method in ('GET', 'HEAD', 'OPTIONS') else None
+
     def get_serializer_class(self):
         # Usamos el DetailSerializer para ver uno solo o para editar/crear (para ver todos los campos)
         if self.action in ['retrieve', 'create', 'update', 'partial_update']:
             return ProductoDetailSerializer
         return ProductoCardSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # is_favorito de la página en la misma consulta (EXISTS sobre el índice único)
+            queryset = anotar_favoritos(queryset, self.request.user)
+        return queryset
+
+    @extend_schema(
+        description="Con `?facetas=true` la respuesta trae además `facetas`: conteos por categoría, "
+                    "rango de precio y disponibilidad. Cada faceta se cuenta con los demás filtros "
+                    "aplicados pero no con el suyo.",
+        parameters=[OpenApiParameter('facetas', OpenApiTypes.BOOL, description="Incluir conteos de facetas")],
+    )
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facetas') in ('true', '1'):
+            response.data['facetas'] = self._facetas()
+        return response
+
+    def _facetas(self):
+        filterset = ProductoFilter(self.request.query_params, queryset=Producto.objects.all(), request=self.request)
+        filterset.is_valid()  # Ya validado por el list
+        parametros = [
+            (clave, valores) for clave, valores in self.request.query_params.lists()
+            if clave not in ('page', 'ordering', 'facetas')
+        ]
+
+        def calcular():
+            base = filters.SearchFilter().filter_queryset(self.request, Producto.objects.all(), self)
+            return calcular_facetas(filterset.filtrar_sin_facetas(base), filterset.seleccion())
+
+        return facetas_en_cache(parametros, calcular)
+
+    # El stock se mueve solo a través del libro de inventario
+    def perform_create(self, serializer):
+        stock = serializer.validated_data.pop('stock', 0)
+        producto = serializer.save()
+        ajustar_stock(producto, stock, usuario=self.request.user, nota="Saldo inicial")
+
+    def perform_update(self, serializer):
+        stock = serializer.validated_data.pop('stock', None)
+        producto = serializer.save()
+        if stock is not None:
+            ajustar_stock(producto, stock, usuario=self.request.user, nota="Edición por API")
+
+    @extend_schema(
+        summary="Movimientos de inventario del producto",
+        description="Solo Despachador o Administrador. Historial paginado, del más reciente al más antiguo.",
+        responses={
+            200: MovimientoInventarioSerializer(many=True),
+            403: OpenApiResponse(response=ErrorResponseSerializer, description="Solo Despachador o Administrador"),
+        }
+    )
+    @action(detail=True, methods=['get'], permission_classes=[IsDespachadorOrAdmin])
+    def movimientos(self, request, slug=None):
+        producto = self.get_object()
+        queryset = producto.movimientos.select_related('usuario').order_by('-created_at', '-id')
+        pagina = self.paginate_queryset(queryset)
+        serializer = MovimientoInventarioSerializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary="Importación masiva (CSV / JSONL)",
+        description="Solo Admin. Upsert por slug en lotes; un único correo resumen a suscriptores.",
+        request={'multipart/form-data': ImportarProductosSerializer},
+        responses={
+            200: OpenApiResponse(description="Resumen: creados, actualizados, con_error y errores por fila (también las ilegibles)"),
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Archivo faltante"),
+        }
+    )
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        entrada = ImportarProductosSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        archivo = entrada.validated_data['archivo']
+        formato = 'jsonl' if archivo.name.endswith('.jsonl') else 'csv'
+
+        # Las líneas ilegibles vuelven en `errores` sin deshacer los lotes ya importados
+        texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+        return Response(importar_productos(leer_filas(texto, formato)))
+
+    @extend_schema(summary="Recomendaciones para el usuario actual", responses=ProductoCardSerializer(many=True))
     @action(detail=False, methods=['get'])
     def recomendaciones(self, request):
-        """Retorna productos destacados o aleatorios como recomendación."""
-        queryset = self.get_queryset().filter(es_destacado=True)[:6]
-        serializer = self.get_serializer(queryset, many=True)
+        """
+        Recomendaciones personalizadas según compras y favoritos del usuario.
+        Anónimos o usuarios sin historial reciben los destacados.
+        """
+        productos = recomendar_para_usuario(request.user)
+        serializer = self.get_serializer(productos, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(summary="Productos recomendados para un producto", responses=ProductoCardSerializer(many=True))
+    @action(detail=True, methods=['get'])
+    def recomendados(self, request, slug=None):
+        """Quienes compraron o guardaron este producto también se interesaron en..."""
+        producto = self.get_object()
+        productos = recomendar_para_producto(producto, usuario=request.user)
+        serializer = ProductoCardSerializer(productos, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
 @extend_schema(tags=['Tienda - Carrito'])
@@ -57,12 +184,19 @@ class CarritoViewSet(viewsets.GenericViewSet):
         cart, _ = Carrito.objects.get_or_create(usuario=request.user)
         return cart
 
+    def _serializar(self, cart, cambio=False):
+        """Relee el carrito con sus items y productos precargados (consultas constantes)."""
+        cart = optimizar_queryset(Carrito.objects.filter(pk=cart.pk), CarritoSerializer).get()
+        datos = CarritoSerializer(cart).data
+        if cambio:
+            CARRITO_ITEMS.observar(sum(item['cantidad'] for item in datos['items']), momento='cambio')
+        return datos
+
     @extend_schema(responses=CarritoSerializer)
     def list(self, request):
         """Ver el carrito actual"""
         cart = self._get_cart(request)
-        serializer = CarritoSerializer(cart)
-        return Response(serializer.data)
+        return Response(self._serializar(cart))
 
     @extend_schema(
         summary="Agregar Item",
@@ -84,6 +218,7 @@ class CarritoViewSet(viewsets.GenericViewSet):
 
         # Verificar stock
         if producto.stock < cantidad:
+            AGOTADOS.inc(motivo='carrito_rechazado')
             # REEMPLAZO: raise ValidationError en lugar de return Response manual
             raise ValidationError({"detail": f"No hay suficiente stock. Disponible: {producto.stock}"})
 
@@ -94,7 +229,7 @@ class CarritoViewSet(viewsets.GenericViewSet):
         item.cantidad += cantidad
         item.save()
 
-        return Response(CarritoSerializer(cart).data)
+        return Response(self._serializar(cart, cambio=True))
 
     @extend_schema(
             summary="Eliminar Item del Carrito", 
@@ -107,7 +242,7 @@ class CarritoViewSet(viewsets.GenericViewSet):
         # Buscamos por producto_id para facilitar al frontend
         item = get_object_or_404(ItemCarrito, carrito=cart, producto_id=pk)
         item.delete()
-        return Response(CarritoSerializer(cart).data)
+        return Response(self._serializar(cart, cambio=True))
 
 @extend_schema(tags=['Tienda - Direcciones'])
 class DireccionViewSet(viewsets.ModelViewSet):
@@ -125,11 +260,15 @@ class DireccionViewSet(viewsets.ModelViewSet):
         serializer.save(usuario=self.request.user)
 
 @extend_schema(tags=['Tienda - Pedidos'])
-class PedidoViewSet(viewsets.ModelViewSet):
+class PedidoViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     serializer_class = PedidoSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'post'] # No permitir editar/borrar pedidos por API pública
 
+    @property
+    def throttle_scope(self):
+        return 'checkout' if self.action == 'create' else None
+
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Pedido.objects.none()
@@ -147,6 +286,18 @@ class PedidoViewSet(viewsets.ModelViewSet):
         }
     )
     def create(self, request, *args, **kwargs):
+        try:
+            respuesta = self._checkout(request)
+        except (ValidationError, Http404):
+            CHECKOUTS.inc(resultado='rechazado')
+            raise
+        except Exception:
+            CHECKOUTS.inc(resultado='error')
+            raise
+        CHECKOUTS.inc(resultado='ok')
+        return respuesta
+
+    def _checkout(self, request):
         # 1. Validar carrito
         try:
             carrito = Carrito.objects.get(usuario=request.user)
@@ -165,11 +316,11 @@ class PedidoViewSet(viewsets.ModelViewSet):
         direccion = get_object_or_404(Direccion, id=direccion_id, usuario=request.user)
 
         # 3. Calcular Costo de Envío
+        cantidad_total = sum(item.cantidad for item in items)
         try:
             tarifa = TarifaEnvio.objects.get(ciudad__iexact=direccion.ciudad)
             costo_envio = tarifa.precio_base
             
-            cantidad_total = sum(item.cantidad for item in items)
             if cantidad_total > 5:
                 extra = (cantidad_total - 5) * tarifa.precio_extra_producto
                 costo_envio += extra
@@ -190,10 +341,13 @@ class PedidoViewSet(viewsets.ModelViewSet):
             )
 
             subtotal_acumulado = 0
+            movimientos = []
+            agotados = 0
             for item in items:
                 producto_actual = Producto.objects.select_for_update().get(id=item.producto.id)
 
                 if producto_actual.stock < item.cantidad:
+                    AGOTADOS.inc(motivo='checkout_rechazado')
                     raise ValidationError({
                         "detail": f"Stock insuficiente para el producto {producto_actual.nombre}. Disponible: {producto_actual.stock}"
                     })
@@ -205,12 +359,18 @@ class PedidoViewSet(viewsets.ModelViewSet):
                     precio_unitario=producto_actual.precio
                 )
                 
-                # Descontar inventario
-                producto_actual.stock -= item.cantidad
-                producto_actual.save()
+                # Descontar inventario (se aplica en bloque al libro al final)
+                movimientos.append(MovimientoInventario(
+                    producto_id=producto_actual.id, tipo='VENTA', cantidad=-item.cantidad, pedido=pedido
+                ))
+                registrar_venta(producto_actual.id, item.cantidad)
+                if producto_actual.stock == item.cantidad:
+                    agotados += 1  # Esta venta deja el producto en cero
                 
                 subtotal_acumulado += item.cantidad * producto_actual.precio
 
+            registrar_movimientos(movimientos)
+
             # Totales Finales
             pedido.subtotal = subtotal_acumulado
             pedido.total = subtotal_acumulado + costo_envio
@@ -219,11 +379,33 @@ class PedidoViewSet(viewsets.ModelViewSet):
             # Vaciar carrito
             carrito.items.all().delete()
 
+        # Fuera de la transacción: solo cuenta lo que quedó confirmado
+        if agotados:
+            AGOTADOS.inc(agotados, motivo='agotado')
+        CARRITO_ITEMS.observar(cantidad_total, momento='checkout')
+
+        pedido = optimizar_queryset(Pedido.objects.filter(pk=pedido.pk), PedidoSerializer).get()
         serializer = self.get_serializer(pedido)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @extend_schema(
+        summary="Datos de Pago (Bold)",
+        description="Referencia, monto y hash de integridad para abrir el botón de pagos de Bold.",
+        responses={
+            200: DatosPagoSerializer,
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="El pedido no está pendiente de pago"),
+            404: OpenApiResponse(response=ErrorResponseSerializer, description="Pedido no encontrado"),
+        }
+    )
+    @action(detail=True, methods=['get'])
+    def pago(self, request, pk=None):
+        pedido = self.get_object()
+        if pedido.estado != 'PENDIENTE':
+            raise ValidationError({"detail": f"El pedido ya está {pedido.estado}."})
+        return Response(DatosPagoSerializer(datos_checkout(pedido)).data)
+
 @extend_schema(tags=['Tienda - Favoritos'])
-class FavoritoViewSet(viewsets.ModelViewSet):
+class FavoritoViewSet(QuerysetOptimizadoMixin, viewsets.ModelViewSet):
     serializer_class = FavoritoSerializer
     permission_classes = [IsAuthenticated]
 
@@ -231,11 +413,198 @@ class FavoritoViewSet(viewsets.ModelViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Favorito.objects.none()
         
-        return Favorito.objects.filter(usuario=self.request.user)
+        return Favorito.objects.filter(usuario=self.request.user).order_by('-created_at')
 
     def perform_create(self, serializer):
-        # Evitar duplicados
-        producto = serializer.validated_data['producto']
-        if Favorito.objects.filter(usuario=self.request.user, producto=producto).exists():
-            return # Ya existe, no hacemos nada (o podrías lanzar error)
-        serializer.save(usuario=self.request.user)
\ No newline at end of file
+        # Un solo INSERT: el índice único resuelve duplicados y carreras entre peticiones
+        try:
+            with transaction.atomic():
+                serializer.save(usuario=self.request.user)
+        except IntegrityError:
+            serializer.instance = Favorito.objects.get(
+                usuario=self.request.user, producto=serializer.validated_data['producto']
+            )
+
+    @extend_schema(
+        summary="Agregar favoritos en lote",
+        request=FavoritosLoteSerializer,
+        responses={
+            200: FavoritosAgregadosSerializer,
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Lista vacía o demasiado larga"),
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def agregar(self, request):
+        """Los productos que ya eran favoritos se ignoran; los inexistentes se reportan."""
+        entrada = FavoritosLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        return Response(agregar_favoritos(request.user, entrada.validated_data['producto_ids']))
+
+    @extend_schema(
+        summary="Quitar favoritos en lote",
+        request=FavoritosLoteSerializer,
+        responses={
+            200: FavoritosQuitadosSerializer,
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Lista vacía o demasiado larga"),
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def quitar(self, request):
+        entrada = FavoritosLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        return Response({'quitados': quitar_favoritos(request.user, entrada.validated_data['producto_ids'])})
+
+    @extend_schema(
+        summary="IDs de productos favoritos",
+        description="Lista compacta para marcar corazones en el frontend. Con `?productos=1,2,3` "
+                    "responde cuáles de esos productos son favoritos.",
+        parameters=[
+            OpenApiParameter('productos', OpenApiTypes.STR, description="IDs separados por coma (máx. 100)"),
+        ],
+        responses={
+            200: FavoritosIdsSerializer,
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="IDs inválidos"),
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def ids(self, request):
+        producto_ids = None
+        if request.query_params.get('productos'):
+            entrada = FavoritosLoteSerializer(data={'producto_ids': request.query_params['productos'].split(',')})
+            if not entrada.is_valid():
+                raise ValidationError({"detail": "'productos' debe ser una lista de IDs separados por coma (máx. 100)."})
+            producto_ids = entrada.validated_data['producto_ids']
+        return Response({'ids': ids_favoritos(request.user, producto_ids)})
+
+@extend_schema(tags=['Tienda - Despacho'])
+class ExportarPedidosView(generics.GenericAPIView):
+    """
+    Exportación masiva (streaming) de pedidos con sus productos y dirección.
+    La respuesta se genera por lotes desde un cursor del servidor, así que la
+    memoria no crece con el número de pedidos.
+    """
+    permission_classes = [IsDespachadorOrAdmin]
+    serializer_class = ExportarPedidosSerializer
+
+    @extend_schema(
+        summary="Exportar Pedidos (CSV / JSONL)",
+        parameters=[ExportarPedidosSerializer],
+        responses={
+            (200, 'text/csv'): OpenApiResponse(response=OpenApiTypes.BINARY, description="Archivo CSV (una fila por producto)"),
+            (200, 'application/jsonl'): OpenApiResponse(response=OpenApiTypes.BINARY, description="Archivo JSONL (un pedido por línea)"),
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Filtros inválidos"),
+            403: OpenApiResponse(response=ErrorResponseSerializer, description="Solo Despachador o Administrador"),
+        }
+    )
+    def get(self, request):
+        filtros = self.get_serializer(data=request.query_params)
+        filtros.is_valid(raise_exception=True)
+        datos = filtros.validated_data
+
+        def inicio_del_dia(fecha):
+            return timezone.make_aware(datetime.combine(fecha, time.min))
+
+        pedidos = pedidos_para_exportar(
+            estado=datos.get('estado'),
+            desde=inicio_del_dia(datos['desde']) if datos.get('desde') else None,
+            hasta=inicio_del_dia(datos['hasta'] + timedelta(days=1)) if datos.get('hasta') else None,
+        )
+
+        nombre = f"pedidos_{timezone.localdate():%Y%m%d}"
+        if datos['formato'] == 'jsonl':
+            response = StreamingHttpResponse(lineas_jsonl(pedidos), content_type='application/jsonl; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{nombre}.jsonl"'
+        else:
+            response = StreamingHttpResponse(filas_csv(pedidos), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+        return response
+
+@extend_schema(tags=['Tienda - Despacho'])
+class TransicionPedidosView(generics.GenericAPIView):
+    """
+    Cambio de estado masivo (ej: marcar cientos de pedidos como ENVIADO).
+    Un solo UPDATE para todo el lote; al cancelar se repone el stock en bloque.
+    """
+    permission_classes = [IsDespachadorOrAdmin]
+    serializer_class = TransicionPedidosSerializer
+
+    @extend_schema(
+        summary="Cambiar Estado de Pedidos (Masivo)",
+        responses={
+            200: TransicionResultadoSerializer,
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Datos inválidos"),
+            403: OpenApiResponse(response=ErrorResponseSerializer, description="Solo Despachador o Administrador"),
+        }
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        resultado = transicionar_pedidos(
+            datos['pedidos'], datos['estado'], usuario=request.user, motivo=datos['motivo']
+        )
+        return Response(TransicionResultadoSerializer(resultado).data)
+
+@extend_schema(tags=['Tienda - Pagos'])
+class WebhookBoldView(APIView):
+    """
+    Recibe las notificaciones de Bold. Solo verifica la firma y encola el
+    evento; el pedido se actualiza en el comando `procesar_pagos`.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []  # Bold reintenta ante cualquier respuesta distinta de 200
+
+    @extend_schema(
+        summary="Webhook de Bold",
+        request=OpenApiTypes.OBJECT,
+        responses={
+            200: OpenApiResponse(description="Evento recibido"),
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Cuerpo inválido"),
+            403: OpenApiResponse(response=ErrorResponseSerializer, description="Firma inválida"),
+        }
+    )
+    def post(self, request):
+        cuerpo = request.body
+        if not verificar_firma(cuerpo, request.headers.get('x-bold-signature', '')):
+            raise PermissionDenied("Firma inválida.")
+
+        try:
+            payload = json.loads(cuerpo)
+        except ValueError:
+            raise ValidationError({"detail": "El cuerpo no es JSON válido."})
+        if not isinstance(payload, dict) or not payload.get('id'):
+            raise ValidationError({"detail": "El evento no tiene 'id'."})
+
+        encolar_evento(payload)
+        return Response({"detail": "Evento recibido."})
+
+@extend_schema(tags=['Búsqueda'])
+class AutocompletarView(APIView):
+    """
+    Sugerencias mientras se escribe (productos, blog, noticias y protocolos).
+    Sin autenticación: se llama en cada tecla y la respuesta es igual para todos.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_scope = 'autocompletar'
+
+    @extend_schema(
+        summary="Autocompletar",
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, required=True, description=f"Texto escrito (mín. {MIN_CARACTERES} caracteres)"),
+            OpenApiParameter('tipo', OpenApiTypes.STR, enum=[t for t, _ in TerminoAutocompletado.TIPOS], description="Limitar a un tipo"),
+        ],
+        responses={
+            200: AutocompletadoSerializer(many=True),
+            400: OpenApiResponse(response=ErrorResponseSerializer, description="Tipo inválido"),
+        }
+    )
+    def get(self, request):
+        tipo = request.query_params.get('tipo') or None
+        if tipo and tipo not in FUENTES:
+            raise ValidationError({"detail": f"Tipo inválido. Opciones: {', '.join(FUENTES)}."})
+        response = Response(autocompletar(request.query_params.get('q', ''), tipo=tipo))
+        patch_cache_control(response, public=True, max_age=CACHE_SEGUNDOS)
+        return response
@@ -7,3 +7,7 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import users.signals  
+
+        from django.core import checks
+        from config.throttling import revisar_cache_compartido
+        checks.register(revisar_cache_compartido, checks.Tags.caches)
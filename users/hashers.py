@@ -0,0 +1,16 @@
+# users/hashers.py
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PBKDF2CostoConfigurableHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 con iteraciones tomadas de `PASSWORD_HASH_ITERATIONS`.
+    Usa el mismo `algorithm` que el hasher por defecto, así los hashes
+    existentes siguen siendo válidos. Si el costo cambia, Django rehashea la
+    contraseña en el siguiente login exitoso (`must_update`).
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from users.views import CustomTokenObtainPairView, PasswordResetRequestView
+
+User = get_user_model()
+
+CLAVE = 'Clave-de-medicion-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el camino de login y de recuperación de contraseña: usuario válido, clave errónea y "
+        "correo inexistente. Los casos de fallo deben tardar lo mismo para no permitir enumeración "
+        "por tiempos. Todo corre en una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', type=int, default=20, help="Peticiones por caso")
+        parser.add_argument('--iteraciones', type=int, help="Medir con este PASSWORD_HASH_ITERATIONS")
+
+    def handle(self, *args, **options):
+        ajustes = {}
+        if options['iteraciones']:
+            ajustes['PASSWORD_HASH_ITERATIONS'] = options['iteraciones']
+
+        # Las vistas se llaman directo sin throttles (no se toca el cache compartido)
+        login = CustomTokenObtainPairView.as_view(throttle_classes=[])
+        recuperacion = PasswordResetRequestView.as_view(throttle_classes=[])
+
+        with override_settings(**ajustes), transaction.atomic():
+            User.objects.create_user(email='medicion@example.com', password=CLAVE, first_name='Medición')
+            casos = [
+                ("Login válido", login, {'email': 'medicion@example.com', 'password': CLAVE}),
+                ("Login clave errónea", login, {'email': 'medicion@example.com', 'password': 'x'}),
+                ("Login correo inexistente", login, {'email': 'nadie@example.com', 'password': 'x'}),
+                ("Recuperación correo existente", recuperacion, {'email': 'medicion@example.com'}),
+                ("Recuperación correo inexistente", recuperacion, {'email': 'nadie@example.com'}),
+            ]
+            self.stdout.write(f"{'Caso':<34}{'p50 ms':>10}{'p95 ms':>10}")
+            for nombre, vista, datos in casos:
+                p50, p95 = self._medir(vista, datos, options['n'])
+                self.stdout.write(f"{nombre:<34}{p50:>10.1f}{p95:>10.1f}")
+            transaction.set_rollback(True)
+
+    def _medir(self, vista, datos, n):
+        factory = APIRequestFactory()
+        tiempos = []
+        for _ in range(n):
+            request = factory.post('/', datos, format='json')
+            inicio = time.perf_counter()
+            vista(request)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        return statistics.median(tiempos), tiempos[max(int(len(tiempos) * 0.95) - 1, 0)]
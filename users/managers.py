@@ -31,4 +31,14 @@ class CustomUserManager(BaseUserManager):
         if extra_fields.get('is_superuser') is not True:
             raise ValueError(_('El superusuario debe tener is_superuser=True.'))
         
-        return self.create_user(email, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, password, **extra_fields)
+
+    def correos_administradores(self):
+        """
+        Correos para los avisos internos: los del grupo 'Administrador'
+        activos o, si no hay ninguno, los de los superusuarios.
+        """
+        admins = self.filter(groups__name='Administrador', is_active=True).values_list('email', flat=True)
+        if not admins:
+            admins = self.filter(is_superuser=True).values_list('email', flat=True)
+        return list(admins)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_user_recibir_newsletter_user_recibir_ofertas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True), ('recibir_newsletter', True)), fields=['email'], name='users_newsletter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True), ('recibir_ofertas', True)), fields=['email'], name='users_ofertas_idx'),
+        ),
+    ]
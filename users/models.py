@@ -36,6 +36,13 @@ class User(WebPConverterMixin, AbstractUser):
     
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Destinatarios de correos masivos: values_list('email') sale directo del índice
+            models.Index(fields=['email'], name='users_newsletter_idx', condition=models.Q(is_active=True, recibir_newsletter=True)),
+            models.Index(fields=['email'], name='users_ofertas_idx', condition=models.Q(is_active=True, recibir_ofertas=True)),
+        ]
+
     def __str__(self):
         return f"{self.email} - {self.first_name} {self.last_name}"
     
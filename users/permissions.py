@@ -1,13 +1,15 @@
 from rest_framework import permissions
 
+from config.metricas import contar_permiso
+
 class IsAdministrador(permissions.BasePermission):
     """
     Permite acceso si el usuario es Superuser o pertenece al grupo 'Administrador'.
     """
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
-            return False
-        return (
+            return contar_permiso(self, False)
+        return contar_permiso(self, (
             request.user.is_superuser or 
             request.user.groups.filter(name='Administrador').exists()
-        )
\ No newline at end of file
+        ))
\ No newline at end of file
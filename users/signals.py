@@ -1,14 +1,19 @@
+import logging
+
 from django.db.models.signals import post_save, post_migrate
 from django.dispatch import receiver
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.apps import apps
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
+from config.senales import diferir
 from .models import User
 
+logger = logging.getLogger(__name__)
+
 @receiver(post_migrate)
 def create_initial_roles(sender, **kwargs):
     """
@@ -20,7 +25,7 @@ def create_initial_roles(sender, **kwargs):
     if sender.name != 'users':
         return
 
-    print("--- Configurando roles y permisos iniciales ---")
+    logger.info("Configurando roles y permisos iniciales")
 
     # 1. Crear Grupos Base
     # Usamos get_or_create para que sea idempotente (no falle si ya existen)
@@ -49,9 +54,39 @@ def create_initial_roles(sender, **kwargs):
 
     except LookupError:
         # Esto ocurre si la app 'store' no está instalada o cargada aún
-        print("⚠️ La app 'store' no está lista, se omitió la asignación de permisos al Despachador.")
+        logger.warning("La app 'store' no está lista, se omitió la asignación de permisos al Despachador.")
     except Exception as e:
-        print(f"⚠️ Error configurando permisos: {e}")
+        logger.error(f"Error configurando permisos: {e}", exc_info=True)
+
+
+def _mensaje_bienvenida(email, nombre):
+    html_content = render_to_string('emails/bienvenida.html', {'nombre': nombre})
+    msg = EmailMultiAlternatives(
+        '¡Bienvenido a la Familia Reina!',
+        strip_tags(html_content),
+        settings.DEFAULT_FROM_EMAIL,
+        [email]
+    )
+    msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def _asignar_grupos_en_lote(es_superusuario_por_id):
+    """Un `add` por grupo en lugar de uno por usuario."""
+    admin_ids = [i for i, es_super in es_superusuario_por_id.items() if es_super]
+    cliente_ids = [i for i, es_super in es_superusuario_por_id.items() if not es_super]
+    if admin_ids:
+        Group.objects.get_or_create(name='Administrador')[0].user_set.add(*admin_ids)
+    if cliente_ids:
+        Group.objects.get_or_create(name='Usuario')[0].user_set.add(*cliente_ids)
+
+
+def _enviar_bienvenidas_en_lote(nombres_por_email):
+    mensajes = [_mensaje_bienvenida(email, nombre) for email, nombre in nombres_por_email.items()]
+    try:
+        get_connection().send_messages(mensajes)
+    except Exception as e:
+        logger.error(f"Error enviando correos de bienvenida: {e}", exc_info=True)
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -60,6 +95,11 @@ def user_created_actions(sender, instance, created, **kwargs):
     Maneja acciones post-creación de usuario: Asignar grupo y Enviar correo.
     """
     if created:
+        # En un lote de señales: grupos en bloque y bienvenidas por una sola conexión
+        if diferir(_asignar_grupos_en_lote, instance.id, instance.is_superuser, notificacion=False):
+            diferir(_enviar_bienvenidas_en_lote, instance.email, instance.first_name or instance.email)
+            return
+
         # 1. Asignar Grupo por defecto
         # Si es superusuario, le damos admin
         if instance.is_superuser:
@@ -72,25 +112,6 @@ def user_created_actions(sender, instance, created, **kwargs):
 
         # 2. Enviar Correo de Bienvenida
         try:
-            subject = '¡Bienvenido a la Familia Reina!'
-            
-            # Renderizamos el HTML con los datos del usuario
-            html_content = render_to_string('emails/bienvenida.html', {
-                'nombre': instance.first_name or instance.email
-            })
-            
-            # Versión texto plano por si el correo del cliente no soporta HTML
-            text_content = strip_tags(html_content)
-
-            # Preparamos el mensaje
-            msg = EmailMultiAlternatives(
-                subject,
-                text_content,
-                settings.DEFAULT_FROM_EMAIL,
-                [instance.email]
-            )
-            msg.attach_alternative(html_content, "text/html")
-            msg.send()
-            
+            _mensaje_bienvenida(instance.email, instance.first_name or instance.email).send()
         except Exception as e:
-            print(f"Error enviando correo de bienvenida: {e}")
\ No newline at end of file
+            logger.error(f"Error enviando correo de bienvenida: {e}", exc_info=True)
\ No newline at end of file
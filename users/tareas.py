@@ -0,0 +1,66 @@
+# users/tareas.py
+"""
+Correos de autenticación fuera del ciclo de la petición.
+
+La búsqueda del usuario, el token, el render de la plantilla y el envío SMTP
+corren en un pool de hilos: la vista responde igual de rápido exista o no
+el correo (sin enumeración por tiempos) y no ocupa al worker durante el SMTP.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.html import strip_tags
+from django.utils.http import urlsafe_base64_encode
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+_pool_correos = ThreadPoolExecutor(max_workers=2, thread_name_prefix='correo')
+
+
+def enviar_recuperacion(email):
+    """Envía el link de recuperación si el correo pertenece a un usuario activo."""
+    try:
+        user = User.objects.filter(email=email, is_active=True).first()
+        if user is None:
+            return
+
+        uidb64 = urlsafe_base64_encode(force_bytes(user.id))
+        token = PasswordResetTokenGenerator().make_token(user)
+        link = f"{settings.FRONTEND_URL}/reset-password/{uidb64}/{token}"
+
+        html_content = render_to_string('emails/password_reset.html', {
+            'nombre': user.first_name,
+            'link': link
+        })
+        msg = EmailMultiAlternatives(
+            'Restablecer Contraseña - Ecommerce Reina',
+            strip_tags(html_content),
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email]
+        )
+        msg.attach_alternative(html_content, "text/html")
+        msg.send()
+    except Exception as e:
+        logger.error(f"Fallo envío email recuperación para {email}: {str(e)}")
+
+
+def _en_hilo(funcion, *args):
+    try:
+        funcion(*args)
+    finally:
+        connection.close()  # Cada hilo del pool abre su propia conexión
+
+
+def encolar_recuperacion(email):
+    """Entrega el correo al pool (o lo envía en línea si CORREOS_EN_SEGUNDO_PLANO=False)."""
+    if getattr(settings, 'CORREOS_EN_SEGUNDO_PLANO', True):
+        return _pool_correos.submit(_en_hilo, enviar_recuperacion, email)
+    enviar_recuperacion(email)
@@ -1,3 +1,106 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core import checks
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from config.throttling import ScopeVentanaThrottle
+
+from .hashers import PBKDF2CostoConfigurableHasher
+
+User = get_user_model()
+
+
+class RehashAlIniciarSesionTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()  # Throttle de 'login'
+        self.usuario = User.objects.create_user('ana@example.com', 'clave-segura', first_name='Ana')
+
+    def con_hash(self, hash_legado):
+        User.objects.filter(pk=self.usuario.pk).update(password=hash_legado)
+
+    def login(self):
+        response = self.client.post('/api/usuarios/login/', {'email': 'ana@example.com', 'password': 'clave-segura'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.usuario.refresh_from_db()
+        return self.usuario.password
+
+    def test_hash_legado_se_reescribe_con_el_algoritmo_nuevo(self):
+        self.con_hash(make_password('clave-segura', hasher='pbkdf2_sha1'))
+
+        algoritmo, iteraciones, _, _ = self.login().split('$')
+
+        self.assertEqual(algoritmo, 'pbkdf2_sha256')
+        self.assertEqual(int(iteraciones), PBKDF2CostoConfigurableHasher().iterations)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1200000)
+    def test_costo_nuevo_se_aplica_en_el_siguiente_login(self):
+        self.con_hash(PBKDF2PasswordHasher().encode('clave-segura', 'salpruebas', iterations=1000))
+
+        self.assertTrue(self.login().startswith('pbkdf2_sha256$1200000$'))
+
+
+class VentanaFijaThrottleTests(APITestCase):
+    """Límite 'login' (5/minute) y 'password_reset' (5/hour) de settings."""
+
+    INICIO = 1_000_000 * 3600  # Inicio de una ventana de minuto y de hora
+
+    def setUp(self):
+        cache.clear()
+        self.peticion = self.anonima('10.0.0.1')
+        self.reloj = mock.patch('config.throttling.time.time', return_value=self.INICIO)
+        self.reloj.start()
+        self.addCleanup(self.reloj.stop)
+
+    def anonima(self, ip):
+        peticion = APIRequestFactory().post('/', REMOTE_ADDR=ip)
+        peticion.user = AnonymousUser()
+        return peticion
+
+    def permitidas(self, scope, veces):
+        vista = mock.Mock(throttle_scope=scope)
+        return [ScopeVentanaThrottle().allow_request(self.peticion, vista) for _ in range(veces)]
+
+    def test_bloquea_en_la_peticion_n_mas_1_y_reinicia_con_la_ventana(self):
+        self.assertEqual(self.permitidas('login', 6), [True] * 5 + [False])
+
+        with mock.patch('config.throttling.time.time', return_value=self.INICIO + 59):
+            self.assertEqual(self.permitidas('login', 1), [False])
+        with mock.patch('config.throttling.time.time', return_value=self.INICIO + 60):
+            self.assertEqual(self.permitidas('login', 6), [True] * 5 + [False])
+
+    def test_cada_scope_tiene_su_contador(self):
+        self.assertEqual(self.permitidas('login', 6)[-1], False)
+        self.assertEqual(self.permitidas('password_reset', 5), [True] * 5)
+
+        otra_ip = self.anonima('10.0.0.2')
+        self.assertTrue(ScopeVentanaThrottle().allow_request(otra_ip, mock.Mock(throttle_scope='login')))
+
+    def test_endpoint_de_login_responde_429(self):
+        codigos = [
+            self.client.post('/api/usuarios/login/', {'email': 'nadie@example.com', 'password': 'x'}, format='json').status_code
+            for _ in range(6)
+        ]
+        self.assertEqual(codigos, [401] * 5 + [429])
+
+
+class CacheCompartidoCheckTests(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}}
+
+    def avisos(self):
+        return [aviso.id for aviso in checks.run_checks(tags=[checks.Tags.caches])]
+
+    def test_locmem_sin_debug_avisa(self):
+        with override_settings(DEBUG=False, CACHES=self.LOCMEM):
+            self.assertIn('config.W001', self.avisos())
+
+    def test_debug_o_cache_compartido_no_avisan(self):
+        for ajustes in ({'DEBUG': True, 'CACHES': self.LOCMEM}, {'DEBUG': False, 'CACHES': self.REDIS}):
+            with self.subTest(**ajustes), override_settings(**ajustes):
+                self.assertNotIn('config.W001', self.avisos())
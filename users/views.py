@@ -6,15 +6,9 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError, APIException
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.conf import settings
 from .permissions import IsAdministrador
+from .tareas import encolar_recuperacion
 from django.contrib.auth.models import Group, Permission
-from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 import logging
 
 # Importaciones de Spectacular
@@ -73,7 +67,7 @@ class RegisterView(generics.CreateAPIView):
     }
 )
 class CustomTokenObtainPairView(TokenObtainPairView):
-    pass
+    throttle_scope = 'login'
 
 @extend_schema(
     tags=['Autenticación'],
@@ -142,45 +136,16 @@ class UserRoleAssignmentViewSet(viewsets.ModelViewSet):
 class PasswordResetRequestView(generics.GenericAPIView):
     serializer_class = PasswordResetRequestSerializer
     permission_classes = [AllowAny] # Cualquiera puede pedir recuperar su cuenta
+    throttle_scope = 'password_reset'
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data['email']
 
-        # Buscamos el usuario (Si no existe, no decimos nada por seguridad)
-        user_qs = User.objects.filter(email=email)
-        if user_qs.exists():
-            user = user_qs.first()
-            
-            # 1. Generar Token y UID
-            uidb64 = urlsafe_base64_encode(force_bytes(user.id))
-            token = PasswordResetTokenGenerator().make_token(user)
-            
-            # 2. Crear Link (Ajusta esto a la URL de tu Frontend en React/Angular)
-            # Ajustar dominio según variable de entorno en prod
-            domain = getattr(settings, 'FRONTEND_URL', "http://localhost:3000")
-            link = f"{domain}/reset-password/{uidb64}/{token}"
-            
-            # 3. Enviar Correo
-            try:
-                html_content = render_to_string('emails/password_reset.html', {
-                    'nombre': user.first_name,
-                    'link': link
-                })
-                text_content = strip_tags(html_content)
-
-                msg = EmailMultiAlternatives(
-                    'Restablecer Contraseña - Ecommerce Reina',
-                    text_content,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user.email]
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-                
-            except Exception as e:
-                logger.error(f"Fallo envío email recuperación para {email}: {str(e)}")
+        # Todo el trabajo (búsqueda, token, plantilla, SMTP) va en segundo plano:
+        # la respuesta tarda lo mismo exista o no el correo
+        encolar_recuperacion(email)
 
         return Response({'detail': 'Si el correo existe, recibirás un enlace de recuperación.'}, status=status.HTTP_200_OK)
 
@@ -198,6 +163,7 @@ class PasswordResetRequestView(generics.GenericAPIView):
 class PasswordResetConfirmView(generics.GenericAPIView):
     serializer_class = SetNewPasswordSerializer
     permission_classes = [AllowAny]
+    throttle_scope = 'password_reset'
 
     def patch(self, request):
         serializer = self.get_serializer(data=request.data)